@@ -14,6 +14,11 @@ from backend.routes_auth import bp as auth_bp
 from backend.routes_courses import bp as courses_bp
 from backend.routes_topics import bp as topics_bp
 from backend.routes_reviews import bp as reviews_bp
+from backend.routes_jobs import bp as jobs_bp
+from backend.services import process_stats
+from backend.services.generate import parse_stats
+from backend.services.pregrade import pregrade_stats
+from backend.worker import JOB_EMBEDDED_WORKERS, start_embedded_workers
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev")
@@ -28,9 +33,27 @@ CORS(app,
 init_db(app)
 app.teardown_appcontext(close_db)
 
+# Jobs normally run in `python -m backend.worker`; JOB_EMBEDDED_WORKERS>0 runs them in-process (dev)
+if JOB_EMBEDDED_WORKERS > 0:
+    start_embedded_workers(JOB_EMBEDDED_WORKERS)
+
+# Stats live in each process's memory; every process publishes them (services/process_stats.py)
+process_stats.start_publisher("web")
+
 @app.get("/api/health")
 def health():
-    return {"ok": True}
+    # Breakers of every live process (the worker processes make the LLM calls)
+    return {"ok": True, "llm_breakers": process_stats.merge_breakers(process_stats.live_processes())}
+
+@app.get("/api/metrics")
+def metrics_view():
+    # Summed over the web and worker processes seen in the last STATS_MAX_AGE_SECS
+    procs = process_stats.live_processes()
+    snap = process_stats.merge_metrics([p["metrics"] for p in procs])
+    return {**snap, "parsing": parse_stats(snap), "pregrade": pregrade_stats(snap),
+            "llm_scheduler": {p["process_id"]: p["scheduler"] for p in procs if p["scheduler"]},
+            "processes": [{"process_id": p["process_id"], "role": p["role"], "updated_at": p["updated_at"]}
+                          for p in procs]}
 
 app.register_blueprint(files_bp, url_prefix="/api/files")
 app.register_blueprint(quizzes_bp, url_prefix="/api/quizzes")
@@ -40,6 +63,7 @@ app.register_blueprint(flashcards_bp, url_prefix="/api/flashcards")
 app.register_blueprint(courses_bp, url_prefix="/api/courses")
 app.register_blueprint(topics_bp, url_prefix="/api/topics")
 app.register_blueprint(reviews_bp, url_prefix="/api/reviews")
+app.register_blueprint(jobs_bp, url_prefix="/api/jobs")
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,11 @@
+# backend/bench/__init__.py
+"""
+Benchmark and check scripts, run as `python -m backend.bench.<name>`.
+
+Files they write (uploads, synthesized audio) go to a temporary UPLOAD_DIR,
+never the app's data/uploads, unless UPLOAD_DIR is set explicitly.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="bench_uploads_"))
@@ -0,0 +1,102 @@
+# backend/bench/bench_bulk.py
+"""
+Benchmark: statements and latency of saving generated rows and submitting
+attempts, as the number of questions grows.
+
+    python -m backend.bench.bench_bulk [--sizes 10 50 200]
+
+For each size: a quiz with that many MCQ / true-false questions is saved
+with per-object db.add (the old path) and with one insert() executemany (the
+quiz job's path), then answered through POST /api/quizzes/attempt. Exits
+non-zero if the statements per attempt grow with the number of questions.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from sqlalchemy import insert
+
+from backend import db as dbmod
+from backend.bench.bench_queries import _app, count_queries
+from backend.utils_auth import create_jwt
+
+
+def _questions(quiz_id, n):
+    return [{
+        "quiz_id": quiz_id,
+        "qtype": "true_false" if i % 2 else "mcq",
+        "prompt": f"Question {i}?",
+        "options": "True|||False" if i % 2 else "A|||B|||C|||D",
+        "answer": "True" if i % 2 else "A",
+        "explanation": "",
+    } for i in range(n)]
+
+
+def _save(user_id, n, bulk):
+    from backend.models import Quiz, Question
+    with dbmod.session_scope() as db:
+        with count_queries(dbmod.get_engine()) as stmts:
+            t = time.perf_counter()
+            quiz = Quiz(user_id=user_id, title="Bench")
+            db.add(quiz)
+            db.flush()
+            if bulk:
+                db.execute(insert(Question), _questions(quiz.id, n))
+            else:
+                for row in _questions(quiz.id, n):
+                    db.add(Question(**row))
+                db.flush()
+            ms = (time.perf_counter() - t) * 1000
+        return quiz.id, stmts[0], ms
+
+
+def _measure(size):
+    from backend.models import User, Question
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_bulk_"), "bench.sqlite")
+    app = _app(f"sqlite:///{path}")
+    with dbmod.session_scope() as db:
+        user = User(name="bench", username="bench")
+        db.add(user)
+        db.flush()
+        user_id = user.id
+
+    _, old_stmts, old_ms = _save(user_id, size, bulk=False)
+    quiz_id, new_stmts, new_ms = _save(user_id, size, bulk=True)
+    with dbmod.session_scope() as db:
+        answers = [{"question_id": q.id, "user_answer": q.answer if q.id % 3 else "wrong"}
+                   for q in db.query(Question).filter_by(quiz_id=quiz_id)]
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(user_id, os.getenv('SECRET_KEY', 'dev'))}"}
+    with count_queries(dbmod.get_engine()) as stmts:
+        t = time.perf_counter()
+        resp = client.post("/api/quizzes/attempt", json={"quiz_id": quiz_id, "answers": answers}, headers=headers)
+        ms = (time.perf_counter() - t) * 1000
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["total"] == size
+    dbmod.get_engine().dispose()
+    return {"save (add per row)": (old_stmts, old_ms), "save (executemany)": (new_stmts, new_ms),
+            "attempt": (stmts[0], ms)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    args = ap.parse_args()
+
+    results = {size: _measure(size) for size in args.sizes}
+    names = list(results[args.sizes[0]])
+    print(f"{'step':<20}" + "".join(f" {f'{s} questions':>22}" for s in args.sizes))
+    for name in names:
+        print(f"{name:<20}" + "".join(
+            f" {f'{results[s][name][0]} stmts {results[s][name][1]:6.1f} ms':>22}" for s in args.sizes))
+    if len({results[s]["attempt"][0] for s in args.sizes}) > 1:
+        print("FAIL: statements per attempt grow with the number of questions")
+        sys.exit(1)
+    print("OK: statements per attempt are constant")
+
+
+if __name__ == "__main__":
+    main()
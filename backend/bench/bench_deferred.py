@@ -0,0 +1,96 @@
+# backend/bench/bench_deferred.py
+"""
+Benchmark: list reads with the large text columns deferred (Summary.content,
+Question.options / explanation) vs loading them as before.
+
+    python -m backend.bench.bench_deferred [--items 500] [--words 3000]
+
+Seeds one user with --items summaries of --words words each and a quiz of
+--items questions with long explanations, then times one page of
+/api/summaries/ and the question load of an attempt, each with the columns
+deferred (current models) and undeferred (what the old queries read).
+"""
+import os
+import time
+import argparse
+import tempfile
+from statistics import median
+
+from sqlalchemy import insert
+from sqlalchemy.orm import undefer, undefer_group
+
+from backend import db as dbmod
+from backend.bench.bench_queries import _app
+from backend.models import summary_text_stats
+from backend.utils_auth import create_jwt
+
+RUNS = 20
+
+
+def _seed(items, words):
+    from backend.models import User, Quiz, Question, Summary
+    content = " ".join(f"word{i % 97}" for i in range(words))
+    preview, word_count = summary_text_stats(content)
+    with dbmod.session_scope() as db:
+        user = User(name="bench", username="bench")
+        db.add(user)
+        db.flush()
+        quiz = Quiz(user_id=user.id, title="Bench")
+        db.add(quiz)
+        db.flush()
+        db.execute(insert(Summary), [
+            {"user_id": user.id, "title": f"Summary {i}", "content": content, "preview": preview,
+             "word_count": word_count} for i in range(items)
+        ])
+        db.execute(insert(Question), [
+            {"quiz_id": quiz.id, "qtype": "mcq", "prompt": f"Question {i}?", "answer": "A",
+             "options": "|||".join(["A " + "option " * 30] * 4), "explanation": "because " * 200}
+            for i in range(items)
+        ])
+        return user.id, quiz.id
+
+
+def _time(fn):
+    times = []
+    for _ in range(RUNS):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=500)
+    ap.add_argument("--words", type=int, default=3000)
+    args = ap.parse_args()
+
+    from backend.models import Question, Summary
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_deferred_"), "bench.sqlite")
+    app = _app(f"sqlite:///{path}")
+    user_id, quiz_id = _seed(args.items, args.words)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(user_id, os.getenv('SECRET_KEY', 'dev'))}"}
+
+    def summaries(*opts):
+        with dbmod.session_scope() as db:
+            rows = (db.query(Summary).options(*opts).filter_by(user_id=user_id)
+                    .order_by(Summary.created_at.desc(), Summary.id.desc()).limit(100).all())
+            return [(s.id, s.title, s.preview) for s in rows]
+
+    def questions(*opts):
+        with dbmod.session_scope() as db:
+            return [(q.id, q.qtype, q.answer) for q in db.query(Question).options(*opts).filter_by(quiz_id=quiz_id)]
+
+    print(f"{args.items} summaries of {args.words} words, quiz of {args.items} questions")
+    print(f"{'read':<34} {'deferred ms':>12} {'loaded ms':>10}")
+    print(f"{'summaries page (100 rows)':<34} {_time(summaries):12.2f} {_time(lambda: summaries(undefer(Summary.content))):10.2f}")
+    print(f"{'attempt question load':<34} {_time(questions):12.2f} "
+          f"{_time(lambda: questions(undefer_group('detail'))):10.2f}")
+    t = time.perf_counter()
+    resp = client.get("/api/summaries/", headers=headers)
+    print(f"GET /api/summaries/: {(time.perf_counter() - t) * 1000:.1f} ms, {len(resp.data):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# backend/bench/bench_failover.py
+"""
+Checks for the LLM provider chain against stub servers (services/fake_llm.py).
+
+    python -m backend.bench.bench_failover
+
+Starts a fake Ollama (primary) and a fake OpenRouter (fallback) on free ports
+per scenario and asserts:
+
+1. the fake server's output is deterministic and parses (plain and JSON),
+2. record/replay answers from the recordings without calling a provider,
+3. a failing primary falls back, and once its breaker opens it is skipped,
+4. a hedge against a slow primary returns the fallback's answer in time, the
+   abandoned primary gives its scheduler slot back at once, and no new hedge
+   fires while LLM_HEDGE_MAX_ABANDONED losers are still unwinding,
+5. a fallback whose breaker is half-open keeps its probe when the hedge never fires,
+6. with every breaker open, ProvidersUnavailable is raised without calling a provider.
+
+Exits non-zero on the first failed check.
+"""
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from backend.services import failover, llm, metrics
+from backend.services.scheduler import get_scheduler
+from backend.services import generate as gen
+from backend.services.fake_llm import make_server
+
+SOURCE = '"""' + ("Mitochondria produce ATP through oxidative phosphorylation in the inner membrane. " * 20) + '"""'
+MCQ_PROMPT = f"{SOURCE} Return exactly 5 MCQs"
+SLOW_TTFT_MS = 3000
+
+
+def _serve(**kwargs):
+    """Start a fake server on a free port; returns (server, request counter)."""
+    srv = make_server(port=0, tokens_per_sec=0, **kwargs)
+    hits = [0]
+    handle = srv.RequestHandlerClass.do_POST
+
+    def do_POST(self):
+        hits[0] += 1
+        handle(self)
+    srv.RequestHandlerClass.do_POST = do_POST
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits
+
+
+@contextmanager
+def _providers(primary=None, fallback=None, hedge=False):
+    """Point ollama (primary) and openrouter (fallback) at fresh fake servers, with fresh breakers."""
+    p_srv, p_hits = _serve(**{"ttft_ms": 0, **(primary or {})})
+    f_srv, f_hits = _serve(**{"ttft_ms": 0, **(fallback or {})})
+    saved = (llm.OLLAMA_URL, llm.OPENROUTER_URL, llm.OPENROUTER_API_KEY, llm.LLM_PROVIDER,
+             llm.LLM_FALLBACK_PROVIDERS, llm.LLM_HEDGE, llm.LLM_HEDGE_MIN_DELAY, llm.LLM_HEDGE_DEFAULT_DELAY)
+    llm.OLLAMA_URL = f"http://127.0.0.1:{p_srv.server_port}"
+    llm.OPENROUTER_URL = f"http://127.0.0.1:{f_srv.server_port}/v1"
+    llm.OPENROUTER_API_KEY = "bench"
+    llm.LLM_PROVIDER, llm.LLM_FALLBACK_PROVIDERS = "ollama", ["openrouter"]
+    llm.LLM_HEDGE, llm.LLM_HEDGE_MIN_DELAY, llm.LLM_HEDGE_DEFAULT_DELAY = hedge, 0.2, 0.2
+    failover._breakers.clear()
+    try:
+        yield p_hits, f_hits
+    finally:
+        (llm.OLLAMA_URL, llm.OPENROUTER_URL, llm.OPENROUTER_API_KEY, llm.LLM_PROVIDER,
+         llm.LLM_FALLBACK_PROVIDERS, llm.LLM_HEDGE, llm.LLM_HEDGE_MIN_DELAY, llm.LLM_HEDGE_DEFAULT_DELAY) = saved
+        p_srv.shutdown()
+        f_srv.shutdown()
+
+
+def check_fake_server():
+    with _providers() as (p_hits, _):
+        first = llm.llm_complete(MCQ_PROMPT, task="mcq")
+        second = llm.llm_complete(MCQ_PROMPT, task="mcq")
+        structured = llm.llm_complete(MCQ_PROMPT, task="mcq", schema=gen.MCQ_SCHEMA)
+    assert first == second, "fake server output is not deterministic"
+    assert len(gen.parse_mcqs(first)) == 5, f"expected 5 parsed MCQs from:\n{first}"
+    assert len(json.loads(structured)["questions"]) == 5, f"expected 5 JSON MCQs from:\n{structured}"
+    assert p_hits[0] == 3, f"expected 3 requests to the primary, got {p_hits[0]}"
+    print("ok: fake server output is deterministic and parses")
+
+
+def check_record_replay():
+    saved = llm.LLM_RECORD_MODE, llm.LLM_RECORD_DIR
+    llm.LLM_RECORD_DIR = tempfile.mkdtemp(prefix="bench_recordings_")
+    try:
+        with _providers() as (p_hits, _):
+            llm.LLM_RECORD_MODE = "record"
+            recorded = llm.llm_complete(MCQ_PROMPT, task="mcq")
+            llm.LLM_RECORD_MODE = "replay"
+            replayed = llm.llm_complete(MCQ_PROMPT, task="mcq")
+            try:
+                llm.llm_complete(MCQ_PROMPT + " #unrecorded", task="mcq")
+                missing_raised = False
+            except RuntimeError:
+                missing_raised = True
+    finally:
+        llm.LLM_RECORD_MODE, llm.LLM_RECORD_DIR = saved
+    assert replayed == recorded, "replay differs from the recording"
+    assert p_hits[0] == 1, f"replay called the provider ({p_hits[0]} requests, expected 1)"
+    assert missing_raised, "replay of an unrecorded request did not raise"
+    print("ok: record/replay")
+
+
+def check_fallback():
+    calls = failover.BREAKER_MIN_CALLS + 3
+    with _providers(primary={"error_rate": 1.0}) as (p_hits, f_hits):
+        for i in range(calls):
+            text = llm.llm_complete(f"{MCQ_PROMPT} #{i}", task="mcq")
+            assert gen.parse_mcqs(text), f"call {i}: fallback answer did not parse"
+        state = failover.get_breaker("ollama").state
+    assert state == failover.OPEN, f"primary breaker is {state}, expected open"
+    assert p_hits[0] == failover.BREAKER_MIN_CALLS, (
+        f"primary got {p_hits[0]} requests, expected {failover.BREAKER_MIN_CALLS} before its breaker opened")
+    assert f_hits[0] == calls, f"fallback got {f_hits[0]} requests, expected {calls}"
+    print(f"ok: fallback, primary skipped after {p_hits[0]} failures")
+
+
+def check_hedge():
+    abandoned = metrics.snapshot()["counters"].get("llm.hedge_abandoned", 0)
+    with _providers(primary={"ttft_ms": SLOW_TTFT_MS}, hedge=True) as (_, f_hits):
+        t = time.perf_counter()
+        text = llm.llm_complete(MCQ_PROMPT, task="mcq")
+        secs = time.perf_counter() - t
+        in_use = get_scheduler("ollama").stats()["in_use"]
+    assert gen.parse_mcqs(text), "hedged answer did not parse"
+    assert f_hits[0] == 1, f"hedge did not fire ({f_hits[0]} fallback requests)"
+    assert secs < SLOW_TTFT_MS / 1000 / 2, f"hedged call took {secs:.2f} s against a {SLOW_TTFT_MS} ms primary"
+    assert metrics.snapshot()["counters"].get("llm.hedge_abandoned", 0) == abandoned + 1, "loser not abandoned"
+    assert not in_use, f"the abandoned primary still holds {in_use} scheduler slots"
+    deadline = time.monotonic() + 1.0
+    while llm._abandoned_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not llm._abandoned_running, "the abandoned primary was not interrupted"
+    print(f"ok: hedge answered in {secs:.2f} s against a {SLOW_TTFT_MS / 1000:.0f} s primary, loser stopped")
+
+
+def check_hedge_cap():
+    # Losers that can't be interrupted (older urllib3, or no response yet) keep unwinding
+    saved = llm.LLM_HEDGE_MAX_ABANDONED, llm._interrupt
+    llm.LLM_HEDGE_MAX_ABANDONED, llm._interrupt = 2, lambda resp: None
+    try:
+        with _providers(primary={"ttft_ms": SLOW_TTFT_MS}, hedge=True) as (_, f_hits):
+            while llm._abandoned_running:   # losers of check_hedge still unwinding
+                time.sleep(0.1)
+            times = []
+            for i in range(3):
+                t = time.perf_counter()
+                llm.llm_complete(f"{MCQ_PROMPT} #{i}", task="mcq")
+                times.append(time.perf_counter() - t)
+    finally:
+        llm.LLM_HEDGE_MAX_ABANDONED, llm._interrupt = saved
+    assert f_hits[0] == 2, f"expected 2 hedges before the cap, got {f_hits[0]}"
+    assert max(times[:2]) < SLOW_TTFT_MS / 1000 / 2 <= times[2], f"unexpected latencies {times}"
+    print("ok: no hedge fires while LLM_HEDGE_MAX_ABANDONED losers are unwinding")
+
+
+def check_probe_kept():
+    with _providers(hedge=True) as (_, f_hits):
+        breaker = failover.get_breaker("openrouter")
+        breaker.state, breaker.opened_at = failover.OPEN, time.monotonic() - failover.BREAKER_COOLDOWN_SECS
+        llm.llm_complete(MCQ_PROMPT, task="mcq")
+        probe_spent = breaker._probe_in_flight
+    assert f_hits[0] == 0, "the hedge fired against a fast primary"
+    assert not probe_spent, "the fallback's half-open probe was taken without a call"
+    print("ok: half-open probe kept when the hedge does not fire")
+
+
+def check_fail_fast():
+    with _providers(primary={"ttft_ms": SLOW_TTFT_MS}) as (p_hits, f_hits):
+        for name in ("ollama", "openrouter"):
+            breaker = failover.get_breaker(name)
+            breaker.state, breaker.opened_at = failover.OPEN, time.monotonic()
+        t = time.perf_counter()
+        try:
+            llm.llm_complete(MCQ_PROMPT, task="mcq")
+            raised = False
+        except llm.ProvidersUnavailable:
+            raised = True
+        secs = time.perf_counter() - t
+    assert raised, "no ProvidersUnavailable with every breaker open"
+    assert p_hits[0] == f_hits[0] == 0, f"providers called with open breakers ({p_hits[0]}, {f_hits[0]})"
+    print(f"ok: open breakers fail fast ({secs * 1000:.1f} ms)")
+
+
+def main():
+    check_fake_server()
+    check_record_replay()
+    check_fallback()
+    check_hedge()
+    check_hedge_cap()
+    check_probe_kept()
+    check_fail_fast()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/bench/bench_indexes.py
+"""
+Benchmark: query plans and latency of the route lookups on a synthetic dataset,
+without and with the lookup indexes of migration 11 (backend/migrations.py).
+
+    python -m backend.bench.bench_indexes [--scale 1.0] [--runs 200]
+
+At --scale 1 the dataset has ~1.6M rows (1M attempt answers). Tables are
+created from the models, the lookup indexes dropped, the queries timed; then
+the migration's index step runs and they are timed again.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from statistics import median
+
+from sqlalchemy import text
+
+from backend.db import Base, create_db_engine
+from backend import models  # noqa: F401  (registers the tables)
+from backend.migrations import _LOOKUP_INDEXES, _lookup_indexes
+
+# Per-scale row counts
+USERS = 1000
+DOCS = 20000
+QUIZZES = 20000
+QUESTIONS_PER_QUIZ = 10
+ATTEMPTS = 100000
+ANSWERS_PER_ATTEMPT = 10
+SETS = 20000
+CARDS_PER_SET = 10
+COURSES = 2000
+TOPICS_PER_COURSE = 5
+
+# (name, SQL as issued by the route, params(n) -> dict)
+QUERIES = [
+    ("my_docs", "SELECT id FROM documents WHERE (user_id = :u OR user_id IS NULL) "
+                "ORDER BY created_at DESC LIMIT 200", lambda n: {"u": random.randrange(n["users"])}),
+    ("docs_in_course", "SELECT id FROM documents WHERE course_id = :c AND (user_id = :u OR user_id IS NULL)",
+     lambda n: {"c": random.randrange(n["courses"]), "u": random.randrange(n["users"])}),
+    ("list_summaries", "SELECT id FROM summaries WHERE user_id = :u ORDER BY created_at DESC",
+     lambda n: {"u": random.randrange(n["users"])}),
+    ("list_sets", "SELECT id FROM flashcard_sets WHERE user_id = :u ORDER BY created_at DESC",
+     lambda n: {"u": random.randrange(n["users"])}),
+    ("set_cards", "SELECT id, front, back FROM flashcards WHERE set_id = :s ORDER BY id",
+     lambda n: {"s": random.randrange(n["sets"]) + 1}),
+    ("quiz_questions", "SELECT id FROM questions WHERE quiz_id = :q",
+     lambda n: {"q": random.randrange(n["quizzes"]) + 1}),
+    ("quiz_attempts", "SELECT id FROM attempts WHERE quiz_id = :q ORDER BY created_at DESC LIMIT 50",
+     lambda n: {"q": random.randrange(n["quizzes"]) + 1}),
+    ("attempt_answers", "SELECT id FROM attempt_answers WHERE attempt_id = :a",
+     lambda n: {"a": random.randrange(n["attempts"]) + 1}),
+    ("course_topics", "SELECT id FROM topics WHERE course_id = :c ORDER BY created_at",
+     lambda n: {"c": random.randrange(n["courses"]) + 1}),
+    ("quizzes_of_doc", "SELECT quiz_id FROM quiz_documents WHERE document_id = :d",
+     lambda n: {"d": random.randrange(n["docs"]) + 1}),
+]
+
+
+def _populate(raw, n):
+    t0 = datetime(2024, 1, 1)
+    ts = lambda i: (t0 + timedelta(seconds=i * 37)).isoformat(" ")
+    cur = raw.cursor()
+    cur.executemany("INSERT INTO users (id, name) VALUES (?, ?)", ((i, f"u{i}") for i in range(n["users"])))
+    cur.executemany("INSERT INTO courses (id, user_id, name, created_at) VALUES (?, ?, ?, ?)",
+                    ((i + 1, i % n["users"], f"c{i}", ts(i)) for i in range(n["courses"])))
+    cur.executemany("INSERT INTO topics (user_id, course_id, name, created_at) VALUES (?, ?, ?, ?)",
+                    ((c % n["users"], c + 1, f"t{c}.{k}", ts(c * 10 + k))
+                     for c in range(n["courses"]) for k in range(TOPICS_PER_COURSE)))
+    cur.executemany(
+        "INSERT INTO documents (id, filename, original_name, mime_type, size, user_id, course_id, created_at) "
+        "VALUES (?, ?, ?, 'application/pdf', 1000, ?, ?, ?)",
+        ((i + 1, f"f{i}.pdf", f"doc{i}.pdf", random.randrange(n["users"]), random.randrange(n["courses"]) + 1, ts(i))
+         for i in range(n["docs"])))
+    cur.executemany("INSERT INTO quizzes (id, title, created_at) VALUES (?, ?, ?)",
+                    ((i + 1, f"q{i}", ts(i)) for i in range(n["quizzes"])))
+    cur.executemany("INSERT INTO quiz_documents (quiz_id, document_id) VALUES (?, ?)",
+                    ((i + 1, random.randrange(n["docs"]) + 1) for i in range(n["quizzes"])))
+    cur.executemany(
+        "INSERT INTO questions (quiz_id, qtype, prompt, options, answer) VALUES (?, 'mcq', 'p', '[]', 'A')",
+        ((q + 1,) for q in range(n["quizzes"]) for _ in range(QUESTIONS_PER_QUIZ)))
+    cur.executemany("INSERT INTO attempts (id, quiz_id, created_at, score_pct) VALUES (?, ?, ?, 50)",
+                    ((i + 1, random.randrange(n["quizzes"]) + 1, ts(i)) for i in range(n["attempts"])))
+    cur.executemany(
+        "INSERT INTO attempt_answers (attempt_id, question_id, user_answer, is_correct) VALUES (?, 1, 'A', 1)",
+        ((a + 1,) for a in range(n["attempts"]) for _ in range(ANSWERS_PER_ATTEMPT)))
+    cur.executemany("INSERT INTO summaries (user_id, content, created_at) VALUES (?, 'text', ?)",
+                    ((random.randrange(n["users"]), ts(i)) for i in range(n["docs"])))
+    cur.executemany("INSERT INTO flashcard_sets (id, user_id, title, created_at) VALUES (?, ?, 'set', ?)",
+                    ((i + 1, random.randrange(n["users"]), ts(i)) for i in range(n["sets"])))
+    cur.executemany("INSERT INTO flashcards (set_id, front, back) VALUES (?, 'f', 'b')",
+                    ((s + 1,) for s in range(n["sets"]) for _ in range(CARDS_PER_SET)))
+    raw.commit()
+
+
+def _measure(conn, n, runs):
+    out = {}
+    for name, sql, params in QUERIES:
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params(n)).fetchall()
+        times = []
+        for _ in range(runs):
+            p = params(n)
+            t = time.perf_counter()
+            conn.execute(text(sql), p).fetchall()
+            times.append((time.perf_counter() - t) * 1000)
+        out[name] = (median(times), "; ".join(row[-1] for row in plan))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=float, default=1.0)
+    ap.add_argument("--runs", type=int, default=200)
+    args = ap.parse_args()
+    s = args.scale
+    n = {"users": USERS, "docs": int(DOCS * s), "quizzes": int(QUIZZES * s), "attempts": int(ATTEMPTS * s),
+         "sets": int(SETS * s), "courses": int(COURSES * s)}
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_indexes_"), "bench.sqlite")
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name, _, _ in _LOOKUP_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    t = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        _populate(raw, n)
+    finally:
+        raw.close()
+    with engine.connect() as conn:
+        rows = sum(conn.execute(text(f"SELECT COUNT(*) FROM {tbl}")).scalar() for tbl in Base.metadata.tables)
+    print(f"{rows:,} rows in {time.perf_counter() - t:.1f} s ({path})")
+
+    with engine.connect() as conn:
+        before = _measure(conn, n, args.runs)
+    t = time.perf_counter()
+    with engine.begin() as conn:
+        _lookup_indexes(conn)
+    print(f"migration 11 (indexes + ANALYZE): {time.perf_counter() - t:.1f} s")
+    with engine.connect() as conn:
+        after = _measure(conn, n, args.runs)
+
+    print(f"\n{'query':<16} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    for name, _, _ in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<16} {b:10.3f} {a:9.3f} {b / a if a else 0:7.0f}x")
+    print("\nplans (before -> after):")
+    for name, _, _ in QUERIES:
+        print(f"  {name}:\n    {before[name][1]}\n    {after[name][1]}")
+
+
+if __name__ == "__main__":
+    main()
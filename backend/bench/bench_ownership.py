@@ -0,0 +1,110 @@
+# backend/bench/bench_ownership.py
+"""
+Benchmark: "my quizzes" and the quiz access check, resolved through the
+sources (quiz_documents -> documents) vs the owner column of migration 12
+(backend/migrations.py).
+
+    python -m backend.bench.bench_ownership [--scale 1.0] [--runs 200]
+
+Uses the bench_indexes dataset (lookup indexes in place, quizzes without an
+owner) with one heavy user owning a quarter of the documents and 1% of them
+shared; "my quizzes" is timed for the heavy user. Times the old queries, runs migration 12 (backfill, indexes, ANALYZE) and
+times the new ones.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from statistics import median
+
+from sqlalchemy import text
+
+from backend.db import Base, create_db_engine
+from backend import models  # noqa: F401  (registers the tables)
+from backend.bench.bench_indexes import USERS, DOCS, QUIZZES, ATTEMPTS, SETS, COURSES, _populate
+from backend.migrations import _lookup_indexes, _quiz_owner
+
+HEAVY_USER = 0
+
+# (name, SQL before, SQL after): what the routes issue for each lookup
+QUERIES = [
+    ("my_quizzes",
+     "SELECT DISTINCT q.id, q.created_at FROM quizzes q JOIN quiz_documents qd ON qd.quiz_id = q.id "
+     "JOIN documents d ON d.id = qd.document_id WHERE d.user_id = :u OR d.user_id IS NULL "
+     "ORDER BY q.created_at DESC, q.id DESC LIMIT 101",
+     "SELECT q.id, q.created_at FROM quizzes q WHERE q.user_id = :u OR (q.user_id IS NULL AND EXISTS "
+     "(SELECT 1 FROM quiz_documents qd WHERE qd.quiz_id = q.id)) "
+     "ORDER BY q.created_at DESC, q.id DESC LIMIT 101"),
+    ("quiz_access",
+     "SELECT d.user_id FROM quizzes q JOIN quiz_documents qd ON qd.quiz_id = q.id "
+     "JOIN documents d ON d.id = qd.document_id WHERE q.id = :q",
+     "SELECT user_id FROM quizzes WHERE id = :q"),
+    ("attempt_access",
+     "SELECT d.user_id FROM attempts a JOIN quiz_documents qd ON qd.quiz_id = a.quiz_id "
+     "JOIN documents d ON d.id = qd.document_id WHERE a.id = :a",
+     "SELECT user_id FROM attempts WHERE id = :a"),
+]
+
+
+def _measure(conn, n, runs, which):
+    out = {}
+    for name, *sqls in QUERIES:
+        sql = sqls[which]
+        params = lambda: {"u": HEAVY_USER, "q": random.randrange(n["quizzes"]) + 1,
+                          "a": random.randrange(n["attempts"]) + 1}
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params()).fetchall()
+        times = []
+        for _ in range(runs):
+            p = params()
+            t = time.perf_counter()
+            conn.execute(text(sql), p).fetchall()
+            times.append((time.perf_counter() - t) * 1000)
+        out[name] = (median(times), "; ".join(row[-1] for row in plan))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=float, default=1.0)
+    ap.add_argument("--runs", type=int, default=200)
+    args = ap.parse_args()
+    s = args.scale
+    n = {"users": USERS, "docs": int(DOCS * s), "quizzes": int(QUIZZES * s), "attempts": int(ATTEMPTS * s),
+         "sets": int(SETS * s), "courses": int(COURSES * s)}
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_ownership_"), "bench.sqlite")
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    raw = engine.raw_connection()
+    try:
+        _populate(raw, n)
+    finally:
+        raw.close()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE quizzes SET user_id = NULL"))   # as before migration 12
+        conn.execute(text("UPDATE documents SET user_id = :u WHERE id % 4 = 0"), {"u": HEAVY_USER})
+        conn.execute(text("UPDATE documents SET user_id = NULL WHERE id % 100 = 1"))
+        _lookup_indexes(conn)
+
+    with engine.connect() as conn:
+        before = _measure(conn, n, args.runs, 0)
+    t = time.perf_counter()
+    with engine.begin() as conn:
+        _quiz_owner(conn)
+    print(f"migration 12 (backfill {n['quizzes']:,} quizzes, {n['attempts']:,} attempts + indexes): "
+          f"{time.perf_counter() - t:.1f} s")
+    with engine.connect() as conn:
+        after = _measure(conn, n, args.runs, 1)
+
+    print(f"\n{'query':<16} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    for name, *_ in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<16} {b:10.3f} {a:9.3f} {b / a if a else 0:7.0f}x")
+    print("\nplans (before -> after):")
+    for name, *_ in QUERIES:
+        print(f"  {name}:\n    {before[name][1]}\n    {after[name][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# backend/bench/bench_pagination.py
+"""
+Benchmark: latency of the summaries list for one user with a large library,
+page 1 vs deep pages, keyset cursor (backend/pagination.py) vs LIMIT/OFFSET.
+
+    python -m backend.bench.bench_pagination [--items 20000] [--limit 100]
+
+The user owns --items summaries (among 10 users' worth of rows); each request
+goes through the Flask test client, so serialization is included.
+"""
+import os
+import time
+import argparse
+import tempfile
+from statistics import median
+
+from sqlalchemy import text
+
+from backend import db as dbmod
+from backend.bench.bench_queries import _app
+from backend.pagination import decode_cursor
+from backend.utils_auth import create_jwt
+
+USERS = 10
+RUNS = 20
+
+
+def _seed(items):
+    raw = dbmod.get_engine().raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany("INSERT INTO users (id, name) VALUES (?, ?)", ((u, f"u{u}") for u in range(1, USERS + 1)))
+        cur.executemany(
+            "INSERT INTO summaries (user_id, title, content, created_at) VALUES (?, 'Summary', ?, ?)",
+            ((i % USERS + 1, "text " * 200, f"2024-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}")
+             for i in range(items * USERS)),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _time(client, url, headers):
+    times = []
+    for _ in range(RUNS):
+        t = time.perf_counter()
+        resp = client.get(url, headers=headers)
+        times.append((time.perf_counter() - t) * 1000)
+    return median(times), len(resp.data)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=20000)
+    ap.add_argument("--limit", type=int, default=100)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_pagination_"), "bench.sqlite")
+    app = _app(f"sqlite:///{path}")
+    _seed(args.items)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(1, os.getenv('SECRET_KEY', 'dev'))}"}
+
+    # Cursor of the page at ~90% depth, by walking the cursors once
+    depth = int(args.items * 0.9) // args.limit
+    cursor = None
+    for _ in range(depth):
+        cursor = client.get(f"/api/summaries/?limit={args.limit}" + (f"&cursor={cursor}" if cursor else ""),
+                            headers=headers).get_json()["next_cursor"]
+
+    def sql_ms(where, params):
+        # The page's SQL alone: keyset vs what an OFFSET-paged endpoint would run
+        sql = ("SELECT id, title, content, created_at FROM summaries WHERE user_id = 1 " + where +
+               " ORDER BY created_at DESC, id DESC LIMIT :l OFFSET :o")
+        with dbmod.get_engine().connect() as conn:
+            t = time.perf_counter()
+            for _ in range(RUNS):
+                conn.execute(text(sql), {"l": args.limit, "o": 0, **params}).fetchall()
+            return (time.perf_counter() - t) * 1000 / RUNS
+
+    print(f"{args.items} summaries for the user, pages of {args.limit}")
+    print(f"{'request':<34} {'ms':>8} {'bytes':>10}")
+    for label, url in [
+        ("keyset page 1", f"/api/summaries/?limit={args.limit}"),
+        (f"keyset page {depth + 1}", f"/api/summaries/?limit={args.limit}&cursor={cursor}"),
+        ("keyset page 1 + total", f"/api/summaries/?limit={args.limit}&count=1"),
+        ("largest page (MAX_PAGE_SIZE)", "/api/summaries/?limit=1000000"),
+    ]:
+        ms, size = _time(client, url, headers)
+        print(f"{label:<34} {ms:8.2f} {size:10,d}")
+    ts, last_id = decode_cursor(cursor)
+    print(f"{'SQL only: page 1':<34} {sql_ms('', {}):8.2f}")
+    print(f"{f'SQL only: keyset page {depth + 1}':<34} "
+          f"{sql_ms('AND (created_at, id) < (:ts, :id)', {'ts': ts, 'id': last_id}):8.2f}")
+    print(f"{f'SQL only: OFFSET page {depth + 1}':<34} {sql_ms('', {'o': depth * args.limit}):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
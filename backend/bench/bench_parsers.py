@@ -0,0 +1,213 @@
+# backend/bench/bench_parsers.py
+"""
+Microbenchmark: line-oriented parsers (services/parsing.py) vs the old DOTALL regexes.
+
+    python -m backend.bench.bench_parsers
+
+1. Parity: on well-formed model output both implementations must return the same items.
+2. Known differences: real-world outputs the regexes dropped or mangled, pinned to what
+   the line parsers return now.
+3. Scaling: time per call on well-formed and adversarial outputs from ~12k to ~100k chars.
+   The line parsers should grow linearly; the regexes go quadratic on adversarial input.
+
+The regex parsers live here only as the reference: they backtrack badly on long or
+malformed output, so the app uses services/parsing.py.
+"""
+import re
+import time
+from typing import List, Dict
+
+from backend.services import generate as gen
+from backend.services.fake_llm import fake_completion
+
+_Q_BLOCK = re.compile(
+    r"""
+    Q:\s*(?P<prompt>.+?)\s* # question text
+    \n+\s*A\)\s*(?P<A>.+?)\s* # option A
+    \n+\s*B\)\s*(?P<B>.+?)\s* # option B
+    \n+\s*C\)\s*(?P<C>.+?)\s* # option C
+    \n+\s*D\)\s*(?P<D>.+?)\s* # option D
+    \n+\s*Answer:\s*(?P<ans>[ABCD])  # Answer letter
+    (?:\n+\s*Explanation:\s*(?P<exp>.+?))?   # optional Explanation
+    (?=(?:\n+---|\n+Q:|\Z))          # stop at --- or next Q: or end
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+
+_TF_BLOCK = re.compile(
+    r"""
+    Q:\s*(?P<prompt>.+?)\s*
+    \n+\s*Answer:\s*(?P<ans>True|False)\s*
+    (?:\n+\s*Explanation:\s*(?P<exp>.+?))?
+    (?=(?:\n+---|\n+Q:|\Z))
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+
+_SA_BLOCK = re.compile(
+    r"""
+    Q:\s*(?P<prompt>.+?)\s*
+    \n+\s*Answer:\s*(?P<ans>.+?)\s*
+    (?:\n+\s*Explanation:\s*(?P<exp>.+?))?
+    (?=(?:\n+---|\n+Q:|\Z))
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+
+_FLASHCARD_BLOCK = re.compile(
+    r"Q:\s*(.+?)\s*A:\s*(.+?)(?=\nQ:|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def parse_mcqs_regex(raw: str) -> List[Dict]:
+    if not raw:
+        return []
+    out: List[Dict] = []
+    for m in _Q_BLOCK.finditer(raw.strip()):
+        opts = [m.group(k).strip() for k in "ABCD"]
+        ans_letter = m.group("ans").strip().upper()
+        out.append({
+            "prompt": m.group("prompt").strip(),
+            "options": opts,
+            "answer": opts[ord(ans_letter) - ord("A")],
+            "explanation": (m.group("exp") or "").strip(),
+        })
+    return out
+
+
+def parse_tf_regex(raw: str) -> List[Dict]:
+    if not raw:
+        return []
+    return [{
+        "prompt": m.group("prompt").strip(),
+        "options": ["True", "False"],
+        "answer": m.group("ans").strip().capitalize(),
+        "explanation": (m.group("exp") or "").strip(),
+    } for m in _TF_BLOCK.finditer(raw.strip())]
+
+
+def parse_sa_regex(raw: str) -> List[Dict]:
+    if not raw:
+        return []
+    return [{
+        "prompt": m.group("prompt").strip(),
+        "options": [],
+        "answer": m.group("ans").strip(),
+        "explanation": (m.group("exp") or "").strip(),
+    } for m in _SA_BLOCK.finditer(raw.strip())]
+
+
+def parse_flashcards_regex(raw: str) -> List[Dict[str, str]]:
+    if not raw:
+        return []
+    cards: List[Dict[str, str]] = []
+    for m in _FLASHCARD_BLOCK.finditer(raw.replace("\r\n", "\n")):
+        front, back = m.group(1).strip(), m.group(2).strip()
+        if front and back:
+            cards.append({"front": front, "back": back})
+    return cards
+
+
+SOURCE = '"""' + ("Mitochondria produce ATP through oxidative phosphorylation in the inner membrane. " * 40) + '"""'
+
+FORMATS = {
+    # name: (prompt that makes the fake LLM emit this format, line parser, regex parser, adversarial unit)
+    "mcq": (f"{SOURCE} Return exactly 5 MCQs", gen.parse_mcqs, parse_mcqs_regex,
+            "Q: Which statement is correct about the membrane\nA) an option that never ends\n"),
+    "tf": (f"{SOURCE} Return exactly 5 True/False questions", gen.parse_tf, parse_tf_regex,
+           "Q: The membrane produces ATP without an answer line\nAnswer: maybe\n"),
+    "sa": (f"{SOURCE} Return exactly 5 Short Answer questions", gen.parse_sa, parse_sa_regex,
+           "Q: What does the membrane do and why\nExplanation: dangling text\n"),
+    "flashcards": (f"{SOURCE} Create 5 concise flashcards", gen.parse_flashcards, parse_flashcards_regex,
+                   "Q: front text without a back side\n"),
+}
+
+# (name, line parser, regex parser, model output, what the line parser returns, what the regex returned)
+KNOWN_DIFFERENCES = [
+    ("mcq answer letter followed by the option", gen.parse_mcqs, parse_mcqs_regex,
+     "Q: What is 1 + 2?\nA) 1\nB) 2\nC) 3\nD) 4\nAnswer: C) 3\nExplanation: Addition.",
+     [{"prompt": "What is 1 + 2?", "options": ["1", "2", "3", "4"], "answer": "3",
+       "explanation": "Addition."}],
+     []),
+    ("tf answer followed by a justification", gen.parse_tf, parse_tf_regex,
+     "Q: The sky is green.\nAnswer: False, it is blue\nExplanation: Rayleigh scattering.",
+     [{"prompt": "The sky is green.", "options": ["True", "False"], "answer": "False",
+       "explanation": "Rayleigh scattering."}],
+     []),
+    ("flashcards without a trailing ---", gen.parse_flashcards, parse_flashcards_regex,
+     "Q: What is osmosis?\nA: Diffusion of water.\nQ: What is ATP?\nA: The energy currency of the cell.",
+     [{"front": "What is osmosis?", "back": "Diffusion of water."},
+      {"front": "What is ATP?", "back": "The energy currency of the cell."}],
+     [{"front": "What is osmosis?", "back": "Diffusion of water."},
+      {"front": "What is ATP?", "back": "The energy currency of the cell."}]),
+    ("flashcards separated by ---", gen.parse_flashcards, parse_flashcards_regex,
+     "Q: What is osmosis?\nA: Diffusion of water.\n---\nQ: What is ATP?\nA: The energy currency of the cell.\n---",
+     [{"front": "What is osmosis?", "back": "Diffusion of water."},
+      {"front": "What is ATP?", "back": "The energy currency of the cell."}],
+     [{"front": "What is osmosis?", "back": "Diffusion of water.\n---"},
+      {"front": "What is ATP?", "back": "The energy currency of the cell.\n---"}]),
+]
+
+SIZES = [12_500, 25_000, 50_000, 100_000]
+REGEX_BUDGET_SECS = 5.0  # stop timing the regex once a single call exceeds this
+
+
+def _strip_separators(cards):
+    # The regex flashcard parser leaks the "---" separator into the back side
+    return [{"front": c["front"], "back": c["back"].rstrip("-").strip()} for c in cards]
+
+
+def _grow(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def _time(fn, text: str) -> float:
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+
+def check_parity():
+    for name, (prompt, line_parser, regex_parser, _) in FORMATS.items():
+        for seed in range(20):
+            raw = fake_completion(f"{prompt} #{seed}")
+            new, old = line_parser(raw), regex_parser(raw)
+            if name == "flashcards":
+                old = _strip_separators(old)
+            assert new == old, f"{name} parity mismatch for seed {seed}:\n{new}\n!=\n{old}"
+            assert new, f"{name}: nothing parsed for seed {seed}"
+        print(f"parity ok: {name}")
+
+
+def check_known_differences():
+    for name, line_parser, regex_parser, raw, expected, regex_expected in KNOWN_DIFFERENCES:
+        got = line_parser(raw)
+        assert got == expected, f"{name}: line parser returned\n{got}\nexpected\n{expected}"
+        old = regex_parser(raw)
+        assert old == regex_expected, f"{name}: regex parser returned\n{old}\nexpected\n{regex_expected}"
+        print(f"pinned ok: {name}")
+
+
+def run_scaling():
+    print(f"\n{'format':<11}{'input':<12}{'chars':>8}{'line ms':>10}{'regex ms':>12}")
+    for name, (prompt, line_parser, regex_parser, adversarial_unit) in FORMATS.items():
+        well_formed_unit = fake_completion(prompt) + "\n\n---\n\n"
+        for label, unit in (("well-formed", well_formed_unit), ("adversarial", adversarial_unit)):
+            regex_over_budget = False
+            for size in SIZES:
+                text = _grow(unit, size)
+                line_ms = _time(line_parser, text) * 1000
+                if regex_over_budget:
+                    regex_col = "skipped"
+                else:
+                    regex_secs = _time(regex_parser, text)
+                    regex_over_budget = regex_secs > REGEX_BUDGET_SECS
+                    regex_col = f"{regex_secs * 1000:.1f}"
+                print(f"{name:<11}{label:<12}{size:>8}{line_ms:>10.1f}{regex_col:>12}")
+
+
+if __name__ == "__main__":
+    check_parity()
+    check_known_differences()
+    run_scaling()
@@ -0,0 +1,59 @@
+# backend/bench/bench_progress.py
+"""
+Microbenchmark: cost of per-token progress reporting (services/progress.py).
+
+    python -m backend.bench.bench_progress
+
+Times progress.tokens() with no reporter bound (the request path), with a
+reporter whose sink does nothing, and with a reporter writing a job row in
+SQLite the way the worker does, and compares each with the time between tokens
+of a fast local model (~100 tokens/s).
+"""
+import os
+import json
+import time
+import sqlite3
+import tempfile
+
+from backend.services import progress
+
+TOKENS = 200_000
+TOKEN_INTERVAL_SECS = 1 / 100
+
+
+def _per_call(label: str, n: int = TOKENS) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        progress.tokens()
+    per = (time.perf_counter() - start) / n
+    print(f"{label:<28} {per * 1e9:8.0f} ns/token   {per / TOKEN_INTERVAL_SECS * 100:.4f}% of a token interval")
+    return per
+
+
+def _sqlite_sink():
+    path = os.path.join(tempfile.mkdtemp(), "progress.sqlite")
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY, progress TEXT, progress_seq INTEGER)")
+    conn.execute("INSERT INTO jobs VALUES (1, NULL, 0)")
+    conn.commit()
+    writes = [0]
+
+    def write(state):
+        conn.execute("UPDATE jobs SET progress = ?, progress_seq = progress_seq + 1 WHERE id = 1", (json.dumps(state),))
+        conn.commit()
+        writes[0] += 1
+    return write, writes
+
+
+if __name__ == "__main__":
+    _per_call("no reporter")
+    with progress.reporting(lambda state: None):
+        _per_call("reporter, no-op sink")
+
+    sink, writes = _sqlite_sink()
+    with progress.reporting(sink):
+        start = time.perf_counter()
+        _per_call("reporter, sqlite sink")
+        elapsed = time.perf_counter() - start
+    print(f"sqlite sink wrote {writes[0]} times in {elapsed:.2f}s "
+          f"(throttled to one write per {progress.PROGRESS_FLUSH_SECS}s)")
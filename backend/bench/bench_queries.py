@@ -0,0 +1,132 @@
+# backend/bench/bench_queries.py
+"""
+Query-count check for the list endpoints: the number of SQL statements per
+request must not grow with the number of items listed (no N+1).
+
+    python -m backend.bench.bench_queries [--sizes 5 50 200]
+
+Seeds one user with --sizes[i] documents, quizzes (with attempts), summaries
+and flashcard sets on a fresh database per size, calls each endpoint through
+the Flask test client and counts statements on the engine. Exits non-zero if
+any endpoint's count differs between sizes or from its expected count.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from flask import Flask
+from sqlalchemy import event
+
+from backend import db as dbmod
+from backend.utils_auth import create_jwt
+
+# (name, url, statements per request: the page query, plus one selectin load of the sources where listed)
+ENDPOINTS = [
+    ("my_docs", "/api/files/mine", 1),
+    ("my_quizzes", "/api/quizzes/mine", 2),
+    ("list_summaries", "/api/summaries/", 2),
+    ("list_sets", "/api/flashcards/", 2),
+]
+CARDS_PER_SET = 10
+ATTEMPTS_PER_QUIZ = 3
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements executed on `engine` inside the block: `with count_queries(e) as n: ...; n[0]`."""
+    n = [0]
+
+    def before(*_):
+        n[0] += 1
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield n
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def _app(database_url):
+    from backend.files import bp as files_bp
+    from backend.routes_quizzes import bp as quizzes_bp
+    from backend.routes_summaries import bp as summaries_bp
+    from backend.routes_flashcards import bp as flashcards_bp
+
+    dbmod.init_db(SimpleNamespace(config={"DATABASE_URL": database_url}))
+    app = Flask(__name__)
+    app.teardown_appcontext(dbmod.close_db)
+    app.register_blueprint(files_bp, url_prefix="/api/files")
+    app.register_blueprint(quizzes_bp, url_prefix="/api/quizzes")
+    app.register_blueprint(summaries_bp, url_prefix="/api/summaries")
+    app.register_blueprint(flashcards_bp, url_prefix="/api/flashcards")
+    return app
+
+
+def _seed(size):
+    from backend.models import (User, Course, Topic, Document, Quiz, Question, Attempt,
+                                Summary, FlashcardSet, Flashcard)
+    with dbmod.session_scope() as db:
+        user = User(name="bench", username="bench")
+        db.add(user)
+        db.flush()
+        course = Course(user_id=user.id, name="Course")
+        db.add(course)
+        db.flush()
+        topic = Topic(user_id=user.id, course_id=course.id, name="Topic")
+        db.add(topic)
+        for i in range(size):
+            doc = Document(filename=f"f{i}.pdf", original_name=f"doc{i}.pdf", mime_type="application/pdf",
+                           size=1000, user_id=user.id, course_id=course.id, topic_id=topic.id)
+            quiz = Quiz(user_id=user.id, title=f"Quiz {i}", sources=[doc])
+            quiz.questions = [Question(qtype="mcq", prompt="p", options="[]", answer="A")]
+            quiz.attempts = [Attempt(user_id=user.id, score_pct=50) for _ in range(ATTEMPTS_PER_QUIZ)]
+            fs = FlashcardSet(user_id=user.id, title=f"Set {i}", sources=[doc])
+            fs.cards = [Flashcard(front="f", back="b") for _ in range(CARDS_PER_SET)]
+            db.add_all([doc, quiz, fs, Summary(user_id=user.id, content="text " * 50, sources=[doc])])
+        return user.id
+
+
+def _measure(size):
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_queries_"), "bench.sqlite")
+    app = _app(f"sqlite:///{path}")
+    user_id = _seed(size)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(user_id, os.getenv('SECRET_KEY', 'dev'))}"}
+    out = {}
+    for name, url, _ in ENDPOINTS:
+        with count_queries(dbmod.get_engine()) as n:
+            t = time.perf_counter()
+            resp = client.get(url, headers=headers)
+            ms = (time.perf_counter() - t) * 1000
+        assert resp.status_code == 200, (url, resp.status_code)
+        out[name] = (n[0], len(resp.get_json()["items"]), ms)
+    dbmod.get_engine().dispose()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 200])
+    args = ap.parse_args()
+
+    results = {size: _measure(size) for size in args.sizes}
+    print(f"{'endpoint':<16}" + "".join(f" {f'{s} items':>20}" for s in args.sizes))
+    failures = []
+    for name, _, expected in ENDPOINTS:
+        cells = [results[s][name] for s in args.sizes]
+        print(f"{name:<16}" + "".join(f" {f'{q} queries {ms:6.1f} ms':>20}" for q, _, ms in cells))
+        if len({q for q, _, _ in cells}) > 1:
+            failures.append(f"{name}: query count grows with the number of items (N+1)")
+        elif cells[0][0] != expected:
+            failures.append(f"{name}: {cells[0][0]} queries per request, expected {expected}")
+    if failures:
+        print("FAIL:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: query counts are constant and as expected")
+
+
+if __name__ == "__main__":
+    main()
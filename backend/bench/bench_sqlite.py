@@ -0,0 +1,131 @@
+# backend/bench/bench_sqlite.py
+"""
+Benchmark: SQLite read/write throughput under worker-style concurrency, with
+SQLAlchemy's defaults vs the tuned engine (db.create_db_engine: WAL,
+synchronous=NORMAL, busy_timeout, cache/mmap, pool) plus run_in_session retries.
+
+    python -m backend.bench.bench_sqlite [--writers 8] [--readers 4] [--seconds 5]
+
+Writers stand in for job workers saving a quiz attempt: one short transaction
+inserting an attempt and its answers. Readers stand in for page loads: list a
+user's recent attempts with their answer counts. Each mode gets a fresh
+database file in a temp directory.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from backend import db as dbmod
+
+ANSWERS_PER_ATTEMPT = 10
+USERS = 20
+
+SCHEMA = [
+    "CREATE TABLE attempts (id INTEGER PRIMARY KEY, user_id INTEGER, score INTEGER, created_at REAL)",
+    "CREATE TABLE answers (id INTEGER PRIMARY KEY, attempt_id INTEGER, question_id INTEGER, answer TEXT)",
+    "CREATE INDEX ix_attempts_user ON attempts (user_id, created_at)",
+    "CREATE INDEX ix_answers_attempt ON answers (attempt_id)",
+]
+
+
+def _write(conn):
+    res = conn.execute(
+        text("INSERT INTO attempts (user_id, score, created_at) VALUES (:u, :s, :t)"),
+        {"u": random.randrange(USERS), "s": random.randrange(100), "t": time.time()},
+    )
+    conn.execute(
+        text("INSERT INTO answers (attempt_id, question_id, answer) VALUES (:a, :q, :ans)"),
+        [{"a": res.lastrowid, "q": q, "ans": "x" * 200} for q in range(ANSWERS_PER_ATTEMPT)],
+    )
+
+
+def _read(conn):
+    conn.execute(text(
+        "SELECT a.id, a.score, COUNT(b.id) FROM attempts a LEFT JOIN answers b ON b.attempt_id = a.id "
+        "WHERE a.user_id = :u GROUP BY a.id ORDER BY a.created_at DESC LIMIT 20"
+    ), {"u": random.randrange(USERS)}).fetchall()
+
+
+def _run(tuned: bool, writers: int, readers: int, seconds: float):
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_sqlite_"), "bench.sqlite")
+    url = f"sqlite:///{path}"
+    engine = dbmod.create_db_engine(url) if tuned else create_engine(url, future=True)
+    with engine.begin() as conn:
+        for stmt in SCHEMA:
+            conn.execute(text(stmt))
+
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    write_ms = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def write_txn():
+        with engine.begin() as conn:
+            _write(conn)
+
+    def writer():
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                if tuned:
+                    dbmod.retry_on_busy(write_txn)
+                else:
+                    write_txn()
+                key = "writes"
+            except OperationalError:
+                key = "locked"
+            with lock:
+                counts[key] += 1
+                if key == "writes":
+                    write_ms.append((time.perf_counter() - t) * 1000)
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    _read(conn)
+                key = "reads"
+            except OperationalError:
+                key = "locked"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    write_ms.sort()
+    p95 = write_ms[int(len(write_ms) * 0.95)] if write_ms else 0.0
+    return counts, p95
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=8)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+
+    print(f"{args.writers} writer threads ({ANSWERS_PER_ATTEMPT} answers/attempt), "
+          f"{args.readers} reader threads, {args.seconds:.0f} s per mode")
+    print(f"{'mode':<8} {'writes/s':>9} {'reads/s':>9} {'locked':>7} {'write p95 ms':>13}")
+    for name in ("default", "tuned"):
+        counts, p95 = _run(name == "tuned", args.writers, args.readers, args.seconds)
+        print(f"{name:<8} {counts['writes'] / args.seconds:9.0f} {counts['reads'] / args.seconds:9.0f} "
+              f"{counts['locked']:7d} {p95:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
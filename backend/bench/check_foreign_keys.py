@@ -0,0 +1,112 @@
+# backend/bench/check_foreign_keys.py
+"""
+Check: deletes through the routes with SQLite foreign keys enforced
+(backend/db.py turns them on for every connection).
+
+    python -m backend.bench.check_foreign_keys
+
+Seeds a user with a course, topic, document, summary, flashcard set and a
+quiz whose questions have cached short-answer verdicts and an attempt, then:
+
+1. deleting a question removes its grading_cache rows (ON DELETE CASCADE), so a
+   new question reusing its rowid starts with no verdicts,
+2. every delete route (quiz, summary, flashcard set, topic, course, document)
+   succeeds and leaves foreign_key_check clean.
+
+Exits non-zero on the first failed check.
+"""
+import os
+import tempfile
+
+from sqlalchemy import text
+
+from backend import db as dbmod
+from backend.bench.bench_queries import _app
+from backend.utils_auth import create_jwt
+
+
+def _seed():
+    from backend.models import (User, Course, Topic, Document, Quiz, Question, Attempt, AttemptAnswer,
+                                GradingCache, Summary, FlashcardSet, Flashcard)
+    with dbmod.session_scope() as db:
+        user = User(name="check", username="check")
+        db.add(user)
+        db.flush()
+        course = Course(user_id=user.id, name="Course")
+        topic = Topic(user_id=user.id, course=course, name="Topic")
+        doc = Document(filename="missing.txt", original_name="notes.txt", mime_type="text/plain", size=1,
+                       user_id=user.id, course=course, topic=topic)
+        quiz = Quiz(user_id=user.id, title="Quiz", sources=[doc])
+        questions = [Question(qtype="short_answer", prompt=f"Q{i}?", options="", answer="A") for i in range(3)]
+        quiz.questions = questions
+        attempt = Attempt(user_id=user.id, quiz=quiz, score_pct=0)
+        db.add_all([course, topic, doc, quiz, attempt,
+                    Summary(user_id=user.id, title="S", content="text", sources=[doc]),
+                    FlashcardSet(user_id=user.id, title="Set", sources=[doc],
+                                 cards=[Flashcard(front="f", back="b")])])
+        db.flush()
+        for q in questions:
+            db.add(GradingCache(question_id=q.id, answer_hash="wrong", is_correct=True))
+        db.add(AttemptAnswer(attempt_id=attempt.id, question_id=questions[0].id, user_answer="x", is_correct=False))
+        return user.id, {"quiz": quiz.id, "course": course.id, "topic": topic.id, "doc": doc.id,
+                         "questions": [q.id for q in questions]}
+
+
+def _cache_rows(question_id):
+    with dbmod.get_engine().connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM grading_cache WHERE question_id = :q"),
+                            {"q": question_id}).scalar()
+
+
+def check_question_delete(ids):
+    from backend.models import Question, GradingCache
+    last = ids["questions"][-1]
+    with dbmod.session_scope() as db:
+        db.delete(db.get(Question, last))
+    assert _cache_rows(last) == 0, "deleting a question left its grading_cache rows"
+
+    with dbmod.session_scope() as db:
+        q = Question(quiz_id=ids["quiz"], qtype="short_answer", prompt="New?", options="", answer="B")
+        db.add(q)
+        db.flush()
+        inherited = db.query(GradingCache).filter_by(question_id=q.id).count()
+    assert inherited == 0, f"a new question inherited {inherited} cached verdicts"
+    print("ok: question delete cascades to grading_cache")
+
+
+def check_delete_routes(app, user_id, ids):
+    from backend.routes_courses import bp as courses_bp
+    from backend.routes_topics import bp as topics_bp
+    app.register_blueprint(courses_bp, url_prefix="/api/courses")
+    app.register_blueprint(topics_bp, url_prefix="/api/topics")
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(user_id, os.getenv('SECRET_KEY', 'dev'))}"}
+
+    with dbmod.session_scope() as db:
+        from backend.models import Summary, FlashcardSet
+        summary_id = db.query(Summary.id).scalar()
+        set_id = db.query(FlashcardSet.id).scalar()
+    for url in (f"/api/quizzes/{ids['quiz']}", f"/api/summaries/{summary_id}", f"/api/flashcards/set/{set_id}",
+                f"/api/topics/{ids['topic']}", f"/api/courses/{ids['course']}", f"/api/files/{ids['doc']}"):
+        resp = client.delete(url, headers=headers)
+        assert resp.status_code == 200, (url, resp.status_code, resp.get_json())
+
+    with dbmod.get_engine().connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1, "foreign keys are off"
+        problems = conn.execute(text("PRAGMA foreign_key_check")).fetchall()
+        leftovers = conn.execute(text("SELECT COUNT(*) FROM grading_cache")).scalar()
+    assert not problems, f"foreign_key_check after the deletes: {problems}"
+    assert leftovers == 0, f"{leftovers} grading_cache rows left after deleting the quiz"
+    print("ok: delete routes with foreign keys enforced")
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="check_fk_"), "check.sqlite")
+    app = _app(f"sqlite:///{path}")
+    user_id, ids = _seed()
+    check_question_delete(ids)
+    check_delete_routes(app, user_id, ids)
+
+
+if __name__ == "__main__":
+    main()
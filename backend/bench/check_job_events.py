@@ -0,0 +1,74 @@
+# backend/bench/check_job_events.py
+"""
+Check: the per-worker cap on job event streams (routes_jobs.py).
+
+    python -m backend.bench.check_job_events
+
+With a queued job (no worker runs here, so its streams stay open):
+
+1. JOB_EVENTS_MAX_STREAMS streams open, the next one gets 429 with Retry-After
+   and the job's state, so the client falls back to polling,
+2. closing a stream (the client going away) frees its slot for a new one,
+3. a stream that ends on its own (the job finished) frees its slot too.
+
+Exits non-zero on the first failed check.
+"""
+import os
+import tempfile
+
+from backend import db as dbmod
+from backend import jobs, routes_jobs
+from backend.bench.bench_queries import _app
+from backend.utils_auth import create_jwt
+
+
+def _open(client, url, headers):
+    resp = client.get(url, headers=headers, buffered=False)
+    if resp.status_code == 200:
+        next(resp.response)   # "retry:" line: the stream is running
+    return resp
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="check_events_"), "check.sqlite")
+    app = _app(f"sqlite:///{path}")
+    app.register_blueprint(routes_jobs.bp, url_prefix="/api/jobs")
+    from backend.models import User, Job
+    with dbmod.session_scope() as db:
+        user = User(name="check", username="check")
+        db.add(user)
+        db.flush()
+        job_id = jobs.enqueue(db, "summary_audio", user.id, {}).id
+        user_id = user.id
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt(user_id, os.getenv('SECRET_KEY', 'dev'))}"}
+    url = f"/api/jobs/{job_id}/events"
+    cap = routes_jobs.JOB_EVENTS_MAX_STREAMS
+
+    streams = [_open(client, url, headers) for _ in range(cap)]
+    assert all(s.status_code == 200 for s in streams), [s.status_code for s in streams]
+    refused = _open(client, url, headers)
+    assert refused.status_code == 429, f"stream {cap + 1} got {refused.status_code}, expected 429"
+    assert refused.headers.get("Retry-After"), "429 without Retry-After"
+    assert refused.get_json()["status"] == "queued", refused.get_json()
+    print(f"ok: stream {cap + 1} refused with 429 at {cap} open streams")
+
+    streams.pop().close()
+    reopened = _open(client, url, headers)
+    assert reopened.status_code == 200, f"a closed stream's slot was not freed ({reopened.status_code})"
+    streams.append(reopened)
+    print("ok: closing a stream frees its slot")
+
+    with dbmod.session_scope() as db:
+        db.get(Job, job_id).status = "succeeded"
+    for s in streams:
+        body = b"".join(s.response)
+        assert b"event: done" in body, body
+        s.close()
+    assert _open(client, url, headers).status_code == 200, "finished streams did not free their slots"
+    print("ok: finished streams free their slots")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 # backend/db.py
 import os
+import time
+import random
+from contextlib import contextmanager
 from flask import g
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 
 # Define Base here
@@ -10,6 +14,75 @@ Base = declarative_base()
 _engine = None
 _Session = None
 
+# --- SQLite tuning (applied to every connection; see create_db_engine) ---
+# WAL lets readers run alongside the single writer; NORMAL sync is durable across
+# app crashes and only loses the last commits on power loss in WAL mode.
+SQLITE_WAL = os.getenv("SQLITE_WAL", "1") == "1"
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))   # wait for the write lock
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "32768"))                # page cache per connection
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Whole write units retried by run_in_session() when the lock is still busy after the timeout
+DB_BUSY_RETRIES = int(os.getenv("DB_BUSY_RETRIES", "4"))
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    if SQLITE_WAL:
+        cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    # Off by default in SQLite; ON DELETE CASCADE / SET NULL in the models rely on it
+    cur.execute("PRAGMA foreign_keys=ON")
+    cur.close()
+
+
+def create_db_engine(database_url: str):
+    """
+    The app's engine. For a SQLite file: pragmas above on every new connection and
+    a connection pool sized for worker threads (SQLite connections are cheap; the
+    pool just avoids reopening the file and re-running the pragmas).
+
+    Write transactions stay short because pysqlite only opens one at the first
+    INSERT/UPDATE/DELETE, i.e. at flush/commit time, not while a handler waits on
+    the LLM with its session open.
+    """
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, future=True)
+    if ":memory:" in database_url or database_url in ("sqlite://", "sqlite:///"):
+        engine = create_engine(database_url, future=True)
+    else:
+        engine = create_engine(
+            database_url,
+            future=True,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            connect_args={"check_same_thread": False},
+        )
+    event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def is_busy_error(e: Exception) -> bool:
+    msg = str(getattr(e, "orig", e)).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def retry_on_busy(fn, retries: int = DB_BUSY_RETRIES):
+    """Call fn(); if SQLite is still locked after busy_timeout, back off and call it again."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+            time.sleep(min(2.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
 def init_db(app):
     """Initialize engine/session and create tables."""
     global _engine, _Session
@@ -17,63 +90,22 @@ def init_db(app):
     db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "app.sqlite"))
     database_url = app.config.get("DATABASE_URL", f"sqlite:///{db_path}")
 
-    _engine = create_engine(database_url, future=True)
+    _engine = create_db_engine(database_url)
     _Session = scoped_session(
         sessionmaker(bind=_engine, autoflush=False, autocommit=False, future=True)
     )
 
     # IMPORT HERE to avoid circular import
     from backend import models  # noqa: F401
+    from backend.migrations import run_migrations
 
-    # Create all tables for models that subclass Base
-    Base.metadata.create_all(_engine)
-
-    # Apply schema migrations (add missing columns, etc.)
-    run_schema_migrations(_engine)
-    # ensure_optional_user_id_column(_engine)
+    # Create missing tables and apply pending schema migrations (see backend/migrations.py);
+    # an up-to-date database costs one version check
+    run_migrations(_engine, Base.metadata)
 
-def run_schema_migrations(engine):
-    """
-    Runs simple SQLite migrations by checking for missing columns and adding them.
-    This keeps DB backward-compatible without manual SQL.
-    """
-    with engine.connect() as conn:
-        # Inspect columns in documents table
-        cols = conn.execute(text("PRAGMA table_info(documents)")).fetchall()
-        col_names = {c[1] for c in cols}
-
-        # 1. user_id column
-        if "user_id" not in col_names:
-            conn.execute(text("ALTER TABLE documents ADD COLUMN user_id INTEGER NULL"))
-
-        # 2. course_id column
-        if "course_id" not in col_names:
-            conn.execute(text("ALTER TABLE documents ADD COLUMN course_id INTEGER NULL"))
-
-        # 3. topic_id column
-        if "topic_id" not in col_names:
-            conn.execute(text("ALTER TABLE documents ADD COLUMN topic_id INTEGER NULL"))
-
-        # 4. User columns for profile/google
-        cols_user = conn.execute(text("PRAGMA table_info(users)")).fetchall()
-        col_names_user = {c[1] for c in cols_user}
-
-        if "username" not in col_names_user:
-            conn.execute(text("ALTER TABLE users ADD COLUMN username TEXT UNIQUE"))
-        
-        if "google_id" not in col_names_user:
-            conn.execute(text("ALTER TABLE users ADD COLUMN google_id TEXT UNIQUE"))
-            
-        # Note: SQLite cannot easily alter "email" to be nullable if it was NOT NULL. 
-        # We will handle this by passing an empty string or dummy value if necessary in code, 
-        # or relying on the fact that legacy users have it.
-
-        # 5. Add audio_filename to summaries
-        cols_sum = conn.execute(text("PRAGMA table_info(summaries)")).fetchall()
-        col_names_sum = {c[1] for c in cols_sum}
-
-        if "audio_filename" not in col_names_sum:
-            conn.execute(text("ALTER TABLE summaries ADD COLUMN audio_filename TEXT NULL"))
+def get_engine():
+    """The engine, for short statements outside any ORM session (e.g. progress updates)."""
+    return _engine
 
 def get_db():
     """Return a request-scoped SQLAlchemy session."""
@@ -86,3 +118,31 @@ def close_db(e=None):
     db = g.pop("db", None)
     if db is not None:
         db.close()
+
+@contextmanager
+def session_scope():
+    """
+    Session for work outside a request (background tasks).
+    Commits on success, rolls back on error, always releases the session.
+    """
+    session = _Session()
+    try:
+        yield session
+        session.commit()
+    except BaseException:  # includes progress.GenerationCancelled
+        session.rollback()
+        raise
+    finally:
+        _Session.remove()
+
+
+def run_in_session(fn, retries: int = DB_BUSY_RETRIES):
+    """
+    fn(session) as one short write transaction (session_scope), rerun from the
+    start on "database is locked". fn must be safe to repeat: nothing it did
+    before the failure is kept.
+    """
+    def attempt():
+        with session_scope() as db:
+            return fn(db)
+    return retry_on_busy(attempt, retries)
@@ -1,13 +1,15 @@
 # backend/files.py
 import os
 import uuid
-from flask import Blueprint, request, jsonify, g, send_file
+from flask import Blueprint, request, jsonify, g
 from werkzeug.utils import secure_filename
 
 from backend.db import get_db
 from backend.models import Document, Course, Topic
 from backend.utils_auth import auth_required
 from backend.services.extract import UPLOAD_DIR
+from backend.utils_files import file_sha256, send_stored_file
+from backend.pagination import paginate
 
 bp = Blueprint("files", __name__)
 
@@ -51,6 +53,7 @@ def upload():
     try:
         f.save(disk_path)
         size = os.path.getsize(disk_path)
+        sha256 = file_sha256(disk_path)
     except Exception as e:
         return jsonify({"error": f"failed to save file: {e}"}), 500
 
@@ -59,6 +62,7 @@ def upload():
         original_name=original_name,
         mime_type=f.mimetype or "application/octet-stream",
         size=size,
+        sha256=sha256,
         user_id=g.user_id,
         course_id=int(course_id) if course_id else None,
         topic_id=int(topic_id) if topic_id else None
@@ -110,8 +114,13 @@ def extract_preview(doc_id):
 @auth_required
 def my_docs():
     db = get_db()
-    q = db.query(Document).filter(
-        (Document.user_id == g.user_id) | (Document.user_id.is_(None))
+    # Course/topic names joined in: loading d.course would also selectin-load every course's
+    # topics and documents (Course relationships are lazy="selectin")
+    q = (
+        db.query(Document, Course.name, Topic.name)
+        .outerjoin(Course, Course.id == Document.course_id)
+        .outerjoin(Topic, Topic.id == Document.topic_id)
+        .filter((Document.user_id == g.user_id) | (Document.user_id.is_(None)))
     )
     # NEW: optional filters
     course_id = request.args.get("course_id", type=int)
@@ -121,23 +130,27 @@ def my_docs():
         q = q.filter(Document.course_id == course_id)
     if topic_id is not None:
         q = q.filter(Document.topic_id == topic_id)
-    
-    q = q.order_by(Document.created_at.desc()).limit(200)
 
-    items = [{
+    page, err = paginate(q, Document.created_at, Document.id, default_limit=200)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
+
+    page["items"] = [{
         "id": d.id,
         "original_name": d.original_name,
         "filename": d.filename,
         "mime": d.mime_type,
         "size": d.size,
+        "sha256": d.sha256,
         "created_at": d.created_at.isoformat(),
         "owned": (d.user_id == g.user_id),
         "course_id": d.course_id,
-        "course_name": d.course.name if d.course else None,
+        "course_name": course_name,
         "topic_id": d.topic_id,
-        "topic_name": d.topic.name if d.topic else None
-    } for d in q.all()]
-    return jsonify({"items": items})
+        "topic_name": topic_name
+    } for d, course_name, topic_name in page["items"]]
+    return jsonify(page)
 
 
 # ---------- New helper + serve routes ----------
@@ -155,6 +168,14 @@ def _load_doc_for_user(doc_id: int):
     return doc, None
 
 
+def _doc_etag(doc: Document, path: str) -> str:
+    """The document's content hash, computed once for documents uploaded before it was stored."""
+    if not doc.sha256:
+        doc.sha256 = file_sha256(path)
+        get_db().commit()
+    return doc.sha256
+
+
 @bp.get("/view/<int:doc_id>")
 @auth_required
 def view_inline(doc_id):
@@ -167,10 +188,11 @@ def view_inline(doc_id):
     if not os.path.exists(path):
         return jsonify({"error": "file missing on server. please re-upload."}), 410
 
-    # Serve inline with original filename
-    return send_file(
+    # Serve inline with original filename (Range requests let the PDF viewer load pages lazily)
+    return send_stored_file(
         path,
         mimetype=doc.mime_type or "application/pdf",
+        etag=_doc_etag(doc, path),
         as_attachment=False,
         download_name=doc.original_name or "file.pdf"
     )
@@ -189,9 +211,10 @@ def download_file(doc_id):
         return jsonify({"error": "file missing on server. please re-upload."}), 410
 
     # Force download with original filename
-    return send_file(
+    return send_stored_file(
         path,
         mimetype=doc.mime_type or "application/octet-stream",
+        etag=_doc_etag(doc, path),
         as_attachment=True,
         download_name=doc.original_name or "file"
     )
@@ -0,0 +1,418 @@
+# backend/job_handlers.py
+"""
+Job handlers run by backend/worker.py, one per job kind.
+
+Each handler gets the worker's session, the id of the user who enqueued the
+job and the job payload, and returns the JSON result the old synchronous
+endpoint used to answer with. The worker commits the handler's rows together
+with the job's completion. Raise JobError for failures retrying cannot fix.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import undefer
+
+from backend.jobs import JobError
+from backend.models import (
+    Document, Quiz, Question, Attempt, AttemptAnswer, Summary, AudioBlob, FlashcardSet, Flashcard,
+    quiz_documents, flashcard_set_documents, summary_documents,
+)
+from backend.services import audio_cache, grading_cache, progress
+from backend.services.dedup import dedupe_items
+from backend.services.extract import read_document_text, UPLOAD_DIR
+from backend.services.generate import (
+    generate_mcqs_from_source,
+    generate_true_false_from_source,
+    generate_short_answer_from_source,
+    generate_flashcards_from_source,
+    generate_summary_from_source,
+    generate_sharded,
+    grade_short_answers,
+    SHARD_TARGET_CHARS,
+)
+from backend.services.tts import generate_audio_for_summary, clean_text_for_speech, blob_filename
+
+
+def _load_docs(db, user_id, document_ids: List[int]) -> List[Document]:
+    # Access was checked when the job was enqueued; re-check in case ownership changed since
+    docs = db.query(Document).filter(Document.id.in_(document_ids)).all()
+    docs = [d for d in docs if d.user_id is None or d.user_id == user_id]
+    if not docs:
+        raise JobError("no valid documents found", 404)
+    return sorted(docs, key=lambda d: document_ids.index(d.id))
+
+
+STUDY_PACK_WORKERS = int(os.getenv("STUDY_PACK_WORKERS", "3"))   # artifacts generated at once per pack
+
+
+def _combined_text(docs: List[Document], min_words: int = 50, error: str = "not enough text",
+                   texts: Optional[Dict[int, str]] = None) -> str:
+    """Join the documents' text under source headers; `texts` holds text already extracted, by document id."""
+    full_text_parts = []
+    for i, doc in enumerate(docs, start=1):
+        if texts is not None:
+            text = texts.get(doc.id, "")
+        else:
+            progress.check_cancelled()
+            progress.stage("extracting", f"Extracting {doc.original_name}", i, len(docs))
+            text = read_document_text(doc.filename)
+        if text:
+            full_text_parts.append(f"--- Source: {doc.original_name} ---\n{text}")
+    combined = "\n\n".join(full_text_parts)
+
+    if not combined or len(combined.split()) < min_words:
+        raise JobError(error, 400)
+    return combined
+
+
+def run_quiz_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    docs = _load_docs(db, user_id, payload["document_ids"])
+    combined_text = _combined_text(docs)
+    shards = payload.get("shards")
+
+    # Large sources / counts are sharded across concurrent calls
+    all_questions = []
+
+    # A. MCQs
+    if payload["n_mcq"] > 0:
+        mcqs = generate_sharded(generate_mcqs_from_source, combined_text, payload["n_mcq"], shards)
+        for m in mcqs: m["type"] = "mcq"
+        all_questions.extend(mcqs)
+
+    # B. True/False
+    if payload["n_tf"] > 0:
+        tfs = generate_sharded(generate_true_false_from_source, combined_text, payload["n_tf"], shards)
+        for t in tfs: t["type"] = "true_false"
+        all_questions.extend(tfs)
+
+    # C. Short Answer
+    if payload["n_sa"] > 0:
+        sas = generate_sharded(generate_short_answer_from_source, combined_text, payload["n_sa"], shards)
+        for s in sas: s["type"] = "short_answer"
+        all_questions.extend(sas)
+
+    # D. Drop near-duplicates (within this batch, and optionally against stored questions)
+    existing = []
+    if payload.get("dedupe_existing"):
+        existing = [
+            f"{p} {a}" for p, a in (
+                db.query(Question.prompt, Question.answer)
+                .join(quiz_documents, quiz_documents.c.quiz_id == Question.quiz_id)
+                .filter(quiz_documents.c.document_id.in_([d.id for d in docs]))
+                .distinct()
+                .all()
+            )
+        ]
+    all_questions = dedupe_items(all_questions, existing_texts=existing)
+
+    if not all_questions:
+        raise JobError("failed to generate any questions", 400)
+
+    # No progress updates after this point: the rows below hold the write lock until commit
+    progress.stage("saving", f"Saving {len(all_questions)} questions")
+    quiz = Quiz(user_id=user_id, title=payload["title"])
+    db.add(quiz)
+    db.flush()
+    quiz.sources.extend(docs)
+    db.flush()
+
+    # One executemany for all the questions (short answers have no options: "")
+    db.execute(insert(Question), [{
+        "quiz_id": quiz.id,
+        "qtype": q_data["type"],
+        "prompt": q_data["prompt"],
+        "options": "|||".join(q_data["options"]) if q_data["options"] else "",
+        "answer": q_data["answer"],
+        "explanation": q_data.get("explanation", ""),
+    } for q_data in all_questions])
+
+    return {"quiz_id": quiz.id, "count": len(all_questions)}
+
+
+def run_summary_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    docs = _load_docs(db, user_id, payload["document_ids"])
+    combined = _combined_text(docs)
+
+    text = generate_summary_from_source(combined, detail_level=payload["detail_level"])
+
+    progress.stage("saving", "Saving summary")
+    s = Summary(user_id=user_id, content=text, title=payload["title"])
+    db.add(s)
+    db.flush()
+    s.sources.extend(docs)
+    db.flush()
+
+    return {"id": s.id, "title": s.title, "content": s.content}
+
+
+def run_flashcards_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    docs = _load_docs(db, user_id, payload["document_ids"])
+    combined = _combined_text(docs, error="not enough text to generate flashcards")
+
+    cards_data = generate_sharded(generate_flashcards_from_source, combined, payload["n"], payload.get("shards"))
+
+    # Drop near-duplicate cards (optionally also against cards already made from these docs)
+    existing = []
+    if payload.get("dedupe_existing"):
+        existing = [
+            f"{front} {back}" for front, back in (
+                db.query(Flashcard.front, Flashcard.back)
+                .join(flashcard_set_documents, flashcard_set_documents.c.set_id == Flashcard.set_id)
+                .filter(flashcard_set_documents.c.document_id.in_([d.id for d in docs]))
+                .distinct()
+                .all()
+            )
+        ]
+    cards_data = dedupe_items(cards_data, existing_texts=existing)
+
+    if not cards_data:
+        raise JobError("no valid flashcards parsed from model output", 500)
+
+    progress.stage("saving", f"Saving {len(cards_data)} flashcards")
+    s = FlashcardSet(user_id=user_id, title=payload["title"])
+    db.add(s)
+    db.flush()
+    s.sources.extend(docs)
+    db.flush()
+
+    db.execute(insert(Flashcard), [{"set_id": s.id, "front": c["front"], "back": c["back"]} for c in cards_data])
+
+    return {"set_id": s.id, "title": s.title, "count": len(cards_data)}
+
+
+def run_summary_audio_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    s = db.query(Summary).options(undefer(Summary.content)).filter_by(id=payload["summary_id"]).first()
+    if not s:
+        raise JobError("not found", 404)
+    if s.user_id != user_id:
+        raise JobError("forbidden", 403)
+
+    clean_text = clean_text_for_speech(s.content)
+    key = audio_cache.cache_key(clean_text, payload["voice"])
+    # Another job may have synthesized the same text and voice since this one was queued
+    blob = audio_cache.lookup(db, key)
+    if blob is None:
+        # Nothing written in this session yet: no write lock is held while synthesizing
+        if not generate_audio_for_summary(clean_text, payload["voice"], blob_filename(key)):
+            raise RuntimeError("Audio generation failed")
+        blob = db.get(AudioBlob, audio_cache.store_and_evict(key, payload["voice"]))
+
+    # Audio from before the cache (summary_audio_<id>.mp3) belongs to this summary alone
+    if s.audio_filename and s.audio_blob_id is None:
+        old_path = os.path.join(UPLOAD_DIR, s.audio_filename)
+        if os.path.exists(old_path):
+            try:
+                os.remove(old_path)
+            except Exception as e:
+                print(f"Warning: Could not delete old audio: {e}")
+
+    audio_cache.attach(s, blob)
+    return {"ok": True, "audio_filename": blob.filename}
+
+
+def run_grade_attempt_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM-grade an attempt's remaining short answers (see routes_quizzes.attempt), then score it."""
+    attempt_id, items = payload["attempt_id"], payload["items"]
+    att = db.get(Attempt, attempt_id)
+    if att is None:  # deleted while queued
+        return {"attempt_id": attempt_id, "status": "deleted"}
+
+    progress.stage("grading", f"Grading {len(items)} short answers")
+    fresh = grade_short_answers(items, local_first=False)
+    if items and not fresh:
+        # The grader is unreachable or returned nothing usable: fail this run so the
+        # queue retries it with backoff (on_grade_attempt_failed scores it once out of retries)
+        raise RuntimeError(f"no verdicts for {len(items)} short answers")
+    progress.stage("saving", "Saving grades")
+    grading_cache.store(
+        db, [(i["id"], i["user_answer"], fresh[i["id"]]) for i in items if i["id"] in fresh]
+    )
+    _finish_attempt(db, att, fresh, payload["total"])
+    return {"attempt_id": attempt_id, "status": att.status, "score_pct": att.score_pct}
+
+
+def on_grade_attempt_failed(db, user_id, payload: Dict[str, Any]) -> None:
+    """Out of retries: score the attempt, its ungraded short answers counting as incorrect."""
+    att = db.get(Attempt, payload["attempt_id"])
+    if att is not None and att.status == "pending":
+        _finish_attempt(db, att, {}, payload["total"])
+
+
+def _finish_attempt(db, att, verdicts: Dict[int, bool], total: int) -> None:
+    rows = (
+        db.query(AttemptAnswer.id, AttemptAnswer.question_id, AttemptAnswer.is_correct)
+        .filter_by(attempt_id=att.id)
+        .all()
+    )
+    # Answers left without a verdict count as incorrect; written back in one executemany
+    graded = [{"id": r.id, "is_correct": verdicts.get(r.question_id, False)} for r in rows if r.is_correct is None]
+    if graded:
+        db.execute(update(AttemptAnswer), graded)
+    correct = sum(1 for r in rows if r.is_correct) + sum(1 for r in graded if r["is_correct"])
+    att.score_pct = round(100 * correct / max(1, total))
+    att.status = "graded"
+
+
+_PACK_LABELS = {"quiz": "Quiz", "flashcards": "Flashcards", "summary": "Summary"}
+
+
+def _generate_pack_item(kind: str, source: str, spec: Dict[str, Any]):
+    shards = max(1, -(-len(source) // SHARD_TARGET_CHARS))  # same chunks (and prompt prefixes) for every kind
+    if kind == "quiz":
+        questions = []
+        for generator, n, qtype in (
+            (generate_mcqs_from_source, spec.get("n_mcq", 0), "mcq"),
+            (generate_true_false_from_source, spec.get("n_tf", 0), "true_false"),
+            (generate_short_answer_from_source, spec.get("n_sa", 0), "short_answer"),
+        ):
+            if n > 0:
+                batch = generate_sharded(generator, source, n, shards)
+                for q in batch: q["type"] = qtype
+                questions.extend(batch)
+        return dedupe_items(questions)
+    if kind == "flashcards":
+        return dedupe_items(generate_sharded(generate_flashcards_from_source, source, spec["n"], shards))
+    return generate_summary_from_source(source, detail_level=spec.get("detail_level", "brief"))
+
+
+def run_study_pack_job(db, user_id, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Quiz / flashcard set / summary for every topic of a course, planned as one DAG:
+    each document is extracted once, each topic's source is built once and shared
+    by its artifacts (same prompt prefix), artifacts are generated STUDY_PACK_WORKERS
+    at a time, and all rows are inserted together. Failed items are reported and
+    skipped; the rest of the pack is still saved.
+    """
+    groups, spec = payload["groups"], payload["artifacts"]
+    docs = {d.id: d for d in _load_docs(db, user_id, sorted({i for grp in groups for i in grp["document_ids"]}))}
+
+    # 1. Extract every document once, however many topics/artifacts use it
+    texts = {}
+    for i, doc in enumerate(docs.values(), start=1):
+        progress.check_cancelled()
+        progress.stage("extracting", f"Extracting {doc.original_name}", i, len(docs))
+        texts[doc.id] = read_document_text(doc.filename)
+
+    # 2. One source per topic; 3. one item per topic and artifact kind
+    items, sources = [], {}
+    for grp in groups:
+        grp_docs = [docs[i] for i in grp["document_ids"] if i in docs]
+        try:
+            sources[grp["key"]] = _combined_text(grp_docs, texts=texts)
+        except JobError as e:
+            sources[grp["key"]] = None
+            error = e.message
+        for kind in ("quiz", "flashcards", "summary"):
+            if kind not in spec:
+                continue
+            key = f"{grp['key']}:{kind}"
+            item = {"key": key, "group": grp, "kind": kind, "docs": grp_docs}
+            if sources[grp["key"]] is None:
+                item.update(status="failed", error=error)
+            else:
+                item["status"] = "queued"
+            items.append(item)
+            progress.item(key, topic=grp["name"], kind=kind, status=item["status"], error=item.get("error"))
+
+    # 4. Generate; items of one topic are adjacent so they tend to reuse the cached prefix
+    todo = [it for it in items if it["status"] == "queued"]
+    with ThreadPoolExecutor(max_workers=max(1, min(STUDY_PACK_WORKERS, len(todo)))) as pool:
+        def run(it):
+            progress.item(it["key"], status="running")
+            return _generate_pack_item(it["kind"], sources[it["group"]["key"]], spec[it["kind"]])
+
+        futures = {progress.submit_in_context(pool, run, it): it for it in todo}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            it = futures[fut]
+            try:
+                it["data"] = fut.result()
+            except Exception as e:
+                print(f"Study pack item {it['key']} failed: {e}")
+                it["data"] = None
+            if it["data"]:
+                it["status"] = "generated"
+                count = len(it["data"]) if isinstance(it["data"], list) else None
+                progress.item(it["key"], status="generated", count=count)
+            else:
+                it.update(status="failed", error="nothing was generated")
+                progress.item(it["key"], status="failed", error=it["error"])
+            progress.stage("generating", "Generated study pack items", done, len(todo))
+
+    ready = [it for it in items if it["status"] == "generated"]
+    if not ready:
+        raise JobError("failed to generate any study material", 400)
+
+    # 5. Bulk insert: parents in one flush, then children and source links in executemany batches
+    progress.stage("saving", f"Saving {len(ready)} items")
+    for it in ready:
+        title = f"{it['group']['name']} - {_PACK_LABELS[it['kind']]}"
+        if it["kind"] == "quiz":
+            it["row"] = Quiz(user_id=user_id, title=title)
+        elif it["kind"] == "flashcards":
+            it["row"] = FlashcardSet(user_id=user_id, title=title)
+        else:
+            it["row"] = Summary(user_id=user_id, title=title, content=it["data"])
+    db.add_all([it["row"] for it in ready])
+    db.flush()
+
+    questions, cards, links = [], [], {quiz_documents: [], flashcard_set_documents: [], summary_documents: []}
+    for it in ready:
+        row_id = it["row"].id
+        if it["kind"] == "quiz":
+            questions += [{
+                "quiz_id": row_id,
+                "qtype": q["type"],
+                "prompt": q["prompt"],
+                "options": "|||".join(q["options"]) if q["options"] else "",
+                "answer": q["answer"],
+                "explanation": q.get("explanation", ""),
+            } for q in it["data"]]
+            links[quiz_documents] += [{"quiz_id": row_id, "document_id": d.id} for d in it["docs"]]
+        elif it["kind"] == "flashcards":
+            cards += [{"set_id": row_id, "front": c["front"], "back": c["back"]} for c in it["data"]]
+            links[flashcard_set_documents] += [{"set_id": row_id, "document_id": d.id} for d in it["docs"]]
+        else:
+            links[summary_documents] += [{"summary_id": row_id, "document_id": d.id} for d in it["docs"]]
+    if questions:
+        db.execute(insert(Question), questions)
+    if cards:
+        db.execute(insert(Flashcard), cards)
+    for table, rows in links.items():
+        if rows:
+            db.execute(table.insert(), rows)
+    db.flush()
+
+    return {
+        "course_id": payload.get("course_id"),
+        "created": len(ready),
+        "failed": len(items) - len(ready),
+        "items": [
+            {
+                "key": it["key"],
+                "topic": it["group"]["name"],
+                "kind": it["kind"],
+                "status": "created" if "row" in it else "failed",
+                "id": it["row"].id if "row" in it else None,
+                "count": len(it["data"]) if "row" in it and isinstance(it["data"], list) else None,
+                "error": it.get("error"),
+            }
+            for it in items
+        ],
+    }
+
+
+HANDLERS = {
+    "quiz": run_quiz_job,
+    "summary": run_summary_job,
+    "flashcards": run_flashcards_job,
+    "summary_audio": run_summary_audio_job,
+    "grade_attempt": run_grade_attempt_job,
+    "study_pack": run_study_pack_job,
+}
+
+# Run in a fresh session once a job has failed for good (out of retries, or a JobError)
+FAILURE_HANDLERS = {
+    "grade_attempt": on_grade_attempt_failed,
+}
@@ -0,0 +1,303 @@
+# backend/jobs.py
+"""
+Durable job queue stored in the application database (table "jobs").
+
+Web requests enqueue() a job and answer 202 with its id; worker processes
+(backend/worker.py) claim() jobs, run the handler registered for their kind
+(backend/job_handlers.py) and record the outcome.
+
+- A claim is a lease: the job stays invisible to other workers until
+  locked_until passes. Workers extend the lease while the job runs
+  (heartbeat()), so the job of a crashed or killed worker becomes claimable
+  again once its lease lapses.
+- Failures are retried with exponential backoff up to max_attempts.
+  JobError marks a failure retrying cannot fix (bad input, not enough text).
+- complete() runs in the handler's transaction: the job's rows and its
+  "succeeded" state are committed together, or not at all.
+- request_cancel() cancels a queued job outright; a running one is flagged
+  and its worker aborts it (services/progress.py GenerationCancelled) without
+  committing anything the handler wrote.
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from sqlalchemy import update, or_, and_, func
+
+from backend.db import get_engine
+from backend.models import Job
+from backend.services import metrics
+from backend.services.progress import GenerationCancelled
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_VISIBILITY_SECS = int(os.getenv("JOB_VISIBILITY_SECS", "120"))   # lease length; heartbeats renew it
+JOB_RETRY_BASE_SECS = float(os.getenv("JOB_RETRY_BASE_SECS", "5"))   # 5s, 10s, 20s, ...
+JOB_RETRY_MAX_SECS = float(os.getenv("JOB_RETRY_MAX_SECS", "300"))
+CLAIM_CANDIDATES = 50   # oldest runnable jobs considered per claim
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+CANCELLED_RESULT = json.dumps({"error": "cancelled", "status": 409})
+
+# Someone is looking at the screen waiting for these; everything else is bulk generation
+INTERACTIVE_KINDS = {"grade_attempt"}
+
+
+class JobError(Exception):
+    """Permanent job failure; `status` is the HTTP status the result endpoint answers with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker may have claimed it."""
+
+
+def enqueue(db, kind: str, user_id: Optional[int], payload: Dict[str, Any],
+            max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+    """Add a job to the caller's transaction; it becomes visible to workers on commit."""
+    job = Job(
+        kind=kind,
+        user_id=user_id,
+        payload=json.dumps(payload),
+        status="queued",
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    db.flush()
+    metrics.incr(f"jobs.{kind}.enqueued")
+    return job
+
+
+def job_priority(kind: str) -> str:
+    """Scheduling class of a job kind (services/scheduler.py)."""
+    return "interactive" if kind in INTERACTIVE_KINDS else "bulk"
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        # Lease expired: the worker running it died (or stalled) mid-job
+        and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts,
+             Job.cancel_requested.is_(False)),
+    )
+
+
+def _fail_abandoned(db, now: datetime) -> None:
+    """
+    Jobs whose worker was lost on their last allowed attempt will never be claimed
+    again; nor will lost jobs that were being cancelled.
+    """
+    lost = and_(Job.status == "running", Job.locked_until < now)
+    abandoned = and_(lost, Job.attempts >= Job.max_attempts, Job.cancel_requested.is_(False))
+    cancelled = and_(lost, Job.cancel_requested.is_(True))
+    if not db.query(Job.id).filter(or_(abandoned, cancelled)).first():
+        return
+    db.execute(
+        update(Job).where(abandoned).values(
+            status="failed",
+            error="worker lost",
+            result=json.dumps({"error": "job did not finish", "status": 500}),
+            locked_by=None,
+            locked_until=None,
+            finished_at=now,
+        )
+    )
+    db.execute(
+        update(Job).where(cancelled).values(
+            status="cancelled", result=CANCELLED_RESULT, locked_by=None, locked_until=None, finished_at=now,
+        )
+    )
+
+
+def claim(db, worker_id: str, interactive_only: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Lease the next runnable job to `worker_id` and commit.
+    Returns a plain dict (id, kind, user_id, payload, attempt) or None.
+
+    Fair share across users: interactive kinds first, then the job of the user
+    with the fewest jobs already running, oldest first. One user's backlog of
+    bulk jobs can't fill every worker while other users wait.
+    `interactive_only` claims INTERACTIVE_KINDS only (the workers' reserved loops).
+    """
+    now = datetime.utcnow()
+    _fail_abandoned(db, now)
+
+    q = db.query(Job.id, Job.user_id, Job.kind).filter(_claimable(now))
+    if interactive_only:
+        q = q.filter(Job.kind.in_(INTERACTIVE_KINDS))
+    candidates = q.order_by(Job.run_after.asc(), Job.id.asc()).limit(CLAIM_CANDIDATES).all()
+    if not candidates:
+        db.commit()
+        return None
+    running = dict(
+        db.query(Job.user_id, func.count(Job.id))
+        .filter(Job.status == "running", Job.locked_until >= now)
+        .group_by(Job.user_id)
+        .all()
+    )
+    candidates.sort(key=lambda c: (job_priority(c.kind) != "interactive", running.get(c.user_id, 0)))
+
+    for job_id, _, _ in candidates:
+        # Conditional UPDATE: only one worker's claim can match
+        res = db.execute(
+            update(Job)
+            .where(Job.id == job_id, _claimable(now))
+            .values(
+                status="running",
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=JOB_VISIBILITY_SECS),
+                attempts=Job.attempts + 1,
+                started_at=func.coalesce(Job.started_at, now),
+            )
+        )
+        if res.rowcount != 1:
+            continue
+        db.commit()
+        job = db.get(Job, job_id)
+        metrics.incr(f"jobs.{job.kind}.claimed")
+        return {
+            "id": job.id,
+            "kind": job.kind,
+            "user_id": job.user_id,
+            "payload": json.loads(job.payload or "{}"),
+            "attempt": job.attempts,
+        }
+    db.commit()
+    return None
+
+
+def heartbeat(db, job_id: int, worker_id: str) -> bool:
+    """Extend the lease; False if it was lost."""
+    res = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+        .values(locked_until=datetime.utcnow() + timedelta(seconds=JOB_VISIBILITY_SECS))
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+def complete(db, job_id: int, worker_id: str, result: Dict[str, Any]) -> None:
+    """
+    Mark the job succeeded in the handler's transaction.
+    Raises LeaseLost, or GenerationCancelled if the job was cancelled meanwhile.
+    """
+    res = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running",
+               Job.cancel_requested.is_(False))
+        .values(
+            status="succeeded",
+            result=json.dumps(result),
+            error=None,
+            locked_by=None,
+            locked_until=None,
+            finished_at=datetime.utcnow(),
+        )
+    )
+    if res.rowcount != 1:
+        if db.query(Job.cancel_requested).filter(Job.id == job_id).scalar():
+            raise GenerationCancelled()
+        raise LeaseLost(f"job {job_id}")
+
+
+def fail(db, job_id: int, worker_id: str, error: str, permanent: bool = False, status: int = 500) -> str:
+    """
+    Record a failed run. Retries with backoff unless `permanent` or out of attempts.
+    Returns the job's new status.
+    """
+    job = db.get(Job, job_id)
+    if job is None or job.locked_by != worker_id or job.status != "running":
+        return job.status if job else "missing"
+
+    now = datetime.utcnow()
+    job.error = error
+    job.locked_by = None
+    job.locked_until = None
+    if not permanent and job.attempts < job.max_attempts:
+        delay = min(JOB_RETRY_MAX_SECS, JOB_RETRY_BASE_SECS * 2 ** (job.attempts - 1))
+        job.status = "queued"
+        job.run_after = now + timedelta(seconds=delay)
+        metrics.incr(f"jobs.{job.kind}.retried")
+    else:
+        job.status = "failed"
+        job.result = json.dumps({"error": error, "status": status})
+        job.finished_at = now
+        metrics.incr(f"jobs.{job.kind}.failed")
+    db.commit()
+    return job.status
+
+
+def request_cancel(db, job: Job) -> bool:
+    """
+    Cancel `job` in the caller's transaction: a queued job right away, a running
+    one by flagging it for its worker. False if the job already finished.
+    """
+    if job.status in TERMINAL_STATES:
+        return False
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.result = CANCELLED_RESULT
+        job.finished_at = datetime.utcnow()
+        metrics.incr(f"jobs.{job.kind}.cancelled")
+    else:
+        job.cancel_requested = True
+    return True
+
+
+def cancel_requested(db, job_id: int) -> bool:
+    return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+
+
+def mark_cancelled(db, job_id: int, worker_id: str) -> None:
+    """Record that the worker stopped a running job on request."""
+    res = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+        .values(
+            status="cancelled",
+            result=CANCELLED_RESULT,
+            locked_by=None,
+            locked_until=None,
+            finished_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    if res.rowcount == 1:
+        kind = db.query(Job.kind).filter(Job.id == job_id).scalar()
+        metrics.incr(f"jobs.{kind}.cancelled")
+
+
+def progress_sink(job_id: int):
+    """services/progress.py sink: store the latest progress on the job row and bump its event id."""
+    def write(state: Dict[str, Any]) -> None:
+        # Own short transaction, outside the handler's session
+        with get_engine().begin() as conn:
+            conn.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(progress=json.dumps(state), progress_seq=Job.progress_seq + 1)
+            )
+    return write
+
+
+def job_view(job: Job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "progress": json.loads(job.progress) if job.progress else None,
+        "cancel_requested": bool(job.cancel_requested),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
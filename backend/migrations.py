@@ -0,0 +1,279 @@
+# backend/migrations.py
+"""
+Versioned schema migrations (SQLite).
+
+Applied versions are recorded in schema_version, so a boot against an
+up-to-date database is one SELECT. Otherwise, under one BEGIN IMMEDIATE
+transaction (so the api and worker processes can't migrate at the same time):
+create any missing tables from the models, then run the pending migrations in
+order, recording each.
+
+Adding a schema change: append (next version, function) to MIGRATIONS; never
+edit or renumber an applied one. New tables are created from the models, but
+the new version is still needed to trigger that on existing databases.
+Versions 1-10 predate the runner and check before altering, so databases that
+already have them pass through.
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def _columns(conn, table: str) -> set:
+    return {c[1] for c in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()}
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> None:
+    if column not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _documents_user_id(conn):
+    _add_column(conn, "documents", "user_id", "INTEGER NULL")
+
+
+def _documents_course_id(conn):
+    _add_column(conn, "documents", "course_id", "INTEGER NULL")
+
+
+def _documents_topic_id(conn):
+    _add_column(conn, "documents", "topic_id", "INTEGER NULL")
+
+
+def _users_profile_columns(conn):
+    # Note: SQLite cannot easily alter "email" to be nullable if it was NOT NULL.
+    # Legacy users keep theirs.
+    _add_column(conn, "users", "username", "TEXT UNIQUE")
+    _add_column(conn, "users", "google_id", "TEXT UNIQUE")
+
+
+def _summaries_audio_filename(conn):
+    _add_column(conn, "summaries", "audio_filename", "TEXT NULL")
+
+
+def _attempts_status(conn):
+    # Grading status (pending while short answers are graded in the background)
+    _add_column(conn, "attempts", "status", "TEXT NOT NULL DEFAULT 'graded'")
+
+
+def _jobs_progress(conn):
+    _add_column(conn, "jobs", "progress", "TEXT NULL")
+    _add_column(conn, "jobs", "progress_seq", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _jobs_cancel_requested(conn):
+    _add_column(conn, "jobs", "cancel_requested", "BOOLEAN NOT NULL DEFAULT 0")
+
+
+def _summaries_audio_blob_id(conn):
+    _add_column(conn, "summaries", "audio_blob_id", "INTEGER NULL REFERENCES audio_blobs(id)")
+
+
+def _documents_sha256(conn):
+    # Content hash (ETag); legacy rows are hashed on first download
+    _add_column(conn, "documents", "sha256", "VARCHAR(64) NULL")
+
+
+# Foreign-key / list-query indexes, shaped after the route queries: owner + created_at
+# for "my X, newest first", parent id for children, document side of the links.
+# The same indexes are declared on the models (backend/models.py) for new databases.
+_LOOKUP_INDEXES = [
+    ("ix_documents_user_created", "documents", "user_id, created_at"),
+    ("ix_documents_course_id", "documents", "course_id"),
+    ("ix_documents_topic_id", "documents", "topic_id"),
+    ("ix_summaries_user_created", "summaries", "user_id, created_at"),
+    ("ix_flashcard_sets_user_created", "flashcard_sets", "user_id, created_at"),
+    ("ix_flashcards_set_id", "flashcards", "set_id"),
+    ("ix_questions_quiz_id", "questions", "quiz_id"),
+    ("ix_attempts_quiz_created", "attempts", "quiz_id, created_at"),
+    ("ix_attempt_answers_attempt_id", "attempt_answers", "attempt_id"),
+    ("ix_courses_user_created", "courses", "user_id, created_at"),
+    ("ix_topics_course_created", "topics", "course_id, created_at"),
+    ("ix_quiz_documents_document", "quiz_documents", "document_id, quiz_id"),
+    ("ix_summary_documents_document", "summary_documents", "document_id, summary_id"),
+    ("ix_flashcard_set_documents_document", "flashcard_set_documents", "document_id, set_id"),
+]
+
+
+def _lookup_indexes(conn):
+    for name, table, columns in _LOOKUP_INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    conn.execute(text("ANALYZE"))   # give the planner row counts for the new indexes
+
+
+def _quiz_owner(conn):
+    """
+    Owner columns on quizzes and attempts, so access checks and "my quizzes" are
+    indexed lookups instead of a join through quiz_documents -> documents.
+    A quiz belongs to the owner of its sources (NULL if they are all legacy
+    shared documents); an attempt to the quiz's owner, the only one who could take it.
+    """
+    _add_column(conn, "quizzes", "user_id", "INTEGER NULL REFERENCES users(id)")
+    _add_column(conn, "attempts", "user_id", "INTEGER NULL REFERENCES users(id)")
+    conn.execute(text(
+        "UPDATE quizzes SET user_id = ("
+        " SELECT MAX(d.user_id) FROM quiz_documents qd JOIN documents d ON d.id = qd.document_id"
+        " WHERE qd.quiz_id = quizzes.id"
+        ") WHERE user_id IS NULL"
+    ))
+    conn.execute(text(
+        "UPDATE attempts SET user_id = (SELECT q.user_id FROM quizzes q WHERE q.id = attempts.quiz_id)"
+        " WHERE user_id IS NULL"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quizzes_user_created ON quizzes (user_id, created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attempts_user_created ON attempts (user_id, created_at)"))
+    conn.execute(text("ANALYZE"))
+
+
+def _move_column_last(conn, table: str, column: str) -> None:
+    """
+    Rebuild `table` with `column` stored last, following SQLite's ALTER TABLE
+    procedure (https://www.sqlite.org/lang_altertable.html#otheralter): new table
+    from the old one's columns, keys and constraints as PRAGMA reports them, copy,
+    drop, rename, recreate its indexes and triggers, then foreign_key_check.
+    Needs foreign keys off (run_migrations turns them off for the whole run).
+    """
+    cols = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()   # cid, name, type, notnull, dflt, pk
+    cols = [c for c in cols if c[1] != column] + [c for c in cols if c[1] == column]
+    defs = []
+    for _, name, type_, notnull, default, _pk in cols:
+        defs.append(f'"{name}" {type_}' + (" NOT NULL" if notnull else "")
+                    + (f" DEFAULT {default}" if default is not None else ""))
+    pk = [c[1] for c in sorted((c for c in cols if c[5]), key=lambda c: c[5])]
+    if pk:
+        defs.append("PRIMARY KEY (" + ", ".join(f'"{n}"' for n in pk) + ")")
+    for idx in conn.execute(text(f"PRAGMA index_list({table})")).fetchall():   # seq, name, unique, origin, partial
+        if idx[3] == "u":
+            names = [r[2] for r in conn.execute(text(f'PRAGMA index_info("{idx[1]}")')).fetchall()]
+            defs.append("UNIQUE (" + ", ".join(f'"{n}"' for n in names) + ")")
+    fks = {}
+    for fk_id, _seq, ref, from_, to, on_update, on_delete, _match in conn.execute(
+        text(f"PRAGMA foreign_key_list({table})")
+    ).fetchall():
+        fk = fks.setdefault(fk_id, {"ref": ref, "from": [], "to": [], "on_update": on_update, "on_delete": on_delete})
+        fk["from"].append(from_)
+        fk["to"].append(to)
+    for fk in fks.values():
+        clause = (f'FOREIGN KEY({", ".join(fk["from"])}) REFERENCES "{fk["ref"]}"'
+                  + (f' ({", ".join(fk["to"])})' if all(fk["to"]) else ""))
+        if fk["on_delete"] != "NO ACTION":
+            clause += f" ON DELETE {fk['on_delete']}"
+        if fk["on_update"] != "NO ACTION":
+            clause += f" ON UPDATE {fk['on_update']}"
+        defs.append(clause)
+
+    schema = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = :t AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ), {"t": table}).scalars().all()
+    names = ", ".join(f'"{c[1]}"' for c in cols)
+    conn.execute(text(f'CREATE TABLE "{table}_new" ({", ".join(defs)})'))
+    conn.execute(text(f'INSERT INTO "{table}_new" ({names}) SELECT {names} FROM "{table}"'))
+    conn.execute(text(f'DROP TABLE "{table}"'))
+    conn.execute(text(f'ALTER TABLE "{table}_new" RENAME TO "{table}"'))
+    for sql in schema:
+        conn.execute(text(sql))
+    problems = conn.execute(text(f"PRAGMA foreign_key_check({table})")).fetchall()
+    if problems:
+        raise RuntimeError(f"rebuilding {table} broke {len(problems)} foreign keys, e.g. {problems[0]}")
+
+
+def _summaries_preview(conn):
+    """
+    preview / word_count columns, so listing summaries doesn't read the content.
+    The table is rebuilt with content last: SQLite follows a long value's
+    overflow pages to read any column stored after it, deferred or not.
+    """
+    from backend.models import summary_text_stats
+    _add_column(conn, "summaries", "preview", "VARCHAR NULL")
+    _add_column(conn, "summaries", "word_count", "INTEGER NULL")
+    layout = [c[1] for c in conn.execute(text("PRAGMA table_info(summaries)")).fetchall()]
+    if layout[-1] != "content":
+        _move_column_last(conn, "summaries", "content")
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, content FROM summaries WHERE id > :last AND preview IS NULL ORDER BY id LIMIT 500"
+        ), {"last": last_id}).fetchall()
+        if not rows:
+            break
+        conn.execute(text("UPDATE summaries SET preview = :p, word_count = :w WHERE id = :id"), [
+            dict(zip(("p", "w"), summary_text_stats(content)), id=row_id) for row_id, content in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def _process_stats(conn):
+    # New table only: created from the model (backend/models.py: ProcessStats) by create_all
+    pass
+
+
+def _grading_cache_orphans(conn):
+    # Left behind by question deletes while foreign keys were off; a new question
+    # reusing the rowid would otherwise inherit their verdicts
+    conn.execute(text(
+        "DELETE FROM grading_cache WHERE question_id NOT IN (SELECT id FROM questions)"
+    ))
+
+
+MIGRATIONS = [
+    (1, _documents_user_id),
+    (2, _documents_course_id),
+    (3, _documents_topic_id),
+    (4, _users_profile_columns),
+    (5, _summaries_audio_filename),
+    (6, _attempts_status),
+    (7, _jobs_progress),
+    (8, _jobs_cancel_requested),
+    (9, _summaries_audio_blob_id),
+    (10, _documents_sha256),
+    (11, _lookup_indexes),
+    (12, _quiz_owner),
+    (13, _summaries_preview),
+    (14, _process_stats),
+    (15, _grading_cache_orphans),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except OperationalError:   # no schema_version table yet
+        return 0
+
+
+def run_migrations(engine, metadata) -> int:
+    """Bring the database up to LATEST_VERSION. Returns the number of migrations applied."""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return 0
+
+    applied = 0
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Off for the whole run, as table rebuilds need (the pragma is a no-op inside a
+        # transaction); a rebuild checks its keys itself with foreign_key_check
+        foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        # Take the write lock up front: a second process waits here, then finds nothing to do
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INTEGER PRIMARY KEY, applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            ))
+            version = current_version(conn)
+            if version < LATEST_VERSION:
+                metadata.create_all(conn)
+            for v, migrate in MIGRATIONS:
+                if v <= version:
+                    continue
+                migrate(conn)
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": v})
+                print(f"Applied migration {v}: {migrate.__name__.lstrip('_')}")
+                applied += 1
+            conn.exec_driver_sql("COMMIT")
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        finally:
+            conn.exec_driver_sql(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+    return applied
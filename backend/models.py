@@ -1,7 +1,8 @@
 # backend/models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, func, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, func, Table, Index, event
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.orm.attributes import get_history
 from backend.db import Base
 
 # --- Association Tables ---
@@ -10,6 +11,7 @@ quiz_documents = Table(
     Base.metadata,
     Column("quiz_id", Integer, ForeignKey("quizzes.id"), primary_key=True),
     Column("document_id", Integer, ForeignKey("documents.id"), primary_key=True),
+    Index("ix_quiz_documents_document", "document_id", "quiz_id"),
 )
 
 summary_documents = Table(
@@ -17,6 +19,7 @@ summary_documents = Table(
     Base.metadata,
     Column("summary_id", Integer, ForeignKey("summaries.id"), primary_key=True),
     Column("document_id", Integer, ForeignKey("documents.id"), primary_key=True),
+    Index("ix_summary_documents_document", "document_id", "summary_id"),
 )
 
 flashcard_set_documents = Table(
@@ -24,6 +27,7 @@ flashcard_set_documents = Table(
     Base.metadata,
     Column("set_id", Integer, ForeignKey("flashcard_sets.id"), primary_key=True),
     Column("document_id", Integer, ForeignKey("documents.id"), primary_key=True),
+    Index("ix_flashcard_set_documents_document", "document_id", "set_id"),
 )
 
 # --- Models ---
@@ -46,6 +50,7 @@ class Document(Base):
     original_name = Column(String, nullable=False)
     mime_type = Column(String, nullable=False)
     size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=True)  # content hash, served as the ETag
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -59,17 +64,57 @@ class Document(Base):
     # Note: When a doc is deleted, we do NOT cascade delete the Quizzes/Summaries generated from it 
     # (they might rely on multiple docs). But the link in the association table will be removed automatically.
 
+    __table_args__ = (
+        Index("ix_documents_user_created", "user_id", "created_at"),
+        Index("ix_documents_course_id", "course_id"),
+        Index("ix_documents_topic_id", "topic_id"),
+    )
+
 class Summary(Base):
     __tablename__ = "summaries"
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    content = Column(Text, nullable=False)
     title = Column(String, nullable=True)
+    preview = Column(String, nullable=True)  # first SUMMARY_PREVIEW_CHARS characters of content
+    word_count = Column(Integer, nullable=True)
     audio_filename = Column(String, nullable=True)
+    # Cached audio for the current voice; audio_filename mirrors the blob's file
+    audio_blob_id = Column(Integer, ForeignKey("audio_blobs.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Full text, loaded on access (or with undefer()); lists use preview / word_count.
+    # Kept as the last column: SQLite reads through a long value to reach the columns after it.
+    content = deferred(Column(Text, nullable=False))
     
     sources = relationship("Document", secondary=summary_documents, backref="summaries")
 
+    __table_args__ = (
+        Index("ix_summaries_user_created", "user_id", "created_at"),
+    )
+
+SUMMARY_PREVIEW_CHARS = 100
+
+
+def summary_text_stats(content):
+    """(preview, word_count) stored alongside a summary's content."""
+    content = content or ""
+    return content[:SUMMARY_PREVIEW_CHARS], len(content.split())
+
+
+@event.listens_for(Summary.content, "set")
+def _summary_content_set(target, value, oldvalue, initiator):
+    target.preview, target.word_count = summary_text_stats(value)
+
+class AudioBlob(Base):
+    """Synthesized speech keyed by hash of (engine version, voice, text); see services/audio_cache.py."""
+    __tablename__ = "audio_blobs"
+    id = Column(Integer, primary_key=True)
+    key = Column(String(64), nullable=False, unique=True)
+    filename = Column(String, nullable=False)  # in UPLOAD_DIR
+    size = Column(Integer, nullable=False, default=0)
+    voice = Column(String(16), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)  # LRU eviction order
+
 class FlashcardSet(Base):
     __tablename__ = "flashcard_sets"
     id = Column(Integer, primary_key=True)
@@ -81,10 +126,14 @@ class FlashcardSet(Base):
     # Cascade delete: If Set is deleted, delete all Cards
     cards = relationship("Flashcard", back_populates="set", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_flashcard_sets_user_created", "user_id", "created_at"),
+    )
+
 class Flashcard(Base):
     __tablename__ = "flashcards"
     id = Column(Integer, primary_key=True)
-    set_id = Column(Integer, ForeignKey("flashcard_sets.id"), nullable=False)
+    set_id = Column(Integer, ForeignKey("flashcard_sets.id"), nullable=False, index=True)
     front = Column(Text, nullable=False)
     back = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -94,6 +143,8 @@ class Flashcard(Base):
 class Quiz(Base):
     __tablename__ = "quizzes"
     id = Column(Integer, primary_key=True)
+    # Owner (NULL: legacy quiz built from shared documents, open to everyone)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     title = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -103,38 +154,76 @@ class Quiz(Base):
     questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan")
     attempts = relationship("Attempt", back_populates="quiz", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_quizzes_user_created", "user_id", "created_at"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False, index=True)
     qtype = Column(String, nullable=False)
     prompt = Column(Text, nullable=False)
-    options = Column(Text, nullable=False)
+    # Only the quiz views show these: loaded together on access, or with undefer_group("detail")
+    options = deferred(Column(Text, nullable=False), group="detail")
     answer = Column(String, nullable=False)
-    explanation = Column(Text)
+    explanation = deferred(Column(Text), group="detail")
     
     quiz = relationship("Quiz", back_populates="questions")
+    # Cascade: Delete Question -> Delete its cached grading verdicts
+    grading_cache = relationship("GradingCache", cascade="all, delete-orphan", passive_deletes=True)
+
+class GradingCache(Base):
+    """Short-answer verdicts keyed by (question, hash of the normalized student answer)."""
+    __tablename__ = "grading_cache"
+    id = Column(Integer, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    answer_hash = Column(String(64), nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_grading_cache_question_answer", "question_id", "answer_hash", unique=True),
+    )
+
+@event.listens_for(Question, "after_update")
+def _invalidate_grading_cache(mapper, connection, target):
+    """Editing a question's prompt or answer makes its cached verdicts stale."""
+    if get_history(target, "prompt").has_changes() or get_history(target, "answer").has_changes():
+        connection.execute(
+            GradingCache.__table__.delete().where(GradingCache.question_id == target.id)
+        )
 
 class Attempt(Base):
     __tablename__ = "attempts"
     id = Column(Integer, primary_key=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # who took it
     created_at = Column(DateTime, default=datetime.utcnow)
     score_pct = Column(Integer, nullable=True)
+    # "graded" | "pending" (short answers still being graded in the background)
+    status = Column(String(16), nullable=False, default="graded", server_default="graded")
     
     quiz = relationship("Quiz", back_populates="attempts")
     # Cascade: Delete Attempt -> Delete AttemptAnswers
     answers = relationship("AttemptAnswer", back_populates="attempt", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_attempts_quiz_created", "quiz_id", "created_at"),
+        Index("ix_attempts_user_created", "user_id", "created_at"),
+    )
+
 class AttemptAnswer(Base):
     __tablename__ = "attempt_answers"
     id = Column(Integer, primary_key=True)
-    attempt_id = Column(Integer, ForeignKey("attempts.id"), nullable=False)
+    attempt_id = Column(Integer, ForeignKey("attempts.id"), nullable=False, index=True)
     question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
     user_answer = Column(Text, nullable=False)
-    is_correct = Column(Boolean, default=False)
+    is_correct = Column(Boolean, nullable=True)  # NULL while pending background grading
     
     attempt = relationship("Attempt", back_populates="answers")
+    # Lets a quiz delete remove the answers before the questions they reference
+    question = relationship("Question")
 
 class Course(Base):
     __tablename__ = "courses"
@@ -149,6 +238,10 @@ class Course(Base):
     # Do NOT cascade delete documents, just unlink them (handled by SQLAlchemy default set-null if nullable)
     documents = relationship("Document", back_populates="course", lazy="selectin")
 
+    __table_args__ = (
+        Index("ix_courses_user_created", "user_id", "created_at"),
+    )
+
 class Topic(Base):
     __tablename__ = "topics"
     id = Column(Integer, primary_key=True)
@@ -161,10 +254,51 @@ class Topic(Base):
     course = relationship("Course", back_populates="topics")
     documents = relationship("Document", back_populates="topic", lazy="selectin")
 
+    __table_args__ = (
+        Index("ix_topics_course_created", "course_id", "created_at"),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     rating = Column(Integer, nullable=False)  # 1 to 5
     comment = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """Durable background job (see backend/jobs.py); claimed and run by backend/worker.py."""
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)  # quiz | summary | flashcards | summary_audio | grade_attempt | study_pack
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String(16), nullable=False, default="queued")  # queued | running | succeeded | failed | cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # retry backoff
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # visibility timeout of the current claim
+    result = Column(Text, nullable=True)  # JSON: handler result, or {"error", "status"} on failure
+    error = Column(Text, nullable=True)
+    progress = Column(Text, nullable=True)  # JSON: latest services/progress.py state
+    progress_seq = Column(Integer, nullable=False, default=0, server_default="0")  # SSE event id
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default="0")  # running job: stop it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+
+class ProcessStats(Base):
+    """Latest in-memory stats of one web or worker process (see services/process_stats.py)."""
+    __tablename__ = "process_stats"
+    process_id = Column(String(128), primary_key=True)  # host:pid
+    role = Column(String(16), nullable=False)  # web | worker
+    data = Column(Text, nullable=False)  # JSON: metrics snapshot, breakers, LLM scheduler
+    started_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
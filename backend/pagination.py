@@ -0,0 +1,83 @@
+# backend/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Lists are ordered by (created_at, id) and a page continues strictly after
+the last row of the previous one, as a row-value comparison
+`(created_at, id) < (:ts, :id)`. SQLite seeks the owner + created_at indexes
+(migration 11) with it, so page N costs the same as page 1, and rows inserted
+meanwhile don't shift or repeat items the way OFFSET does.
+
+Query params: limit (capped at MAX_PAGE_SIZE), cursor (opaque, from the
+previous page's next_cursor), count=1 to add the total number of rows.
+
+The cursor carries created_at exactly as stored (columns filled by
+server_default and by datetime.utcnow are stored in different text formats),
+so comparisons are between the same strings. Rows need a created_at; every
+model sets one on insert.
+"""
+import os
+import json
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+from flask import request
+from sqlalchemy import String, tuple_, type_coerce
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        if isinstance(created_at, str) and isinstance(row_id, int):
+            return created_at, row_id
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def paginate(q, created_col, id_col, default_limit: int = DEFAULT_PAGE_SIZE, descending: bool = True):
+    """
+    One page of `q` (any ORM query; its order_by is replaced) per the request's
+    limit/cursor/count params. Returns (page, err): page is
+    {"items": rows, "next_cursor": str|None[, "total": int]}, rows as `q` would
+    return them; err is (message, status) for a bad cursor.
+    """
+    limit = request.args.get("limit", default_limit, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    width = len(q.column_descriptions)
+
+    page: Dict[str, Any] = {}
+    if request.args.get("count") in ("1", "true"):
+        page["total"] = q.order_by(None).count()
+
+    key_ts = type_coerce(created_col, String)
+    cursor = request.args.get("cursor")
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return None, ("invalid cursor", 400)
+        key = tuple_(key_ts, id_col)
+        q = q.filter(key < after if descending else key > after)
+
+    order = (created_col.desc(), id_col.desc()) if descending else (created_col.asc(), id_col.asc())
+    rows = (
+        q.add_columns(key_ts.label("_page_ts"), id_col.label("_page_id"))
+        .order_by(None)
+        .order_by(*order)
+        .limit(limit + 1)
+        .all()
+    )
+
+    last = rows[limit - 1] if len(rows) > limit else None
+    page["next_cursor"] = encode_cursor(last._page_ts, last._page_id) if last is not None else None
+    page["items"] = [row[0] if width == 1 else tuple(row[:width]) for row in rows[:limit]]
+    return page, None
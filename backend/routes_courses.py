@@ -1,7 +1,10 @@
 # backend/routes_courses.py
+import os
 from flask import Blueprint, request, jsonify, g
+from backend import jobs
 from backend.db import get_db
-from backend.models import Course
+from backend.models import Course, Document
+from backend.pagination import paginate
 from backend.utils_auth import auth_required
 
 bp = Blueprint("courses", __name__)
@@ -42,19 +45,24 @@ def create_course():
 def my_courses():
     """
     GET /api/courses/mine
-    List all courses owned by the current user.
+    List the courses owned by the current user, newest first (paged: backend/pagination.py).
     """
     db = get_db()
-    q = db.query(Course).filter(Course.user_id == g.user_id).order_by(Course.created_at.desc())
+    q = db.query(Course).filter(Course.user_id == g.user_id)
+    page, err = paginate(q, Course.created_at, Course.id)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
     items = []
-    for c in q.all():
+    for c in page["items"]:
         items.append({
             "id": c.id,
             "name": c.name,
             "description": c.description,
             "created_at": c.created_at.isoformat() if c.created_at else None,
         })
-    return jsonify({"items": items})
+    page["items"] = items
+    return jsonify(page)
 
 @bp.put("/<int:course_id>")
 @auth_required
@@ -86,4 +94,78 @@ def delete_course(course_id):
     # Documents will typically just have course_id set to NULL.
     db.delete(c)
     db.commit()
-    return jsonify({"ok": True})
\ No newline at end of file
+    return jsonify({"ok": True})
+
+
+STUDY_PACK_MAX_ITEMS = int(os.getenv("STUDY_PACK_MAX_ITEMS", "30"))
+
+@bp.post("/<int:course_id>/study-pack")
+@auth_required
+def generate_study_pack(course_id):
+    """
+    POST /api/courses/<id>/study-pack
+    JSON: {
+      "topic_ids": [1, 2],   (optional; default: every topic, plus the course's unfiled documents)
+      "artifacts": {
+        "quiz": {"n_mcq": 5, "n_true_false": 0, "n_short_answer": 0},
+        "flashcards": {"n": 12},
+        "summary": {"detail_level": "brief"}
+      }                      (any subset)
+    }
+    Generates the artifacts for every topic in one background job; answers 202 { job_id }.
+    """
+    db = get_db()
+    c = db.query(Course).filter_by(id=course_id).first()
+    if not c or c.user_id != g.user_id:
+        return jsonify({"error": "course not found or forbidden"}), 404
+
+    data = request.get_json(force=True) or {}
+    wanted = data.get("artifacts") or {}
+    artifacts = {}
+    try:
+        if "quiz" in wanted:
+            q = wanted["quiz"] or {}
+            artifacts["quiz"] = {
+                "n_mcq": int(q.get("n_mcq", 5)),
+                "n_tf": int(q.get("n_true_false", 0)),
+                "n_sa": int(q.get("n_short_answer", 0)),
+            }
+        if "flashcards" in wanted:
+            artifacts["flashcards"] = {"n": int((wanted["flashcards"] or {}).get("n", 12))}
+        if "summary" in wanted:
+            level = (wanted["summary"] or {}).get("detail_level", "brief")
+            artifacts["summary"] = {"detail_level": "detailed" if level == "detailed" else "brief"}
+    except (TypeError, ValueError):
+        return jsonify({"error": "artifact counts must be integers"}), 400
+    if not artifacts:
+        return jsonify({"error": "artifacts must include quiz, flashcards and/or summary"}), 400
+
+    topic_ids = data.get("topic_ids")
+    if topic_ids is not None and not (
+        isinstance(topic_ids, list) and all(isinstance(t, int) and not isinstance(t, bool) for t in topic_ids)
+    ):
+        return jsonify({"error": "topic_ids must be a list of integers"}), 400
+
+    docs = db.query(Document).filter(Document.course_id == course_id).filter(
+        (Document.user_id == g.user_id) | (Document.user_id.is_(None))
+    ).all()
+    topics = [t for t in c.topics if topic_ids is None or t.id in topic_ids]
+    groups = [
+        {"key": f"topic-{t.id}", "name": t.name, "document_ids": [d.id for d in docs if d.topic_id == t.id]}
+        for t in topics
+    ]
+    if topic_ids is None:
+        groups.append({"key": "course", "name": c.name, "document_ids": [d.id for d in docs if d.topic_id is None]})
+    groups = [grp for grp in groups if grp["document_ids"]]
+    if not groups:
+        return jsonify({"error": "no documents in the selected topics"}), 404
+    if len(groups) * len(artifacts) > STUDY_PACK_MAX_ITEMS:
+        return jsonify({"error": f"a study pack is limited to {STUDY_PACK_MAX_ITEMS} items"}), 400
+
+    job = jobs.enqueue(db, "study_pack", g.user_id, {
+        "course_id": course_id,
+        "groups": groups,
+        "artifacts": artifacts,
+    })
+    db.commit()
+    return jsonify({"job_id": job.id, "status": job.status, "items": len(groups) * len(artifacts)}), 202
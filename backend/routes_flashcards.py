@@ -1,9 +1,11 @@
 # backend/routes_flashcards.py
 from flask import Blueprint, request, jsonify, g
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from backend import jobs
 from backend.db import get_db
 from backend.models import Document, FlashcardSet, Flashcard
-from backend.services.extract import read_document_text
-from backend.services.generate import generate_flashcards_from_source
+from backend.pagination import paginate
 from backend.utils_auth import auth_required
 
 bp = Blueprint("flashcards", __name__)
@@ -82,11 +84,24 @@ def list_sets():
     if document_id is not None:
         q = q.filter(FlashcardSet.sources.any(Document.id == document_id))
 
-    q = q.order_by(FlashcardSet.created_at.desc())
+    # Card counts as a correlated subquery (ix_flashcards_set_id) and sources in one
+    # IN query: a fixed number of queries however many sets (backend/bench/bench_queries.py)
+    card_count = (
+        select(func.count(Flashcard.id))
+        .where(Flashcard.set_id == FlashcardSet.id)
+        .correlate(FlashcardSet)
+        .scalar_subquery()
+    )
+    q = q.add_columns(card_count).options(selectinload(FlashcardSet.sources))
+
+    # Newest first, one page at a time (backend/pagination.py)
+    page, err = paginate(q, FlashcardSet.created_at, FlashcardSet.id)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
 
     items = []
-    for s in q.all():
-        count = db.query(Flashcard).filter_by(set_id=s.id).count()
+    for s, count in page["items"]:
         sources_data = [{"id": d.id, "original_name": d.original_name} for d in s.sources]
 
         items.append({
@@ -97,7 +112,8 @@ def list_sets():
             "count": count,
         })
 
-    return jsonify({"items": items})
+    page["items"] = items
+    return jsonify(page)
 
 
 @bp.get("/set/<int:set_id>")
@@ -140,6 +156,8 @@ def get_set_cards(set_id):
 def generate_set():
     payload = request.get_json(force=True)
     n = int(payload.get("n", 12))
+    shards = int(payload["shards"]) if payload.get("shards") else None
+    dedupe_existing = bool(payload.get("dedupe_existing", False))
     title = payload.get("title", "Generated Flashcards")
 
     db = get_db()
@@ -150,48 +168,16 @@ def generate_set():
         msg, code = err
         return jsonify({"error": msg}), code
 
-    # 2. Combine text
-    full_text_parts = []
-    for doc in docs:
-        text = read_document_text(doc.filename)
-        if text:
-            full_text_parts.append(f"--- Source: {doc.original_name} ---\n{text}")
-    combined = "\n\n".join(full_text_parts)
-
-    if not combined or len(combined.split()) < 50:
-        return jsonify({"error": "not enough text to generate flashcards"}), 400
-
-    # 3. Generate
-    try:
-        cards_data = generate_flashcards_from_source(combined, n)
-    except Exception as e:
-        return jsonify({"error": f"flashcard generation failed: {e}"}), 500
-
-    if not cards_data:
-        return jsonify({"error": "no valid flashcards parsed from model output"}), 500
-
-    # 4. Save
-    s = FlashcardSet(
-        user_id=g.user_id,
-        title=title,
-    )
-    db.add(s)
-    db.flush()
-
-    # Link docs
-    s.sources.extend(docs)
-
-    # Add cards
-    for c in cards_data:
-        db.add(Flashcard(set_id=s.id, front=c["front"], back=c["back"]))
-    
-    db.commit()
-
-    return jsonify({
-        "set_id": s.id,
-        "title": s.title,
-        "count": len(cards_data),
+    # 2. Queue extraction + generation (backend/job_handlers.py: run_flashcards_job)
+    job = jobs.enqueue(db, "flashcards", g.user_id, {
+        "document_ids": [d.id for d in docs],
+        "title": title,
+        "n": n,
+        "shards": shards,
+        "dedupe_existing": dedupe_existing,
     })
+    db.commit()
+    return jsonify({"job_id": job.id, "status": job.status}), 202
 
 @bp.put("/set/<int:set_id>")
 @auth_required
@@ -0,0 +1,134 @@
+# backend/routes_jobs.py
+import os
+import json
+import time
+import threading
+from flask import Blueprint, Response, jsonify, g, request
+from sqlalchemy import select
+from backend.db import get_db, get_engine
+from backend.jobs import job_view, request_cancel, TERMINAL_STATES
+from backend.models import Job
+from backend.utils_auth import auth_required
+
+bp = Blueprint("jobs", __name__)
+
+JOB_EVENTS_POLL_SECS = float(os.getenv("JOB_EVENTS_POLL_SECS", "0.5"))
+JOB_EVENTS_HEARTBEAT_SECS = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECS", "15"))
+# Streams end after this long; EventSource reconnects (with Last-Event-ID) so threads are recycled
+JOB_EVENTS_MAX_SECS = float(os.getenv("JOB_EVENTS_MAX_SECS", "120"))
+# Each open stream holds one of the worker's threads (gunicorn --threads 8): past this
+# many, new streams get 429 and the client polls /api/jobs/<id>/result instead
+JOB_EVENTS_MAX_STREAMS = int(os.getenv("JOB_EVENTS_MAX_STREAMS", "4"))
+JOB_EVENTS_RETRY_AFTER_SECS = 5
+
+_stream_slots = threading.BoundedSemaphore(JOB_EVENTS_MAX_STREAMS)
+
+def _get_own_job(job_id):
+    db = get_db()
+    job = db.query(Job).filter_by(id=job_id).first()
+    if not job:
+        return None, (jsonify({"error": "job not found"}), 404)
+    if job.user_id != g.user_id:
+        return None, (jsonify({"error": "forbidden"}), 403)
+    return job, None
+
+@bp.get("/<int:job_id>")
+@auth_required
+def job_status(job_id):
+    job, err = _get_own_job(job_id)
+    if err: return err
+    return jsonify(job_view(job))
+
+@bp.get("/<int:job_id>/result")
+@auth_required
+def job_result(job_id):
+    """
+    200 + the generated object's JSON once the job succeeded,
+    the failure's error/status once it failed, 202 + status while it runs.
+    """
+    job, err = _get_own_job(job_id)
+    if err: return err
+
+    if job.status == "succeeded":
+        return jsonify(json.loads(job.result or "{}"))
+    if job.status in ("failed", "cancelled"):
+        failure = json.loads(job.result or "{}")
+        return jsonify({"error": failure.get("error") or job.error or "job failed"}), failure.get("status", 500)
+    return jsonify(job_view(job)), 202
+
+
+@bp.post("/<int:job_id>/cancel")
+@auth_required
+def job_cancel(job_id):
+    """
+    Stop a job: a queued one never runs, a running one is aborted by its worker
+    (within ~JOB_CANCEL_POLL_SECS) and saves nothing. 409 if it already finished.
+    """
+    job, err = _get_own_job(job_id)
+    if err: return err
+
+    if not request_cancel(get_db(), job):
+        return jsonify({"error": f"job already {job.status}", **job_view(job)}), 409
+    get_db().commit()
+    return jsonify(job_view(job)), 202
+
+
+def _sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@bp.get("/<int:job_id>/events")
+@auth_required
+def job_events(job_id):
+    """
+    Server-Sent Events for one job:
+      event: progress  (id = the job's progress_seq, data = services/progress.py state)
+      event: done      (data = {status, error}) -- then the stream ends
+    Comment lines every JOB_EVENTS_HEARTBEAT_SECS keep proxies from closing an idle stream.
+    A reconnecting client's Last-Event-ID suppresses the event it already has.
+    429 + the job's state while JOB_EVENTS_MAX_STREAMS streams are open in this worker.
+    """
+    job, err = _get_own_job(job_id)
+    if err: return err
+    if not _stream_slots.acquire(blocking=False):
+        resp = jsonify({"error": "too many event streams, poll the job instead", **job_view(job)})
+        return resp, 429, {"Retry-After": str(JOB_EVENTS_RETRY_AFTER_SECS)}
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        last_id = request.args.get("last_event_id", type=int)
+
+    def stream():
+        # Runs after the request context is gone: read through the engine, not the request session
+        query = select(Job.status, Job.error, Job.progress, Job.progress_seq).where(Job.id == job_id)
+        seen = last_id
+        started = last_write = time.monotonic()
+        yield "retry: 2000\n\n"
+        while True:
+            with get_engine().connect() as conn:
+                row = conn.execute(query).first()
+            if row is None:
+                yield _sse("done", {"status": "failed", "error": "job not found"})
+                return
+            if row.progress and row.progress_seq != seen:
+                seen = row.progress_seq
+                yield _sse("progress", dict(json.loads(row.progress), status=row.status), seen)
+                last_write = time.monotonic()
+            if row.status in TERMINAL_STATES:
+                yield _sse("done", {"status": row.status, "error": row.error})
+                return
+
+            now = time.monotonic()
+            if now - started >= JOB_EVENTS_MAX_SECS:
+                return
+            if now - last_write >= JOB_EVENTS_HEARTBEAT_SECS:
+                yield ": keepalive\n\n"
+                last_write = now
+            time.sleep(JOB_EVENTS_POLL_SECS)
+
+    resp = Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # The server closes the response once the stream ends or the client goes away (seen at the next write)
+    resp.call_on_close(_stream_slots.release)
+    return resp
@@ -1,14 +1,13 @@
 # backend/routes_quizzes.py
 from flask import Blueprint, request, jsonify, g
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import selectinload, undefer_group
+from backend import jobs
 from backend.db import get_db
 from backend.models import Document, Quiz, Question, Attempt, AttemptAnswer
-from backend.services.generate import (
-    generate_mcqs_from_source, 
-    generate_true_false_from_source, 
-    generate_short_answer_from_source,
-    grade_short_answers
-)
-from backend.services.extract import read_document_text
+from backend.pagination import paginate
+from backend.services import grading_cache
+from backend.services.pregrade import pregrade
 from backend.utils_auth import auth_required
 import os
 
@@ -47,6 +46,16 @@ def _fetch_docs_from_payload(payload):
     return [], ("no document selection provided", 400)
 
 
+def _load_quiz_for_user(quiz_id):
+    """The quiz if the user may see it (owner, or NULL owner: legacy shared quiz). Returns (quiz, err)."""
+    quiz = get_db().get(Quiz, quiz_id)
+    if not quiz:
+        return None, ("quiz not found", 404)
+    if quiz.user_id is not None and quiz.user_id != g.user_id:
+        return None, ("forbidden", 403)
+    return quiz, None
+
+
 @bp.post("/generate")
 @auth_required
 def generate():
@@ -65,69 +74,30 @@ def generate():
         if "n" in payload and "n_mcq" not in payload:
             n_mcq = int(payload["n"])
 
+        # Optional: force the number of source chunks (default: sized automatically)
+        shards = int(payload["shards"]) if payload.get("shards") else None
+        # Optional: also drop questions close to ones already generated from these documents
+        dedupe_existing = bool(payload.get("dedupe_existing", False))
+
         db = get_db()
         
-        # 1. Resolve documents
+        # 1. Resolve documents (access is checked here; extraction and generation run in a worker)
         docs, err = _fetch_docs_from_payload(payload)
         if err: return jsonify({"error": err[0]}), err[1]
-
-        # 2. Extract Text
-        full_text_parts = []
-        for doc in docs:
-            text = read_document_text(doc.filename)
-            if text:
-                full_text_parts.append(f"--- Source: {doc.original_name} ---\n{text}")
-        combined_text = "\n\n".join(full_text_parts)
-        
-        if not combined_text or len(combined_text.split()) < 50:
-            return jsonify({"error": "not enough text"}), 400
-
-        # 3. Generate Questions in Parallel/Sequence
-        all_questions = []
-
-        # A. MCQs
-        if n_mcq > 0:
-            mcqs = generate_mcqs_from_source(combined_text, n=n_mcq)
-            for m in mcqs: m["type"] = "mcq"
-            all_questions.extend(mcqs)
-
-        # B. True/False
-        if n_tf > 0:
-            tfs = generate_true_false_from_source(combined_text, n=n_tf)
-            for t in tfs: t["type"] = "true_false"
-            all_questions.extend(tfs)
-
-        # C. Short Answer
-        if n_sa > 0:
-            sas = generate_short_answer_from_source(combined_text, n=n_sa)
-            for s in sas: s["type"] = "short_answer"
-            all_questions.extend(sas)
-
-        if not all_questions:
-            return jsonify({"error": "failed to generate any questions"}), 400
-
-        # 4. Save to DB
-        quiz = Quiz(title=title)
-        db.add(quiz)
-        db.flush()
-        quiz.sources.extend(docs)
-
-        for q_data in all_questions:
-            # For short answer, options list is empty, join returns ""
-            opts_str = "|||".join(q_data["options"]) if q_data["options"] else ""
-            
-            q = Question(
-                quiz_id=quiz.id,
-                qtype=q_data["type"],
-                prompt=q_data["prompt"],
-                options=opts_str,
-                answer=q_data["answer"],
-                explanation=q_data.get("explanation", "")
-            )
-            db.add(q)
-        
+        if not docs: return jsonify({"error": "no valid documents found"}), 404
+
+        # 2. Queue the generation (backend/job_handlers.py: run_quiz_job)
+        job = jobs.enqueue(db, "quiz", g.user_id, {
+            "document_ids": [d.id for d in docs],
+            "title": title,
+            "n_mcq": n_mcq,
+            "n_tf": n_tf,
+            "n_sa": n_sa,
+            "shards": shards,
+            "dedupe_existing": dedupe_existing,
+        })
         db.commit()
-        return jsonify({"quiz_id": quiz.id, "count": len(all_questions)})
+        return jsonify({"job_id": job.id, "status": job.status}), 202
 
     except Exception as e:
         import traceback
@@ -139,16 +109,11 @@ def generate():
 @auth_required
 def get_quiz(quiz_id):
     db = get_db()
-    quiz = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not quiz:
-        return jsonify({"error": "quiz not found"}), 404
-    
-    if quiz.sources:
-        first_doc = quiz.sources[0]
-        if first_doc.user_id is not None and first_doc.user_id != g.user_id:
-             return jsonify({"error": "forbidden"}), 403
+    quiz, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
 
-    qs = db.query(Question).filter_by(quiz_id=quiz_id).all()
+    qs = db.query(Question).options(undefer_group("detail")).filter_by(quiz_id=quiz_id).all()
     source_names = [d.original_name for d in quiz.sources]
 
     return jsonify({
@@ -173,19 +138,22 @@ def attempt():
     answers = payload.get("answers", [])
 
     db = get_db()
+    _, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
     qs = list(db.query(Question).filter_by(quiz_id=quiz_id).all())
     if not qs: return jsonify({"error": "quiz not found"}), 404
 
     qmap = {q.id: q for q in qs}
     total = len(qs)
 
-    att = Attempt(quiz_id=quiz_id)
+    att = Attempt(quiz_id=quiz_id, user_id=g.user_id, status="graded")
     db.add(att); db.flush()
 
     # Separate logic: Auto-grade vs AI-grade
     to_grade_ai = [] # list of {id, prompt, correct, user}
     
-    attempt_answers_objects = [] # To bulk add later or update
+    answer_rows = [] # Every answer row of this attempt: scored here, inserted in one batch
 
     for a in answers:
         qid = int(a.get("question_id"))
@@ -198,11 +166,11 @@ def attempt():
         # Logic based on type
         if q.qtype == "short_answer":
             # Queue for AI grading
-            # Create the record as False initially
-            aa = AttemptAnswer(attempt_id=att.id, question_id=qid, user_answer=user_ans, is_correct=False)
-            db.add(aa); db.flush() # Need ID if we want to update, or just reference obj
+            # is_correct stays NULL until a verdict is known
+            aa = {"attempt_id": att.id, "question_id": qid, "user_answer": user_ans, "is_correct": None}
+            answer_rows.append(aa)
             to_grade_ai.append({
-                "db_obj": aa,
+                "row": aa,
                 "item": {
                     "id": qid, 
                     "prompt": q.prompt, 
@@ -218,65 +186,104 @@ def attempt():
                 # MCQ: exact string match of option
                 is_correct = (user_ans == q.answer)
             
-            db.add(AttemptAnswer(attempt_id=att.id, question_id=qid, user_answer=user_ans, is_correct=is_correct))
+            answer_rows.append({"attempt_id": att.id, "question_id": qid, "user_answer": user_ans, "is_correct": is_correct})
 
-    # Perform Batch AI Grading
+    # Short answers: cached and confident local verdicts are final right away,
+    # the rest go to the LLM grader in the background (the attempt stays "pending")
+    pending = []
     if to_grade_ai:
-        ai_items = [x["item"] for x in to_grade_ai]
-        results_map = grade_short_answers(ai_items) # {qid: bool}
+        results_map = grading_cache.lookup(
+            db, [(x["item"]["id"], x["item"]["user_answer"]) for x in to_grade_ai]
+        ) # {qid: bool}
+        unseen = [x["item"] for x in to_grade_ai if x["item"]["id"] not in results_map]
+        if unseen:
+            decided, pending = pregrade(unseen)
+            grading_cache.store(
+                db, [(i["id"], i["user_answer"], decided[i["id"]]) for i in unseen if i["id"] in decided]
+            )
+            results_map.update(decided)
         
         for entry in to_grade_ai:
-            qid = entry["item"]["id"]
-            is_correct = results_map.get(qid, False)
-            entry["db_obj"].is_correct = is_correct
-
+            entry["row"]["is_correct"] = results_map.get(entry["item"]["id"])
+
+    if pending:
+        # Committed together with the attempt (backend/job_handlers.py: run_grade_attempt_job)
+        att.status = "pending"
+        jobs.enqueue(db, "grade_attempt", g.user_id, {"attempt_id": att.id, "total": total, "items": pending})
+    else:
+        correct_count = sum(1 for a in answer_rows if a["is_correct"])
+        att.score_pct = round(100 * correct_count / max(1, total))
+    if answer_rows:
+        db.execute(insert(AttemptAnswer), answer_rows)
     db.commit()
 
-    # Recalculate Score
-    # Reload answers to be safe
-    final_answers = db.query(AttemptAnswer).filter_by(attempt_id=att.id).all()
-    correct_count = sum(1 for a in final_answers if a.is_correct)
-    
-    att.score_pct = round(100 * correct_count / max(1, total))
-    db.commit()
+    return jsonify(_attempt_result(att, answer_rows, total))
 
-    # Build response details
-    details = []
-    for ans in final_answers:
-        details.append({
-            "question_id": ans.question_id,
-            "user_answer": ans.user_answer,
-            "is_correct": ans.is_correct
-        })
 
-    return jsonify({
+def _attempt_result(att, answer_rows, total):
+    """answer_rows: dicts with question_id, user_answer, is_correct."""
+    return {
         "attempt_id": att.id,
-        "correct": correct_count,
+        "status": att.status,
+        "correct": sum(1 for a in answer_rows if a["is_correct"]),
         "total": total,
         "score_pct": att.score_pct,
-        "details": details
-    })
+        "pending": sum(1 for a in answer_rows if a["is_correct"] is None),
+        "details": [{
+            "question_id": a["question_id"],
+            "user_answer": a["user_answer"],
+            "is_correct": a["is_correct"]
+        } for a in answer_rows]
+    }
+
+@bp.get("/attempts/<int:attempt_id>/status")
+@auth_required
+def attempt_status(attempt_id):
+    """Cheap poll target while an attempt's short answers are graded in the background."""
+    db = get_db()
+    att = db.get(Attempt, attempt_id)
+    if not att:
+        return jsonify({"error": "attempt not found"}), 404
+    if att.user_id is not None and att.user_id != g.user_id:
+        return jsonify({"error":"forbidden"}), 403
+
+    total = db.query(Question).filter_by(quiz_id=att.quiz_id).count()
+    ans_rows = [r._asdict() for r in (
+        db.query(AttemptAnswer.question_id, AttemptAnswer.user_answer, AttemptAnswer.is_correct)
+        .filter_by(attempt_id=attempt_id)
+        .order_by(AttemptAnswer.id)
+    )]
+    return jsonify(_attempt_result(att, ans_rows, total))
 
 @bp.get("/mine")
 @auth_required
 def my_quizzes():
     db = get_db()
-    q = (
-        db.query(Quiz)
-        .join(Quiz.sources)
-        .filter((Document.user_id == g.user_id) | (Document.user_id.is_(None)))
-        .distinct()
+    # Own quizzes straight off ix_quizzes_user_created; legacy ownerless ones are
+    # those built from shared documents only
+    q = db.query(Quiz).filter(
+        (Quiz.user_id == g.user_id) | (Quiz.user_id.is_(None) & Quiz.sources.any())
     )
 
     document_id = request.args.get("document_id", type=int)
     if document_id is not None:
-        q = q.filter(Document.id == document_id)
-
-    q = q.order_by(Quiz.created_at.desc()).limit(100)
+        q = q.filter(Quiz.sources.any(Document.id == document_id))
+
+    # Attempt counts as a correlated subquery and sources in one IN query, not one each per quiz
+    attempt_count = (
+        select(func.count(Attempt.id))
+        .where(Attempt.quiz_id == Quiz.id)
+        .correlate(Quiz)
+        .scalar_subquery()
+    )
+    q = q.add_columns(attempt_count).options(selectinload(Quiz.sources))
+    page, err = paginate(q, Quiz.created_at, Quiz.id, default_limit=100)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
 
     items = []
-    for quiz in q.all():
-        cnt = db.query(Attempt).filter_by(quiz_id=quiz.id).count()
+    for quiz, cnt in page["items"]:
         sources_data = [{"id": d.id, "original_name": d.original_name} for d in quiz.sources]
         items.append({
             "quiz_id": quiz.id,
@@ -285,48 +292,44 @@ def my_quizzes():
             "created_at": quiz.created_at.isoformat(),
             "attempts": cnt
         })
-    return jsonify({"items": items})
+    page["items"] = items
+    return jsonify(page)
 
 @bp.get("/<int:quiz_id>/attempts")
 @auth_required
 def quiz_attempts(quiz_id):
     db = get_db()
-    quiz = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not quiz:
-        return jsonify({"error":"not found"}), 404
-    
-    if quiz.sources:
-        first_doc = quiz.sources[0]
-        if first_doc.user_id is not None and first_doc.user_id != g.user_id:
-            return jsonify({"error":"forbidden"}), 403
-
-    atts = db.query(Attempt).filter_by(quiz_id=quiz_id).order_by(Attempt.created_at.desc()).limit(50)
-    return jsonify({
-        "items": [{
-            "id": a.id,
-            "score_pct": a.score_pct,
-            "created_at": a.created_at.isoformat()
-        } for a in atts.all()]
-    })
+    _, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
+
+    q = db.query(Attempt).filter_by(quiz_id=quiz_id)
+    page, err = paginate(q, Attempt.created_at, Attempt.id, default_limit=50)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
+
+    page["items"] = [{
+        "id": a.id,
+        "score_pct": a.score_pct,
+        "status": a.status,
+        "created_at": a.created_at.isoformat()
+    } for a in page["items"]]
+    return jsonify(page)
 
 @bp.get("/<int:quiz_id>/attempts/<int:attempt_id>")
 @auth_required
 def attempt_detail(quiz_id, attempt_id):
     db = get_db()
-    quiz = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not quiz:
-        return jsonify({"error": "quiz not found"}), 404
-        
-    if quiz.sources:
-        first_doc = quiz.sources[0]
-        if first_doc.user_id is not None and first_doc.user_id != g.user_id:
-            return jsonify({"error":"forbidden"}), 403
+    _, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
 
     att = db.query(Attempt).filter_by(id=attempt_id, quiz_id=quiz_id).first()
     if not att:
         return jsonify({"error": "attempt not found"}), 404
 
-    questions = db.query(Question).filter_by(quiz_id=quiz_id).all()
+    questions = db.query(Question).options(undefer_group("detail")).filter_by(quiz_id=quiz_id).all()
     q_by_id = {q.id: q for q in questions}
 
     ans_rows = db.query(AttemptAnswer).filter_by(attempt_id=attempt_id).all()
@@ -351,6 +354,7 @@ def attempt_detail(quiz_id, attempt_id):
         "quiz_id": quiz_id,
         "attempt_id": att.id,
         "score_pct": att.score_pct,
+        "status": att.status,
         "created_at": att.created_at.isoformat() if att.created_at else None,
         "answers": items,
     })
@@ -360,16 +364,11 @@ def attempt_detail(quiz_id, attempt_id):
 @auth_required
 def quiz_answers(quiz_id):
     db = get_db()
-    quiz = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not quiz:
-        return jsonify({"error": "not found"}), 404
-
-    if quiz.sources:
-        first_doc = quiz.sources[0]
-        if first_doc.user_id is not None and first_doc.user_id != g.user_id:
-            return jsonify({"error":"forbidden"}), 403
+    _, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
 
-    qs = db.query(Question).filter_by(quiz_id=quiz_id).order_by(Question.id.asc()).all()
+    qs = db.query(Question).options(undefer_group("detail")).filter_by(quiz_id=quiz_id).order_by(Question.id.asc()).all()
     return jsonify({
         "quiz_id": quiz_id,
         "answers": [
@@ -388,19 +387,9 @@ def quiz_answers(quiz_id):
 @auth_required
 def rename_quiz(quiz_id):
     db = get_db()
-    # Ownership check via sources logic is tricky for updates, 
-    # usually we'd store user_id on quiz. 
-    # But assuming standard logic:
-    q = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not q: return jsonify({"error": "not found"}), 404
-    
-    # Simple ownership check: if user owns ANY source doc, they can rename
-    # OR we rely on the fact that they found it in "mine" list.
-    # Ideally, add user_id to Quiz model for strict ownership, 
-    # but sticking to current logic:
-    if q.sources:
-        if q.sources[0].user_id != g.user_id and q.sources[0].user_id is not None:
-             return jsonify({"error": "forbidden"}), 403
+    q, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
 
     data = request.get_json()
     if "title" in data:
@@ -412,11 +401,10 @@ def rename_quiz(quiz_id):
 @auth_required
 def delete_quiz(quiz_id):
     db = get_db()
-    q = db.query(Quiz).filter_by(id=quiz_id).first()
-    if not q: return jsonify({"error": "not found"}), 404
-    
-    # Strict ownership check would go here
-    
+    q, err = _load_quiz_for_user(quiz_id)
+    if err:
+        return jsonify({"error": err[0]}), err[1]
+
     db.delete(q) # Cascades to Questions/Attempts
     db.commit()
     return jsonify({"ok": True})
\ No newline at end of file
@@ -1,15 +1,24 @@
 # backend/routes_summaries.py
 import os
-from flask import Blueprint, request, jsonify, g, send_file
+import time
+from flask import Blueprint, Response, request, jsonify, g
+from sqlalchemy.orm import selectinload, undefer
+from backend import jobs
 from backend.db import get_db
-from backend.models import Document, Summary
-from backend.services.extract import read_document_text, UPLOAD_DIR
-from backend.services.generate import generate_summary_from_source
-from backend.services.tts import generate_audio_for_summary
+from backend.models import AudioBlob, Document, Summary
+from backend.pagination import paginate
+from backend.services.extract import UPLOAD_DIR
+from backend.services import audio_cache
+from backend.services.tts import blob_filename, clean_text_for_speech, find_partial
 from backend.utils_auth import auth_required
+from backend.utils_files import send_stored_file
 
 bp = Blueprint("summaries", __name__)
 
+AUDIO_STREAM_POLL_SECS = 0.25
+# Stop following a .part file that hasn't grown for this long (its worker died)
+AUDIO_STREAM_IDLE_SECS = float(os.getenv("AUDIO_STREAM_IDLE_SECS", "60"))
+
 # ... [Keep your existing _fetch_docs_from_payload helper exactly as is] ...
 def _fetch_docs_from_payload(payload):
     # Duplicate helper for self-contained file changes
@@ -42,7 +51,7 @@ def _fetch_docs_from_payload(payload):
 @bp.get("/")
 @auth_required
 def list_summaries():
-    """List all summaries owned by user."""
+    """List the user's summaries, newest first, one page at a time (backend/pagination.py)."""
     db = get_db()
     q = db.query(Summary).filter_by(user_id=g.user_id)
     
@@ -50,39 +59,49 @@ def list_summaries():
     if doc_id:
         q = q.filter(Summary.sources.any(Document.id == doc_id))
         
-    q = q.order_by(Summary.created_at.desc())
+    q = q.options(selectinload(Summary.sources))
+    page, err = paginate(q, Summary.created_at, Summary.id)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
     
     items = []
-    for s in q.all():
+    for s in page["items"]:
         sources_data = [{"id": d.id, "original_name": d.original_name} for d in s.sources]
         items.append({
             "id": s.id,
             "title": s.title or "Untitled Summary",
             "sources": sources_data,
             "created_at": s.created_at.isoformat() if s.created_at else None,
-            "preview": s.content[:100] + "..." if s.content else ""
+            "preview": s.preview + "..." if s.preview else "",
+            "word_count": s.word_count
         })
-    return jsonify({"items": items})
+    page["items"] = items
+    return jsonify(page)
 
 
 @bp.get("/<int:summary_id>")
 @auth_required
 def get_summary(summary_id):
     db = get_db()
-    s = db.query(Summary).filter_by(id=summary_id).first()
+    s = db.query(Summary).options(undefer(Summary.content)).filter_by(id=summary_id).first()
     if not s:
         return jsonify({"error": "summary not found"}), 404
     if s.user_id != g.user_id:
         return jsonify({"error": "forbidden"}), 403
 
     source_names = [d.original_name for d in s.sources]
+    blob = db.get(AudioBlob, s.audio_blob_id) if s.audio_blob_id else None
     return jsonify({
         "id": s.id,
         "title": s.title,
         "content": s.content,
+        "word_count": s.word_count,
         "sources": source_names,
         "created_at": s.created_at.isoformat() if s.created_at else None,
-        "audio_filename": s.audio_filename  # <--- Added field
+        "audio_filename": s.audio_filename,  # <--- Added field
+        # Content hash of the audio; GET .../audio?v=<audio_etag> is cacheable for good
+        "audio_etag": blob.key if blob else None
     })
 
 
@@ -99,36 +118,14 @@ def generate_summary():
         msg, code = err
         return jsonify({"error": msg}), code
 
-    full_text_parts = []
-    for doc in docs:
-        text = read_document_text(doc.filename)
-        if text:
-            full_text_parts.append(f"--- Source: {doc.original_name} ---\n{text}")
-    combined = "\n\n".join(full_text_parts)
-
-    if not combined or len(combined.split()) < 50:
-        return jsonify({"error": "not enough text"}), 400
-
-    try:
-        text = generate_summary_from_source(combined, detail_level=detail_level)
-    except Exception as e:
-        return jsonify({"error": f"generation failed: {e}"}), 500
-
-    s = Summary(
-        user_id=g.user_id,
-        content=text,
-        title=title
-    )
-    db.add(s)
-    db.flush()
-    s.sources.extend(docs)
-    db.commit()
-
-    return jsonify({
-        "id": s.id,
-        "title": s.title,
-        "content": s.content,
+    # Extraction and generation run in a worker (backend/job_handlers.py: run_summary_job)
+    job = jobs.enqueue(db, "summary", g.user_id, {
+        "document_ids": [d.id for d in docs],
+        "title": title,
+        "detail_level": detail_level,
     })
+    db.commit()
+    return jsonify({"job_id": job.id, "status": job.status}), 202
 
 @bp.put("/<int:id>")
 @auth_required
@@ -153,7 +150,8 @@ def delete_summary(id):
         return jsonify({"error": "forbidden"}), 403
 
     # --- NEW LOGIC: DELETE AUDIO FILE IF EXISTS ---
-    if s.audio_filename:
+    # (cached audio is shared by content and left to LRU eviction; see services/audio_cache.py)
+    if s.audio_filename and s.audio_blob_id is None:
         path = os.path.join(UPLOAD_DIR, s.audio_filename)
         if os.path.exists(path):
             try:
@@ -175,48 +173,85 @@ def generate_summary_audio(summary_id):
     voice = payload.get("voice", "us") 
 
     db = get_db()
-    s = db.query(Summary).filter_by(id=summary_id).first()
+    s = db.query(Summary).options(undefer(Summary.content)).filter_by(id=summary_id).first()
     
     if not s: return jsonify({"error": "not found"}), 404
     if s.user_id != g.user_id: return jsonify({"error": "forbidden"}), 403
 
-    # CLEANUP: If an audio file already exists (perhaps with a different name/accent), delete it first
-    if s.audio_filename:
-        old_path = os.path.join(UPLOAD_DIR, s.audio_filename)
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except Exception as e:
-                print(f"Warning: Could not delete old audio: {e}")
-
-    try:
-        # Strip markdown asterisks for cleaner reading
-        clean_text = s.content.replace("**", "").replace("#", "")
-        filename = generate_audio_for_summary(clean_text, voice, s.id)
-        
-        if not filename:
-            return jsonify({"error": "Audio generation failed"}), 500
-
-        s.audio_filename = filename
+    # Same text and voice synthesized before (by any summary): switch to it right away
+    blob = audio_cache.lookup(db, audio_cache.cache_key(clean_text_for_speech(s.content), voice))
+    if blob is not None:
+        audio_cache.attach(s, blob)
         db.commit()
-        
-        return jsonify({"ok": True, "audio_filename": filename})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"ok": True, "audio_filename": blob.filename, "audio_etag": blob.key, "cached": True})
+
+    # Synthesis runs in a worker (backend/job_handlers.py: run_summary_audio_job)
+    job = jobs.enqueue(db, "summary_audio", g.user_id, {"summary_id": s.id, "voice": voice})
+    db.commit()
+    return jsonify({"job_id": job.id, "status": job.status}), 202
 
 @bp.get("/<int:summary_id>/audio")
 @auth_required
 def get_summary_audio(summary_id):
+    """
+    The summary's MP3, or with ?voice= the one for that voice. While it is still
+    being synthesized, the segments written so far are streamed and the response
+    follows the file until it is complete.
+    """
     db = get_db()
     s = db.query(Summary).filter_by(id=summary_id).first()
     
-    if not s or not s.audio_filename:
+    if not s:
         return jsonify({"error": "audio not found"}), 404
     if s.user_id != g.user_id:
         return jsonify({"error": "forbidden"}), 403
 
-    path = os.path.join(UPLOAD_DIR, s.audio_filename)
+    voice = request.args.get("voice")
+    key = None
+    if voice:
+        key = audio_cache.cache_key(clean_text_for_speech(s.content), voice)
+        filename = blob_filename(key)
+    else:
+        filename = s.audio_filename
+    if not filename:
+        return jsonify({"error": "audio not found"}), 404
+    path = os.path.join(UPLOAD_DIR, filename)
+    part = find_partial(path)
+    if part:
+        return Response(_follow_partial(path, part), mimetype="audio/mpeg", headers={"Cache-Control": "no-store"})
     if not os.path.exists(path):
         return jsonify({"error": "file missing"}), 404
 
-    return send_file(path, mimetype="audio/mpeg")
\ No newline at end of file
+    if not voice and s.audio_blob_id:
+        blob = audio_cache.record_play(db, s.audio_blob_id)
+        key = blob.key if blob else None
+        db.commit()
+    # Cached blobs are named after their content key, which is their ETag; legacy
+    # per-summary files fall back to Werkzeug's mtime/size tag. Range requests (seeking) -> 206.
+    return send_stored_file(path, mimetype="audio/mpeg", etag=key)
+
+
+def _follow_partial(path, part):
+    try:
+        f = open(part, "rb")
+    except FileNotFoundError:  # finished (or failed) in the meantime
+        f = open(path, "rb") if os.path.exists(path) else None
+    if f is None:
+        return
+    with f:
+        idle_since = time.monotonic()
+        while True:
+            chunk = f.read(64 * 1024)
+            if chunk:
+                idle_since = time.monotonic()
+                yield chunk
+                continue
+            # At the end of what's written: done once the .part was renamed (or removed on failure)
+            if not os.path.exists(part):
+                rest = f.read()
+                if rest:
+                    yield rest
+                return
+            if time.monotonic() - idle_since > AUDIO_STREAM_IDLE_SECS:
+                return
+            time.sleep(AUDIO_STREAM_POLL_SECS)
\ No newline at end of file
@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify, g
 from backend.db import get_db
 from backend.models import Course, Topic
+from backend.pagination import paginate
 from backend.utils_auth import auth_required
 
 bp = Blueprint("topics", __name__)
@@ -62,7 +63,7 @@ def create_topic():
 def topics_by_course(course_id):
     """
     GET /api/topics/by_course/<course_id>
-    List topics for a given course (owned by current user).
+    List topics for a given course (owned by current user), oldest first (paged: backend/pagination.py).
     """
     db = get_db()
     course, err = _load_course_for_user(course_id)
@@ -70,14 +71,14 @@ def topics_by_course(course_id):
         msg, code = err
         return jsonify({"error": msg}), code
 
-    q = (
-        db.query(Topic)
-        .filter(Topic.user_id == g.user_id, Topic.course_id == course.id)
-        .order_by(Topic.created_at.asc())
-    )
+    q = db.query(Topic).filter(Topic.user_id == g.user_id, Topic.course_id == course.id)
+    page, err = paginate(q, Topic.created_at, Topic.id, descending=False)
+    if err:
+        msg, code = err
+        return jsonify({"error": msg}), code
 
     items = []
-    for t in q.all():
+    for t in page["items"]:
         items.append({
             "id": t.id,
             "course_id": t.course_id,
@@ -85,7 +86,8 @@ def topics_by_course(course_id):
             "description": t.description,
             "created_at": t.created_at.isoformat() if t.created_at else None,
         })
-    return jsonify({"items": items})
+    page["items"] = items
+    return jsonify(page)
 
 @bp.put("/<int:topic_id>")
 @auth_required
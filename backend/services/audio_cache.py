@@ -0,0 +1,143 @@
+# backend/services/audio_cache.py
+"""
+Content-addressed cache of synthesized summary audio.
+
+Audio is keyed by sha256(engine version, voice, cleaned text) and stored once
+as tts_<key>.mp3 (table audio_blobs). A summary points at the blob for its
+current voice; blobs for its other voices stay, so switching back is a lookup.
+Total size is bounded by TTS_CACHE_MAX_BYTES: least recently used blobs are
+deleted first, and summaries pointing at them lose their audio.
+
+Writes are kept short: lookup() only reads, so a job can look up, synthesize
+for minutes and then record the result with store_and_evict() in its own
+transaction. Evicted files are unlinked only after that transaction commits.
+"""
+import os
+import hashlib
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from backend.db import get_engine, retry_on_busy
+from backend.models import AudioBlob, Summary
+from backend.services import metrics
+from backend.services.extract import UPLOAD_DIR
+from backend.services.tts import engine_version, blob_filename
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))   # 1 GB
+TOUCH_INTERVAL = timedelta(minutes=10)   # at most one last_used_at write per blob per interval
+
+
+def cache_key(text: str, voice: str) -> str:
+    raw = f"{engine_version()}\n{voice}\n{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(blob: AudioBlob) -> str:
+    return os.path.join(UPLOAD_DIR, blob.filename)
+
+
+def touch(blob: AudioBlob) -> None:
+    now = datetime.utcnow()
+    if blob.last_used_at is None or now - blob.last_used_at >= TOUCH_INTERVAL:
+        blob.last_used_at = now
+
+
+def record_play(db, blob_id: int) -> Optional[AudioBlob]:
+    blob = db.get(AudioBlob, blob_id)
+    if blob is not None:
+        touch(blob)
+    return blob
+
+
+def lookup(db, key: str) -> Optional[AudioBlob]:
+    """
+    The cached blob for `key`, or None. A row whose file has gone missing is a
+    miss; store() takes it over when the audio is synthesized again.
+    """
+    blob = db.query(AudioBlob).filter_by(key=key).first()
+    if blob is not None and not os.path.exists(_path(blob)):
+        blob = None
+    metrics.incr("tts.cache_hits" if blob else "tts.cache_misses")
+    if blob:
+        touch(blob)
+    return blob
+
+
+def store(db, key: str, voice: str) -> AudioBlob:
+    """Record the file just synthesized for `key` (its name is tts.blob_filename(key))."""
+    blob = db.query(AudioBlob).filter_by(key=key).first()
+    if blob is None:
+        blob = AudioBlob(key=key, filename=blob_filename(key), voice=voice)
+        db.add(blob)
+    blob.size = os.path.getsize(os.path.join(UPLOAD_DIR, blob.filename))
+    blob.last_used_at = datetime.utcnow()
+    db.flush()
+    return blob
+
+
+def store_and_evict(key: str, voice: str) -> int:
+    """
+    store() the file just synthesized for `key` and evict() around it, in one
+    short transaction of its own; the evicted files are deleted once it has
+    committed. Returns the blob id.
+    """
+    def write():
+        # Own session, not the thread's scoped one: that is the caller's, still open
+        with Session(get_engine()) as db, db.begin():
+            blob = store(db, key, voice)
+            return blob.id, evict(db, keep={blob.id})
+    blob_id, paths = retry_on_busy(write)
+    _unlink(paths)
+    return blob_id
+
+
+def attach(summary: Summary, blob: AudioBlob) -> None:
+    summary.audio_blob_id = blob.id
+    summary.audio_filename = blob.filename
+
+
+def _drop(db, blob: AudioBlob) -> str:
+    """Delete the blob's row (summaries using it lose their audio); returns its file, to unlink after commit."""
+    db.execute(
+        update(Summary)
+        .where(Summary.audio_blob_id == blob.id)
+        .values(audio_blob_id=None, audio_filename=None)
+    )
+    db.delete(blob)
+    return _path(blob)
+
+
+def _unlink(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting cached audio {path}: {e}")
+
+
+def evict(db, keep: Iterable[int] = ()) -> List[str]:
+    """
+    Drop least recently used blobs until the cache fits TTS_CACHE_MAX_BYTES.
+    Returns their files: the caller deletes them once the transaction has committed.
+    """
+    total = db.query(func.coalesce(func.sum(AudioBlob.size), 0)).scalar()
+    if total <= TTS_CACHE_MAX_BYTES:
+        return []
+    keep = set(keep)
+    victims, freed = [], 0
+    for blob_id, size in db.query(AudioBlob.id, AudioBlob.size).order_by(AudioBlob.last_used_at.asc()):
+        if total - freed <= TTS_CACHE_MAX_BYTES:
+            break
+        if blob_id not in keep:
+            victims.append(blob_id)
+            freed += size
+    paths = [_drop(db, blob) for blob in db.query(AudioBlob).filter(AudioBlob.id.in_(victims)).all()]
+    db.flush()
+    metrics.incr("tts.cache_evictions", len(victims))
+    metrics.incr("tts.cache_evicted_bytes", freed)
+    return paths
@@ -0,0 +1,108 @@
+# backend/services/dedup.py
+"""
+Near-duplicate detection for generated questions and flashcards.
+
+Items are reduced to word 3-shingles of their normalized text, summarised by a
+MinHash signature and indexed with LSH banding, so checking an item costs a
+fixed number of hash lookups rather than a comparison against every other item.
+Candidate pairs are confirmed with the exact Jaccard similarity of their shingles.
+"""
+import os
+import re
+import hashlib
+import random
+from typing import List, Dict, Iterable, Callable, Set, Tuple
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))  # Jaccard similarity that counts as a duplicate
+
+SHINGLE_SIZE = 3
+NUM_PERM = 32
+BANDS = 8                       # 8 bands x 4 rows: ~89% candidate rate at Jaccard 0.7, ~99% at 0.8
+ROWS = NUM_PERM // BANDS
+
+_PRIME = (1 << 31) - 1          # small ints keep the per-shingle arithmetic cheap
+_rng = random.Random(1337)      # fixed: signatures must agree across processes
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def _shingles(text: str) -> Set[int]:
+    words = normalize(text).split()
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "big")
+        for g in grams
+    }
+
+
+def _signature(shingles: Set[int]) -> Tuple[int, ...]:
+    return tuple(min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMS)
+
+
+def item_text(item: Dict) -> str:
+    """Text an item is compared on: prompt + answer for questions, front + back for cards."""
+    if "front" in item:
+        return f"{item.get('front', '')} {item.get('back', '')}"
+    return f"{item.get('prompt', '')} {item.get('answer', '')}"
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index; add() returns False for an item too similar to one already added."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._shingles: List[Set[int]] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def _bands(self, sig: Tuple[int, ...]):
+        for b in range(BANDS):
+            yield (b, sig[b * ROWS:(b + 1) * ROWS])
+
+    def _is_duplicate(self, shingles: Set[int], bands) -> bool:
+        checked = set()
+        for band in bands:
+            for idx in self._buckets.get(band, ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                other = self._shingles[idx]
+                if len(shingles & other) / len(shingles | other) >= self.threshold:
+                    return True
+        return False
+
+    def add(self, text: str) -> bool:
+        shingles = _shingles(text)
+        if not shingles:
+            return False
+        bands = list(self._bands(_signature(shingles)))
+        if self._is_duplicate(shingles, bands):
+            return False
+        idx = len(self._shingles)
+        self._shingles.append(shingles)
+        for band in bands:
+            self._buckets.setdefault(band, []).append(idx)
+        return True
+
+
+def dedupe_items(
+    items: List[Dict],
+    existing_texts: Iterable[str] = (),
+    threshold: float = DEDUP_THRESHOLD,
+    key: Callable[[Dict], str] = item_text,
+) -> List[Dict]:
+    """
+    Keep the first of every group of near-duplicate items, in order.
+    Items close to any of `existing_texts` (e.g. already stored questions) are dropped too.
+    """
+    index = NearDuplicateIndex(threshold)
+    for text in existing_texts:
+        index.add(text)
+    return [item for item in items if index.add(key(item))]
@@ -2,7 +2,9 @@ import os
 import pdfplumber
 from pptx import Presentation
 
-UPLOAD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "uploads"))
+UPLOAD_DIR = os.path.abspath(os.getenv(
+    "UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "uploads")
+))
 MAX_CHARS_HARD_LIMIT = 75_000  # ~25k tokens; safe for most 32k-context models
 
 def _read_pdf_text(path: str) -> str:
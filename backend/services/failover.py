@@ -0,0 +1,122 @@
+# backend/services/failover.py
+import os
+import time
+import threading
+from collections import deque
+from typing import Optional, Dict, Any
+
+# --- Breaker config ---
+BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))            # calls remembered per provider
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))       # don't judge on fewer calls
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5")) # open at this failure ratio
+BREAKER_SLOW_SECS = float(os.getenv("LLM_BREAKER_SLOW_SECS", "120"))   # open when p95 latency exceeds this
+BREAKER_COOLDOWN_SECS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker over a rolling window of recent calls.
+
+    - closed:    calls flow; opens when the error rate or p95 latency is too high
+    - open:      calls are refused until the cooldown has passed
+    - half_open: a single probe call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._calls = deque(maxlen=BREAKER_WINDOW)  # (ok: bool, latency: float)
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN_SECS:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN:
+                # A probe that was granted but never reported back must not wedge the breaker
+                stale = time.monotonic() - self._probe_started >= BREAKER_COOLDOWN_SECS
+                if not self._probe_in_flight or stale:
+                    self._probe_in_flight = True
+                    self._probe_started = time.monotonic()
+                    return True
+            return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                    return
+
+            self._calls.append((ok, latency))
+            if self.state == CLOSED and self._should_open():
+                self._open()
+
+    def p95(self) -> Optional[float]:
+        """p95 latency of successful calls in the window, or None without data."""
+        with self._lock:
+            return _percentile([lat for ok, lat in self._calls if ok], 0.95)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+        failures = sum(1 for ok, _ in calls if not ok)
+        return {
+            "state": self.state,
+            "calls": len(calls),
+            "error_rate": round(failures / len(calls), 3) if calls else 0.0,
+            "p95_secs": _percentile([lat for ok, lat in calls if ok], 0.95),
+        }
+
+    def _should_open(self) -> bool:
+        if len(self._calls) < BREAKER_MIN_CALLS:
+            return False
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        if failures / len(self._calls) >= BREAKER_ERROR_RATE:
+            return True
+        p95 = _percentile([lat for _, lat in self._calls], 0.95)
+        return p95 is not None and p95 > BREAKER_SLOW_SECS
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        print(f"LLM circuit breaker opened for provider '{self.name}'")
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
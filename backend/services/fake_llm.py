@@ -0,0 +1,274 @@
+# backend/services/fake_llm.py
+"""
+Deterministic stand-in for the LLM providers, for load tests and local dev.
+
+Speaks both APIs that services/llm.py talks to:
+- Ollama:     POST /api/generate            (streaming NDJSON)
+- OpenRouter: POST /v1/chat/completions     (JSON, or SSE when "stream": true)
+              POST /api/v1/chat/completions
+
+Output is derived from the prompt (same prompt -> same text) and follows the
+MCQ / True-False / Short Answer / flashcard / grading formats the parsers in
+services/generate.py expect (or their JSON shapes when a schema is requested),
+so every route works end to end without a GPU.
+
+Run:
+    python -m backend.services.fake_llm --port 11435 --ttft-ms 300 --tokens-per-sec 60
+then point OLLAMA_URL=http://localhost:11435 (or OPENROUTER_URL=http://localhost:11435/v1).
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+
+# --- Defaults (overridable by CLI flags) ---
+FAKE_LLM_TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "200"))
+FAKE_LLM_TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "80"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))   # share of requests answered with HTTP 500
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were",
+    "be", "by", "with", "as", "at", "it", "this", "that", "from", "into", "its", "their",
+}
+
+
+def _source_words(prompt: str) -> List[str]:
+    """Content words from the quoted source block (or the whole prompt as a fallback)."""
+    m = re.search(r'"""(.*?)"""', prompt, re.DOTALL)
+    text = m.group(1) if m else prompt
+    words = [w for w in re.findall(r"[A-Za-z][A-Za-z\-]{2,}", text) if w.lower() not in _STOPWORDS]
+    return words or ["concept", "process", "system", "result", "method", "model"]
+
+
+def _requested_count(prompt: str, default: int = 5) -> int:
+    m = re.search(r"(?:exactly|Create)\s+(\d+)\s+(?!options)", prompt)
+    return int(m.group(1)) if m else default
+
+
+def _phrase(rng: random.Random, words: List[str], n: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(n))
+
+
+def fake_completion(prompt: str, structured: bool = False) -> str:
+    """
+    Deterministic completion for a prompt, in the format the prompt asks for.
+    With `structured`, emit the JSON shapes of the schemas in services/generate.py.
+    """
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    words = _source_words(prompt)
+    n = _requested_count(prompt)
+
+    if "Student Answer:" in prompt:
+        ids = re.findall(r"^ID:\s*(\d+)", prompt, re.MULTILINE)
+        verdicts = {i: rng.random() < 0.6 for i in ids}
+        if structured:
+            return json.dumps({"results": [{"id": int(i), "correct": v} for i, v in verdicts.items()]})
+        return json.dumps(verdicts)
+
+    if "True/False" in prompt:
+        items = [{
+            "statement": f"{_phrase(rng, words, 8).capitalize()}.",
+            "answer": rng.random() < 0.5,
+            "explanation": f"{_phrase(rng, words, 12).capitalize()}.",
+        } for _ in range(n)]
+        if structured:
+            return json.dumps({"questions": items})
+        blocks = [
+            f"Q: {i['statement']}\nAnswer: {'True' if i['answer'] else 'False'}\nExplanation: {i['explanation']}"
+            for i in items
+        ]
+    elif "short answer" in prompt.lower():
+        items = [{
+            "question": f"What is the role of {_phrase(rng, words, 3)}?",
+            "answer": f"{_phrase(rng, words, 14).capitalize()}.",
+            "explanation": f"{_phrase(rng, words, 10).capitalize()}.",
+        } for _ in range(n)]
+        if structured:
+            return json.dumps({"questions": items})
+        blocks = [f"Q: {i['question']}\nAnswer: {i['answer']}\nExplanation: {i['explanation']}" for i in items]
+    elif "flashcards" in prompt:
+        items = [{
+            "front": f"{_phrase(rng, words, 5).capitalize()}?",
+            "back": f"{_phrase(rng, words, 12).capitalize()}.",
+        } for _ in range(n)]
+        if structured:
+            return json.dumps({"cards": items})
+        blocks = [f"Q: {i['front']}\nA: {i['back']}" for i in items]
+    elif "MCQs" in prompt or "multiple-choice" in prompt:
+        items = [{
+            "question": f"Which statement about {_phrase(rng, words, 2)} is correct?",
+            "options": [_phrase(rng, words, 4).capitalize() for _ in range(4)],
+            "answer": rng.choice("ABCD"),
+            "explanation": f"{_phrase(rng, words, 12).capitalize()}.",
+        } for _ in range(n)]
+        if structured:
+            return json.dumps({"questions": items})
+        blocks = [
+            f"Q: {i['question']}\n"
+            + "".join(f"{letter}) {opt}\n" for letter, opt in zip("ABCD", i["options"]))
+            + f"Answer: {i['answer']}\nExplanation: {i['explanation']}"
+            for i in items
+        ]
+    else:
+        paragraphs = [_phrase(rng, words, 60).capitalize() + "." for _ in range(3)]
+        bullets = [f"- {_phrase(rng, words, 8).capitalize()}" for _ in range(5)]
+        return "\n\n".join(paragraphs) + "\n\n" + "\n".join(bullets)
+
+    return "\n\n---\n\n".join(blocks)
+
+
+def _tokens(text: str) -> List[str]:
+    # Roughly word-sized pieces, whitespace kept so the stream re-joins exactly
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ttft_ms = FAKE_LLM_TTFT_MS
+    tokens_per_sec = FAKE_LLM_TOKENS_PER_SEC
+    error_rate = FAKE_LLM_ERROR_RATE
+    rng = random.Random(FAKE_LLM_SEED)
+    rng_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except Exception:
+            return {}
+
+    def _inject_error(self) -> bool:
+        with self.rng_lock:
+            fail = self.rng.random() < self.error_rate
+        if fail:
+            body = b'{"error": "injected failure"}'
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        return fail
+
+    def _pace(self, pieces: List[str]):
+        """Yield pieces at the configured time-to-first-token and token rate."""
+        time.sleep(self.ttft_ms / 1000.0)
+        delay = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+        for i, piece in enumerate(pieces):
+            if i and delay:
+                time.sleep(delay)
+            yield piece
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path.rstrip("/") == "/api/generate":
+            return self._ollama(body)
+        if self.path.rstrip("/") in ("/v1/chat/completions", "/api/v1/chat/completions"):
+            return self._chat(body)
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _ollama(self, body: dict):
+        if self._inject_error():
+            return
+        model = body.get("model", "fake")
+        limit = int((body.get("options") or {}).get("num_predict") or 1_000_000)
+        structured = bool(body.get("format"))
+        pieces = _tokens(fake_completion(body.get("prompt", ""), structured))[:limit]
+
+        self._start_stream("application/x-ndjson")
+        for piece in self._pace(pieces):
+            line = json.dumps({"model": model, "response": piece, "done": False}) + "\n"
+            self._write_chunk(line.encode("utf-8"))
+        done = json.dumps({"model": model, "response": "", "done": True, "eval_count": len(pieces)}) + "\n"
+        self._write_chunk(done.encode("utf-8"))
+        self._write_chunk(b"")
+
+    def _chat(self, body: dict):
+        if self._inject_error():
+            return
+        model = body.get("model", "fake")
+        prompt = "\n".join(
+            m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user"
+        )
+        limit = int(body.get("max_tokens") or 1_000_000)
+        structured = bool(body.get("response_format"))
+        pieces = _tokens(fake_completion(prompt, structured))[:limit]
+
+        if body.get("stream"):
+            self._start_stream("text/event-stream")
+            for piece in self._pace(pieces):
+                event = {"model": model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+            return
+
+        text = "".join(self._pace(pieces))
+        payload = json.dumps({
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"completion_tokens": len(pieces)},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections (or aborting streams) is expected under load
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 11435, ttft_ms: float = FAKE_LLM_TTFT_MS,
+                tokens_per_sec: float = FAKE_LLM_TOKENS_PER_SEC, error_rate: float = FAKE_LLM_ERROR_RATE,
+                seed: int = FAKE_LLM_SEED) -> ThreadingHTTPServer:
+    """Build (but don't start) a server; port=0 picks a free port."""
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {
+        "ttft_ms": ttft_ms,
+        "tokens_per_sec": tokens_per_sec,
+        "error_rate": error_rate,
+        "rng": random.Random(seed),
+        "rng_lock": threading.Lock(),
+    })
+    server = _QuietServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama/OpenRouter server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft-ms", type=float, default=FAKE_LLM_TTFT_MS)
+    parser.add_argument("--tokens-per-sec", type=float, default=FAKE_LLM_TOKENS_PER_SEC)
+    parser.add_argument("--error-rate", type=float, default=FAKE_LLM_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=FAKE_LLM_SEED)
+    args = parser.parse_args()
+
+    srv = make_server(args.host, args.port, args.ttft_ms, args.tokens_per_sec, args.error_rate, args.seed)
+    print(f"Fake LLM listening on http://{args.host}:{srv.server_port}")
+    srv.serve_forever()
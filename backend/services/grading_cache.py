@@ -0,0 +1,62 @@
+# backend/services/grading_cache.py
+import hashlib
+from typing import Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.models import GradingCache
+from backend.services import metrics
+from backend.services.pregrade import normalize_answer
+
+
+def answer_hash(user_answer: str) -> str:
+    return hashlib.sha256(normalize_answer(user_answer).encode("utf-8")).hexdigest()
+
+
+def lookup(db, answers: List[Tuple[int, str]]) -> Dict[int, bool]:
+    """
+    answers: [(question_id, user_answer)]
+    Returns {question_id: is_correct} for the answers already graded before.
+    """
+    if not answers:
+        return {}
+    wanted = {(qid, answer_hash(ans)) for qid, ans in answers}
+    rows = (
+        db.query(GradingCache.question_id, GradingCache.answer_hash, GradingCache.is_correct)
+        .filter(GradingCache.question_id.in_({qid for qid, _ in wanted}))
+        .filter(GradingCache.answer_hash.in_({h for _, h in wanted}))
+        .all()
+    )
+    hits = {qid: ok for qid, h, ok in rows if (qid, h) in wanted}
+    metrics.incr("grade.cache_hits", len(hits))
+    metrics.incr("grade.cache_misses", len(answers) - len(hits))
+    return hits
+
+
+def store(db, verdicts: List[Tuple[int, str, bool]]) -> None:
+    """
+    verdicts: [(question_id, user_answer, is_correct)]
+    Concurrent attempts may grade the same answer; the first stored verdict wins.
+    """
+    if not verdicts:
+        return
+    rows = [
+        {"question_id": qid, "answer_hash": answer_hash(ans), "is_correct": bool(ok)}
+        for qid, ans, ok in verdicts
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite_insert(GradingCache).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = pg_insert(GradingCache).on_conflict_do_nothing()
+    else:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(GradingCache.__table__.insert(), row)
+            except IntegrityError:
+                pass
+        return
+    db.execute(stmt, rows)
@@ -2,8 +2,17 @@
 import os
 from dotenv import load_dotenv
 import json
+import time
+import hashlib
 import requests
-from typing import Optional
+import threading
+import contextvars
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from backend.services import metrics, progress
+from backend.services.failover import get_breaker
+from backend.services.scheduler import llm_slot
 
 load_dotenv()
 
@@ -17,6 +26,88 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:1b")
 # OpenRouter
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-72b-instruct")
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1")
+
+# --- Failover / hedging ---
+# Comma separated providers tried after the routed one, e.g. "openrouter"
+LLM_FALLBACK_PROVIDERS = [
+    p.strip().lower() for p in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",") if p.strip()
+]
+# Hedging: if the primary hasn't answered after ~its p95 latency, also ask the secondary
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2.0"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "20.0"))  # before any p95 exists
+# Losing hedge attempts still unwinding after being abandoned; no new hedges fire above this
+LLM_HEDGE_MAX_ABANDONED = int(os.getenv("LLM_HEDGE_MAX_ABANDONED", "16"))
+
+# --- Record / replay ---
+# "record": call the provider and store every completion under LLM_RECORD_DIR
+# "replay": answer only from LLM_RECORD_DIR (missing recordings raise)
+LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "off").lower()
+LLM_RECORD_DIR = os.getenv(
+    "LLM_RECORD_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "llm_recordings")),
+)
+
+# --- Task routing ---
+# Each generator passes a task name to llm_complete. A route can pin the task to
+# a provider/model and sets its default token budget. "provider"/"model" of None
+# mean "use LLM_PROVIDER and that provider's default model".
+DEFAULT_TASK_ROUTES = {
+    "mcq":              {"provider": None, "model": None, "max_tokens": 3000},
+    "tf":               {"provider": None, "model": None, "max_tokens": 2000},
+    "sa":               {"provider": None, "model": None, "max_tokens": 2000},
+    "grade":            {"provider": None, "model": None, "max_tokens": 1000},
+    "flashcards":       {"provider": None, "model": None, "max_tokens": 2000},
+    "summary_brief":    {"provider": None, "model": None, "max_tokens": 2000},
+    "summary_detailed": {"provider": None, "model": None, "max_tokens": 5000},
+}
+
+# Optional JSON file with the same shape as DEFAULT_TASK_ROUTES (partial entries are fine)
+LLM_ROUTES_FILE = os.getenv("LLM_ROUTES_FILE", "")
+
+
+def _load_task_routes() -> Dict[str, Dict[str, Any]]:
+    """
+    Build the routing table: defaults, then LLM_ROUTES_FILE, then per-task env vars
+    (LLM_ROUTE_<TASK>_PROVIDER / _MODEL / _MAX_TOKENS, e.g. LLM_ROUTE_GRADE_MODEL=llama3.2:1b).
+    """
+    routes = {task: dict(route) for task, route in DEFAULT_TASK_ROUTES.items()}
+
+    if LLM_ROUTES_FILE:
+        try:
+            with open(LLM_ROUTES_FILE, "r", encoding="utf-8") as f:
+                overrides = json.load(f)
+            for task, route in overrides.items():
+                routes.setdefault(task, {"provider": None, "model": None, "max_tokens": 1200})
+                routes[task].update(route or {})
+        except Exception as e:
+            print(f"Could not load LLM routes from {LLM_ROUTES_FILE}: {e}")
+
+    for task, route in routes.items():
+        prefix = f"LLM_ROUTE_{task.upper()}_"
+        if os.getenv(prefix + "PROVIDER"):
+            route["provider"] = os.getenv(prefix + "PROVIDER").lower()
+        if os.getenv(prefix + "MODEL"):
+            route["model"] = os.getenv(prefix + "MODEL")
+        if os.getenv(prefix + "MAX_TOKENS"):
+            route["max_tokens"] = int(os.getenv(prefix + "MAX_TOKENS"))
+
+    return routes
+
+
+TASK_ROUTES = _load_task_routes()
+
+
+def resolve_route(task: Optional[str]) -> Dict[str, Any]:
+    """Return {provider, model, max_tokens} for a task, filling gaps from the global config."""
+    route = TASK_ROUTES.get(task or "", {})
+    provider = (route.get("provider") or LLM_PROVIDER).lower()
+    return {
+        "provider": provider,
+        "model": route.get("model"),
+        "max_tokens": route.get("max_tokens") or 1200,
+    }
 
 
 def _ollama_generate(
@@ -24,28 +115,45 @@ def _ollama_generate(
     model: Optional[str] = None,
     temperature: float = 0.2,
     max_tokens: int = 1200,
+    schema: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Call a local Ollama server and return the full concatenated text.
+    With a JSON schema, Ollama constrains the output to match it ("format").
+    If the job is cancelled mid-stream the connection is closed, which makes
+    Ollama stop generating, and GenerationCancelled is raised.
     """
     m = model or OLLAMA_MODEL
     url = f"{OLLAMA_URL}/api/generate"
 
+    body = {
+        "model": m,
+        "prompt": prompt,
+        "temperature": temperature,
+        "options": {"num_predict": max_tokens},
+    }
+    if schema:
+        body["format"] = schema
+
     resp = requests.post(
         url,
-        json={
-            "model": m,
-            "prompt": prompt,
-            "temperature": temperature,
-            "options": {"num_predict": max_tokens},
-        },
+        json=body,
         stream=True,
         timeout=300,
     )
+    _on_abandon(lambda: _interrupt(resp))
     resp.raise_for_status()
 
     chunks = []
     for line in resp.iter_lines():
+        _check_abandoned()
+        if progress.cancelled():
+            resp.close()
+            metrics.incr("llm.cancelled_streams")
+            # Budget left unused (one streamed chunk per token): an upper bound on the
+            # tokens not generated, since the model may have stopped well short of it
+            metrics.incr("llm.tokens_budget_unused", max(0, max_tokens - len(chunks)))
+            raise progress.GenerationCancelled()
         if not line:
             continue
         try:
@@ -54,7 +162,10 @@ def _ollama_generate(
             continue
         text = data.get("response")
         if text:
+            if not chunks:
+                progress.stage("generating", "Generating")
             chunks.append(text)
+            progress.tokens()
         if data.get("done"):
             break
     return "".join(chunks).strip()
@@ -65,15 +176,17 @@ def _openrouter_generate(
     model: Optional[str] = None,
     temperature: float = 0.2,
     max_tokens: int = 1200,
+    schema: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Call OpenRouter's chat completions endpoint and return the text.
+    With a JSON schema, the request asks for structured output ("response_format").
     """
     if not OPENROUTER_API_KEY:
         raise RuntimeError("OPENROUTER_API_KEY is not set")
 
     m = model or OPENROUTER_MODEL
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{OPENROUTER_URL}/chat/completions"
 
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -95,10 +208,18 @@ def _openrouter_generate(
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    if schema:
+        body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "response", "strict": True, "schema": schema},
+        }
 
-    resp = requests.post(url, headers=headers, json=body, timeout=300)
+    # stream=True: the body is read below, but an abandoned hedge can close the connection meanwhile
+    resp = requests.post(url, headers=headers, json=body, timeout=300, stream=True)
+    _on_abandon(lambda: _interrupt(resp))
     resp.raise_for_status()
     data = resp.json()
+    progress.tokens(int((data.get("usage") or {}).get("completion_tokens") or 0))
 
     # choices[0].message.content can be a string or list of segments
     choice = (data.get("choices") or [{}])[0]
@@ -110,34 +231,298 @@ def _openrouter_generate(
     return str(content).strip()
 
 
+_PROVIDERS = {
+    "ollama": _ollama_generate,
+    "openrouter": _openrouter_generate,
+}
+
+
+class _HedgeAbandoned(Exception):
+    """Raised in a hedge attempt that lost the race; not the provider's fault."""
+
+
+class _HedgeAttempt:
+    """One call of a hedged request, on its own thread; abandon() stops it once the other call has won."""
+
+    def __init__(self):
+        self.abandoned = False
+        self._on_abandon: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def on_abandon(self, fn: Callable[[], None]) -> None:
+        with self._lock:
+            if not self.abandoned:
+                self._on_abandon.append(fn)
+                return
+        fn()
+
+    def abandon(self) -> None:
+        with self._lock:
+            self.abandoned = True
+            hooks, self._on_abandon = self._on_abandon, []
+        for fn in hooks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+
+_hedge_attempt: contextvars.ContextVar[Optional[_HedgeAttempt]] = contextvars.ContextVar(
+    "llm_hedge_attempt", default=None
+)
+_abandoned_running = 0   # abandoned attempts whose thread hasn't finished yet
+_abandoned_lock = threading.Lock()
+
+
+def _on_abandon(fn: Callable[[], None]) -> None:
+    """Run fn if the current hedge attempt is abandoned (now, if it already is); no-op outside hedges."""
+    attempt = _hedge_attempt.get()
+    if attempt is not None:
+        attempt.on_abandon(fn)
+
+
+def _interrupt(resp: requests.Response) -> None:
+    """
+    Unblock the thread reading `resp` from another thread. close() would wait for
+    that reader; urllib3 >= 2.3 can shut the socket down under it instead. With an
+    older urllib3 the loser reads on until its next chunk or the timeout.
+    """
+    shutdown = getattr(resp.raw, "shutdown", None)
+    if shutdown is not None:
+        shutdown()
+
+
+def _abandoned() -> bool:
+    attempt = _hedge_attempt.get()
+    return attempt is not None and attempt.abandoned
+
+
+def _check_abandoned() -> None:
+    if _abandoned():
+        raise _HedgeAbandoned()
+
+
+def _provider_chain(primary: str) -> List[str]:
+    chain = [primary if primary in _PROVIDERS else "ollama"]
+    for p in LLM_FALLBACK_PROVIDERS:
+        if p in _PROVIDERS and p not in chain:
+            chain.append(p)
+    return chain
+
+
+def _call_provider(provider: str, **kwargs) -> str:
+    """
+    Call one provider and feed the outcome into its circuit breaker.
+    Waits for a fair-share slot first (services/scheduler.py); queue time is not provider latency.
+    """
+    breaker = get_breaker(provider)
+    progress.check_cancelled()
+    progress.stage("waiting_llm", f"Waiting for the model ({provider})")
+    with llm_slot(provider, kwargs.get("max_tokens")) as release:
+        # A hedge attempt that lost gives its slot back at once, even while its thread unwinds
+        _on_abandon(release)
+        # The job may have been cancelled (or the hedge decided) while queued for a slot
+        progress.check_cancelled()
+        _check_abandoned()
+        start = time.monotonic()
+        try:
+            text = _PROVIDERS[provider](**kwargs)
+        except Exception:
+            if _abandoned():
+                raise _HedgeAbandoned()   # we closed the connection: not the provider's failure
+            breaker.record(False, time.monotonic() - start)
+            raise
+        breaker.record(True, time.monotonic() - start)
+    return text
+
+
+def _start_attempt(provider: str, kwargs: dict) -> Tuple[Future, _HedgeAttempt]:
+    """Run _call_provider on a thread of its own (never queued behind other calls), in the caller's context."""
+    attempt = _HedgeAttempt()
+    fut: Future = Future()
+
+    def run():
+        _hedge_attempt.set(attempt)
+        try:
+            fut.set_result(_call_provider(provider, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(run,), daemon=True, name=f"llm-hedge-{provider}").start()
+    return fut, attempt
+
+
+def _abandon(fut: Future, attempt: _HedgeAttempt) -> None:
+    """Stop a losing attempt: close its connection and free its slot; count it until its thread ends."""
+    global _abandoned_running
+    if fut.done():
+        return
+    with _abandoned_lock:
+        _abandoned_running += 1
+
+    def finished(_):
+        global _abandoned_running
+        with _abandoned_lock:
+            _abandoned_running -= 1
+    fut.add_done_callback(finished)
+    metrics.incr("llm.hedge_abandoned")
+    attempt.abandon()
+
+
+def _hedged_call(primary: str, next_provider: Callable[[], Optional[str]],
+                 kwargs_for: Callable[[str], dict]) -> str:
+    """
+    Start the primary; if it hasn't finished after its p95 latency (or has failed),
+    fire the same request at next_provider() and return whichever succeeds first.
+    The secondary's breaker is only asked once the hedge fires, so a half-open
+    probe is not spent on a hedge that never happens. The loser is abandoned:
+    its connection is closed and its scheduler slot released. While
+    LLM_HEDGE_MAX_ABANDONED losers are still unwinding, no new hedge fires.
+    """
+    p95 = get_breaker(primary).p95()
+    delay = max(LLM_HEDGE_MIN_DELAY, p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY)
+
+    first, first_attempt = _start_attempt(primary, kwargs_for(primary))
+    attempts = {first: first_attempt}
+    done, _ = wait([first], timeout=delay)
+    if done and first.exception() is None:
+        return first.result()
+
+    pending = {first} if not done else set()
+    with _abandoned_lock:
+        saturated = _abandoned_running >= LLM_HEDGE_MAX_ABANDONED
+    if saturated and pending:
+        metrics.incr("llm.hedge_skipped")
+    else:
+        secondary = next_provider()
+        if secondary is not None:
+            fut, attempt = _start_attempt(secondary, kwargs_for(secondary))
+            attempts[fut] = attempt
+            pending.add(fut)
+
+    last_error = first.exception() if done else None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                for loser in pending:
+                    _abandon(loser, attempts[loser])
+                return fut.result()
+            last_error = fut.exception()
+    raise last_error
+
+
+class ProvidersUnavailable(RuntimeError):
+    """Every provider's circuit breaker refused the call; raised without calling any of them."""
+
+
+def _recording_path(**request_fields) -> str:
+    key = hashlib.sha256(json.dumps(request_fields, sort_keys=True).encode("utf-8")).hexdigest()
+    return os.path.join(LLM_RECORD_DIR, f"{key}.json")
+
+
 def llm_complete(
     prompt: str,
     *,
+    task: Optional[str] = None,
     model: Optional[str] = None,
     temperature: float = 0.2,
-    max_tokens: int = 1200,
+    max_tokens: Optional[int] = None,
+    schema: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Single entry point for all higher-level code.
 
-    Uses LLM_PROVIDER env:
+    The task name picks a route from TASK_ROUTES (provider, model, token budget);
+    explicit model/max_tokens arguments win over the route. Without a routed
+    provider, LLM_PROVIDER decides:
     - "ollama"     -> local Ollama server
     - "openrouter" -> OpenRouter cloud API
+
+    Providers listed in LLM_FALLBACK_PROVIDERS are tried next when the primary
+    fails or its circuit breaker is open; with LLM_HEDGE=1 the first fallback
+    is raced against a slow primary. When every breaker is open,
+    ProvidersUnavailable is raised at once.
+
+    A JSON schema switches the provider to structured (JSON) output.
+
+    LLM_RECORD_MODE=record|replay captures completions to LLM_RECORD_DIR and
+    serves them back byte-for-byte, keyed by the full request.
     """
-    provider = LLM_PROVIDER
-
-    if provider == "openrouter":
-        return _openrouter_generate(
-            prompt=prompt,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-
-    # default / fallback: ollama
-    return _ollama_generate(
-        prompt=prompt,
-        model=model,
-        temperature=temperature,
-        max_tokens=max_tokens,
+    if LLM_RECORD_MODE not in ("record", "replay"):
+        return _complete(prompt, task=task, model=model, temperature=temperature, max_tokens=max_tokens, schema=schema)
+
+    path = _recording_path(
+        task=task, model=model, prompt=prompt, temperature=temperature, max_tokens=max_tokens, schema=schema
     )
+    if LLM_RECORD_MODE == "replay":
+        if not os.path.exists(path):
+            raise RuntimeError(f"no recorded completion for task={task!r} ({os.path.basename(path)})")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["completion"]
+
+    text = _complete(prompt, task=task, model=model, temperature=temperature, max_tokens=max_tokens, schema=schema)
+    os.makedirs(LLM_RECORD_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"task": task, "prompt": prompt, "completion": text}, f)
+    os.replace(tmp, path)
+    return text
+
+
+def _complete(
+    prompt: str,
+    *,
+    task: Optional[str],
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+    schema: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Route the request and run it through the provider chain."""
+    route = resolve_route(task)
+    model = model or route["model"]
+    max_tokens = max_tokens or route["max_tokens"]
+
+    chain = _provider_chain(route["provider"])
+    remaining = list(chain)
+
+    def next_allowed() -> Optional[str]:
+        # Asked just before each call: allow() hands out a half-open breaker's single probe
+        while remaining:
+            provider = remaining.pop(0)
+            if get_breaker(provider).allow():
+                return provider
+        return None
+
+    def kwargs_for(provider: str) -> dict:
+        # A routed model name only makes sense for the routed provider
+        return {
+            "prompt": prompt,
+            "model": model if provider == chain[0] else None,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "schema": schema,
+        }
+
+    last_error: Optional[Exception] = None
+    if LLM_HEDGE and len(chain) >= 2:
+        primary = next_allowed()
+        if primary is not None:
+            try:
+                return _hedged_call(primary, next_allowed, kwargs_for)
+            except Exception as e:
+                last_error = e
+
+    while (provider := next_allowed()) is not None:
+        try:
+            return _call_provider(provider, **kwargs_for(provider))
+        except Exception as e:
+            print(f"LLM provider '{provider}' failed: {e}")
+            last_error = e
+
+    if last_error is None:
+        # Nothing was called: fail now instead of waiting out a provider known to be down
+        metrics.incr("llm.providers_unavailable")
+        raise ProvidersUnavailable(f"LLM providers unavailable (circuit open): {', '.join(chain)}")
+    raise last_error
@@ -0,0 +1,45 @@
+# backend/services/metrics.py
+"""
+Tiny in-process metrics registry (counters + timing summaries).
+
+Values are per process (each gunicorn/worker process keeps its own); they are
+published to the database by services/process_stats.py and GET /api/metrics
+sums them over all live processes.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (e.g. a latency in seconds) into a count/sum/max summary."""
+    with _lock:
+        t = _timings.get(name)
+        if t is None:
+            t = _timings[name] = {"count": 0, "sum": 0.0, "max": 0.0}
+        t["count"] += 1
+        t["sum"] += value
+        t["max"] = max(t["max"], value)
+
+
+def get(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        timings = {
+            name: dict(t, avg=(t["sum"] / t["count"]) if t["count"] else 0.0)
+            for name, t in _timings.items()
+        }
+        return {"counters": dict(_counters), "timings": timings}
@@ -0,0 +1,247 @@
+# backend/services/parsing.py
+"""
+Single-pass, line-oriented parsers for the LLM text formats in services/generate.py.
+
+Each parser walks the output once, line by line, with a small state machine, so
+run time is linear in the output length even for long or malformed completions
+(the old DOTALL regexes backtracked on those). Output dict shapes are identical
+to the regex parsers they replace.
+"""
+import re
+from typing import List, Dict, Optional
+
+_OPTION_LINE = re.compile(r"\s*([ABCD])\)\s*(.*)", re.IGNORECASE)
+_MCQ_ANSWER_LINE = re.compile(r"\s*Answer:\s*([ABCD])(?![A-Za-z0-9])", re.IGNORECASE)
+_TF_ANSWER_LINE = re.compile(r"\s*Answer:\s*(True|False)(?![A-Za-z0-9])", re.IGNORECASE)
+_ANSWER_LINE = re.compile(r"\s*Answer:\s*(.*)", re.IGNORECASE)
+_EXPLANATION_LINE = re.compile(r"\s*Explanation:\s*(.*)", re.IGNORECASE)
+
+_OPTION_ORDER = "ABCD"
+
+
+def _lines(raw: str) -> List[str]:
+    return raw.replace("\r\n", "\n").strip().split("\n")
+
+
+def _marker(line: str, marker: str, anywhere: bool = False) -> Optional[int]:
+    """
+    Index just past `marker` (e.g. "q:") in the line, or None.
+
+    The marker must not be glued to a preceding letter/digit ("FAQ:" is not "Q:").
+    Unless `anywhere` is set, only bullets/numbering/markdown may come before it.
+    """
+    lower = line.lower()
+    start = 0
+    while True:
+        idx = lower.find(marker, start)
+        if idx < 0:
+            return None
+        if idx == 0 or not lower[idx - 1].isalnum():
+            if anywhere or not any(ch.isalpha() for ch in line[:idx]):
+                return idx + len(marker)
+            return None
+        start = idx + 1
+
+
+def _is_separator(stripped: str) -> bool:
+    return len(stripped) >= 3 and set(stripped) == {"-"}
+
+
+def _join(parts: List[str]) -> str:
+    return "\n".join(parts).strip()
+
+
+def parse_mcq_text(raw: str) -> List[Dict]:
+    """Q: / A) B) C) D) / Answer: <letter> / Explanation: blocks."""
+    if not raw:
+        return []
+
+    out: List[Dict] = []
+    field = None            # prompt | A | B | C | D | answer | exp
+    parts: Dict[str, List[str]] = {}
+    ans_letter = ""
+
+    def finish():
+        if field not in ("answer", "exp"):
+            return
+        opts = [_join(parts[k]) for k in _OPTION_ORDER]
+        prompt = _join(parts["prompt"])
+        if not prompt or not all(opts):
+            return
+        out.append({
+            "prompt": prompt,
+            "options": opts,
+            "answer": opts[_OPTION_ORDER.index(ans_letter)],
+            "explanation": _join(parts.get("exp", [])),
+        })
+
+    for line in _lines(raw):
+        stripped = line.strip()
+
+        q_at = _marker(line, "q:")
+        if q_at is not None:
+            finish()
+            field, ans_letter = "prompt", ""
+            parts = {"prompt": [line[q_at:].strip()]}
+            continue
+        if _is_separator(stripped):
+            finish()
+            field = None
+            continue
+        if field is None:
+            continue
+
+        if field in ("prompt", "A", "B", "C"):
+            m = _OPTION_LINE.match(line)
+            expected = "A" if field == "prompt" else _OPTION_ORDER[_OPTION_ORDER.index(field) + 1]
+            if m and m.group(1).upper() == expected:
+                field = expected
+                parts[field] = [m.group(2).strip()]
+                continue
+        elif field == "D":
+            m = _MCQ_ANSWER_LINE.match(line)
+            if m:
+                field, ans_letter = "answer", m.group(1).upper()
+                continue
+        elif field == "answer":
+            m = _EXPLANATION_LINE.match(line)
+            if m:
+                field = "exp"
+                parts["exp"] = [m.group(1).strip()]
+            continue
+
+        if stripped or field == "exp":
+            parts[field].append(stripped)
+
+    finish()
+    return out
+
+
+def _parse_qa_blocks(raw: str, answer_line, multiline_answer: bool) -> List[Dict]:
+    """Shared walker for Q: / Answer: / Explanation: blocks (True/False and Short Answer)."""
+    if not raw:
+        return []
+
+    out: List[Dict] = []
+    field = None            # prompt | answer | exp
+    parts: Dict[str, List[str]] = {}
+
+    def finish():
+        if field not in ("answer", "exp"):
+            return
+        prompt, ans = _join(parts["prompt"]), _join(parts["answer"])
+        if prompt and ans:
+            out.append({"prompt": prompt, "answer": ans, "explanation": _join(parts.get("exp", []))})
+
+    for line in _lines(raw):
+        stripped = line.strip()
+
+        q_at = _marker(line, "q:")
+        if q_at is not None:
+            finish()
+            field = "prompt"
+            parts = {"prompt": [line[q_at:].strip()]}
+            continue
+        if _is_separator(stripped):
+            finish()
+            field = None
+            continue
+        if field is None:
+            continue
+
+        if field == "prompt":
+            if _ANSWER_LINE.match(line):
+                m = answer_line.match(line)
+                if not m:
+                    field = None  # malformed answer: drop the block
+                    continue
+                field = "answer"
+                parts["answer"] = [m.group(1).strip()]
+                continue
+        elif field == "answer":
+            m = _EXPLANATION_LINE.match(line)
+            if m:
+                field = "exp"
+                parts["exp"] = [m.group(1).strip()]
+                continue
+            if not multiline_answer:
+                continue
+
+        if stripped or field == "exp":
+            parts[field].append(stripped)
+
+    finish()
+    return out
+
+
+def parse_tf_text(raw: str) -> List[Dict]:
+    """Q: / Answer: True|False / Explanation: blocks."""
+    return [
+        {
+            "prompt": item["prompt"],
+            "options": ["True", "False"],
+            "answer": item["answer"].capitalize(),
+            "explanation": item["explanation"],
+        }
+        for item in _parse_qa_blocks(raw, _TF_ANSWER_LINE, multiline_answer=False)
+    ]
+
+
+def parse_sa_text(raw: str) -> List[Dict]:
+    """Q: / Answer: <text> / Explanation: blocks."""
+    return [
+        {
+            "prompt": item["prompt"],
+            "options": [],
+            "answer": item["answer"],
+            "explanation": item["explanation"],
+        }
+        for item in _parse_qa_blocks(raw, _ANSWER_LINE, multiline_answer=True)
+    ]
+
+
+def parse_flashcard_text(raw: str) -> List[Dict[str, str]]:
+    """Q: <front> / A: <back> cards; "A:" may share the line with "Q:"."""
+    if not raw:
+        return []
+
+    cards: List[Dict[str, str]] = []
+    field = None            # front | back
+    front: List[str] = []
+    back: List[str] = []
+
+    def finish():
+        f, b = _join(front), _join(back)
+        if field == "back" and f and b:
+            cards.append({"front": f, "back": b})
+
+    def take_front(text: str):
+        nonlocal field
+        a_at = _marker(text, "a:", anywhere=True)
+        if a_at is None:
+            front.append(text.strip())
+            return
+        front.append(text[:a_at - 2].strip())
+        back.append(text[a_at:].strip())
+        field = "back"
+
+    for line in _lines(raw):
+        stripped = line.strip()
+
+        q_at = _marker(line, "q:")
+        if q_at is not None:
+            finish()
+            field, front, back = "front", [], []
+            take_front(line[q_at:])
+            continue
+        if _is_separator(stripped):
+            finish()
+            field = None
+            continue
+        if field == "front":
+            take_front(line)
+        elif field == "back":
+            back.append(stripped)
+
+    finish()
+    return cards
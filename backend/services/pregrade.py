@@ -0,0 +1,128 @@
+# backend/services/pregrade.py
+"""
+Local first tier for short-answer grading.
+
+Decides the confident cases (blank / "don't know" answers, verbatim or
+near-verbatim model answers, answers sharing nothing with the model answer)
+without an LLM call. Everything in between is returned as ambiguous and goes
+to the LLM grader in one batch.
+"""
+import os
+import math
+import re
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.services import metrics
+
+PREGRADE_ENABLED = os.getenv("PREGRADE_ENABLED", "1") == "1"
+# Accept when TF-IDF cosine to the model answer is at least this (and keyword coverage agrees)
+PREGRADE_ACCEPT = float(os.getenv("PREGRADE_ACCEPT", "0.85"))
+# Minimum share of the model answer's keywords the student answer must contain to be accepted
+PREGRADE_ACCEPT_COVERAGE = float(os.getenv("PREGRADE_ACCEPT_COVERAGE", "0.8"))
+# Reject when cosine is at most this and not a single keyword is shared
+PREGRADE_REJECT = float(os.getenv("PREGRADE_REJECT", "0.05"))
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were", "be",
+    "been", "by", "with", "as", "at", "it", "its", "this", "that", "these", "those", "from", "into",
+    "which", "who", "what", "when", "where", "how", "why", "there", "their", "they", "them", "than",
+    "so", "such", "can", "will", "would", "does", "do", "did", "has", "have", "had",
+}
+_NEGATIONS = {"not", "no", "never", "none", "cannot", "without", "nor", "isn", "aren", "doesn", "don", "didn", "won"}
+_NON_ANSWERS = {
+    "", "idk", "i dont know", "i don t know", "dont know", "don t know", "no idea", "not sure", "n a", "na",
+    "none", "pass", "skip", "unknown",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace."""
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "catalyses"/"catalysed"/"catalysing" line up
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            word = word[: -len(suffix)]
+            break
+    return word[:-1] if len(word) > 4 and word.endswith("e") else word
+
+
+def _terms(norm: str) -> List[str]:
+    return [_stem(w) for w in norm.split() if w not in _STOPWORDS]
+
+
+def _cosine(a: Counter, b: Counter, idf: Dict[str, float]) -> float:
+    dot = sum(a[t] * b[t] * idf.get(t, 1.0) ** 2 for t in a.keys() & b.keys())
+    na = math.sqrt(sum((v * idf.get(t, 1.0)) ** 2 for t, v in a.items()))
+    nb = math.sqrt(sum((v * idf.get(t, 1.0)) ** 2 for t, v in b.items()))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+def pregrade(items: List[Dict[str, Any]]) -> Tuple[Dict[int, bool], List[Dict[str, Any]]]:
+    """
+    items: grade_short_answers items { 'id', 'prompt', 'correct_answer', 'user_answer' }
+    Returns ({id: verdict} for confident cases, [items still needing the LLM]).
+    """
+    if not PREGRADE_ENABLED or not items:
+        return {}, list(items)
+
+    start = time.perf_counter()
+    normalized = [
+        (normalize_answer(i["correct_answer"]), normalize_answer(i["user_answer"])) for i in items
+    ]
+
+    # IDF over this batch's answers: words every answer shares (the topic) weigh less
+    docs = [set(_terms(text)) for pair in normalized for text in pair if text]
+    df = Counter(t for d in docs for t in d)
+    idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1.0 for t, n in df.items()}
+
+    decided: Dict[int, bool] = {}
+    ambiguous: List[Dict[str, Any]] = []
+    for item, (ref, ans) in zip(items, normalized):
+        if ans in _NON_ANSWERS:
+            decided[item["id"]] = False
+            continue
+        if ans == ref:
+            decided[item["id"]] = True
+            continue
+
+        ref_terms, ans_terms = _terms(ref), _terms(ans)
+        keywords = set(ref_terms)
+        coverage = len(keywords & set(ans_terms)) / len(keywords) if keywords else 0.0
+        cosine = _cosine(Counter(ref_terms), Counter(ans_terms), idf)
+        # "X is not Y" vs "X is Y" look alike to bag-of-words measures
+        negation_flip = bool(_NEGATIONS & set(ref.split())) != bool(_NEGATIONS & set(ans.split()))
+
+        if not negation_flip and cosine >= PREGRADE_ACCEPT and coverage >= PREGRADE_ACCEPT_COVERAGE:
+            decided[item["id"]] = True
+        elif cosine <= PREGRADE_REJECT and coverage == 0.0:
+            decided[item["id"]] = False
+        else:
+            ambiguous.append(item)
+
+    metrics.observe("pregrade.seconds", time.perf_counter() - start)
+    metrics.incr("pregrade.accepted", sum(1 for v in decided.values() if v))
+    metrics.incr("pregrade.rejected", sum(1 for v in decided.values() if not v))
+    metrics.incr("pregrade.forwarded", len(ambiguous))
+    return decided, ambiguous
+
+
+def pregrade_stats(snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Local hit rate and estimated LLM time saved (avoided calls x mean LLM grading latency)."""
+    snap = snapshot or metrics.snapshot()
+    counters, timings = snap["counters"], snap["timings"]
+    local = counters.get("pregrade.accepted", 0) + counters.get("pregrade.rejected", 0)
+    total = local + counters.get("pregrade.forwarded", 0)
+    llm_avg = timings.get("grade.llm_seconds", {}).get("avg", 0.0)
+    return {
+        "answers": total,
+        "local_hit_rate": round(local / total, 3) if total else 0.0,
+        "llm_calls_avoided": counters.get("grade.llm_calls_avoided", 0),
+        "est_seconds_saved": round(counters.get("grade.llm_calls_avoided", 0) * llm_avg, 2),
+    }
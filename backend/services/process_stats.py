@@ -0,0 +1,137 @@
+# backend/services/process_stats.py
+"""
+Cross-process view of the in-memory stats.
+
+Metrics counters, circuit breakers and the LLM scheduler live in the memory of
+the process that uses them, and LLM work runs in the worker processes
+(backend/worker.py), not the web process answering /api/health and
+/api/metrics. Every process therefore writes its current stats to the
+process_stats table every STATS_PUBLISH_SECS; the endpoints read the rows of
+processes seen within STATS_MAX_AGE_SECS and merge them.
+
+Counters are since each process started, so they drop when a process restarts.
+"""
+import os
+import json
+import time
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+from backend.db import run_in_session
+from backend.models import ProcessStats
+from backend.services import metrics
+
+STATS_PUBLISH_SECS = float(os.getenv("STATS_PUBLISH_SECS", "15"))
+STATS_MAX_AGE_SECS = float(os.getenv("STATS_MAX_AGE_SECS", str(4 * STATS_PUBLISH_SECS)))
+STATS_PRUNE_SECS = 24 * 3600   # rows of processes gone this long are deleted
+
+_STATE_RANK = {"closed": 0, "half_open": 1, "open": 2}
+
+_started_at = datetime.utcnow()
+_publisher_lock = threading.Lock()
+_role = None   # set by start_publisher
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def collect() -> Dict[str, Any]:
+    """This process's stats, as published."""
+    from backend.services.failover import breaker_status
+    from backend.services.scheduler import scheduler_status
+    return {"metrics": metrics.snapshot(), "breakers": breaker_status(), "scheduler": scheduler_status()}
+
+
+def publish(role: str) -> None:
+    now = datetime.utcnow()
+    data = json.dumps(collect())
+
+    def write(db):
+        row = db.get(ProcessStats, process_id())
+        if row is None:
+            row = ProcessStats(process_id=process_id(), role=role, started_at=_started_at)
+            db.add(row)
+        row.data, row.updated_at = data, now
+        db.query(ProcessStats).filter(
+            ProcessStats.updated_at < now - timedelta(seconds=STATS_PRUNE_SECS)
+        ).delete(synchronize_session=False)
+    run_in_session(write)
+
+
+def start_publisher(role: str) -> None:
+    """Publish this process's stats now and every STATS_PUBLISH_SECS (once per process)."""
+    global _role
+    with _publisher_lock:
+        if _role is not None:
+            return
+        _role = role
+
+    def loop():
+        while True:
+            try:
+                publish(role)
+            except Exception as e:
+                print(f"Publishing process stats failed: {e}")
+            time.sleep(STATS_PUBLISH_SECS)
+    threading.Thread(target=loop, daemon=True, name="process-stats").start()
+
+
+def live_processes() -> List[Dict[str, Any]]:
+    """
+    Published stats of the processes seen within STATS_MAX_AGE_SECS, with this
+    process's own entry taken live rather than from its last published row.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=STATS_MAX_AGE_SECS)
+    me = process_id()
+
+    def read(db):
+        rows = (
+            db.query(ProcessStats)
+            .filter(ProcessStats.updated_at >= cutoff, ProcessStats.process_id != me)
+            .all()
+        )
+        return [{"process_id": r.process_id, "role": r.role, "updated_at": r.updated_at.isoformat(),
+                 **json.loads(r.data)} for r in rows]
+    procs = run_in_session(read)
+    procs.append({"process_id": me, "role": _role or "web", "updated_at": datetime.utcnow().isoformat(),
+                  **collect()})
+    return procs
+
+
+def merge_metrics(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum counters; combine count/sum/max timing summaries."""
+    counters: Dict[str, float] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    for snap in snapshots:
+        for name, value in snap.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for name, t in snap.get("timings", {}).items():
+            m = timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            m["count"] += t["count"]
+            m["sum"] += t["sum"]
+            m["max"] = max(m["max"], t["max"])
+    for t in timings.values():
+        t["avg"] = t["sum"] / t["count"] if t["count"] else 0.0
+    return {"counters": counters, "timings": timings}
+
+
+def merge_breakers(processes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per provider: the worst state of any process, plus each process's own breaker."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for proc in processes:
+        for name, b in proc.get("breakers", {}).items():
+            m = out.setdefault(name, {"state": "closed", "calls": 0, "failures": 0, "p95_secs": None,
+                                      "processes": {}})
+            if _STATE_RANK.get(b["state"], 0) > _STATE_RANK.get(m["state"], 0):
+                m["state"] = b["state"]
+            m["calls"] += b["calls"]
+            m["failures"] += round(b["error_rate"] * b["calls"])
+            if b["p95_secs"] is not None:
+                m["p95_secs"] = max(m["p95_secs"] or 0.0, b["p95_secs"])
+            m["processes"][proc["process_id"]] = b["state"]
+    for m in out.values():
+        m["error_rate"] = round(m.pop("failures") / m["calls"], 3) if m["calls"] else 0.0
+    return out
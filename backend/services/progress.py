@@ -0,0 +1,143 @@
+# backend/services/progress.py
+"""
+Progress reporting for long-running jobs.
+
+Code anywhere below a job handler calls stage() / tokens(); the calls go to the
+Reporter bound to the current context by reporting(), and are no-ops outside
+one. The reporter keeps the latest state in memory and hands a snapshot to its
+sink (backend/jobs.py writes it onto the job row, which GET /api/jobs/<id>/events
+streams). Stage changes are passed on right away; token counts at most every
+PROGRESS_FLUSH_SECS, so a per-token call costs a lock, an add and a clock read.
+
+Context variables do not follow work into thread pools on their own: submit
+with submit_in_context() so pool threads report to the same job.
+
+The reporter also carries the job's cancellation: once cancel() is called (the
+worker does when the user cancels the job), check_cancelled() raises
+GenerationCancelled in every thread working for that job.
+"""
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Any, Optional
+
+PROGRESS_FLUSH_SECS = float(os.getenv("PROGRESS_FLUSH_SECS", "0.5"))
+
+
+class GenerationCancelled(BaseException):
+    """
+    The job was cancelled. A BaseException, like KeyboardInterrupt, so the
+    generators' catch-all retry/fallback handlers let it through.
+    """
+
+
+class Reporter:
+    def __init__(self, sink: Callable[[Dict[str, Any]], None], flush_secs: float = PROGRESS_FLUSH_SECS):
+        self._sink = sink
+        self._flush_secs = flush_secs
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_flush = 0.0
+        self._cancelled = threading.Event()
+        self._state: Dict[str, Any] = {
+            "stage": "starting", "message": "", "current": None, "total": None, "tokens": 0,
+        }
+
+    def stage(self, stage: str, message: str = "", current: Optional[int] = None, total: Optional[int] = None):
+        with self._lock:
+            self._state.update(stage=stage, message=message, current=current, total=total)
+        self.flush(wait=True)
+
+    def item(self, key: str, **fields):
+        # Per-item state for jobs that build several things (e.g. a study pack)
+        with self._lock:
+            self._state.setdefault("items", {}).setdefault(key, {}).update(fields)
+        self.flush(wait=True)
+
+    def add_tokens(self, n: int = 1):
+        with self._lock:
+            self._state["tokens"] += n
+            due = time.monotonic() - self._last_flush >= self._flush_secs
+        if due:
+            self.flush(wait=False)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = dict(self._state, elapsed=round(time.monotonic() - self._start, 1))
+            if "items" in state:
+                state["items"] = {k: dict(v) for k, v in state["items"].items()}
+            return state
+
+    def flush(self, wait: bool = True):
+        # Token flushes skip when another thread is already writing; stage changes queue up
+        if not self._flush_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                self._last_flush = time.monotonic()
+            self._sink(self.snapshot())
+        except Exception as e:
+            print(f"Progress flush failed: {e}")
+        finally:
+            self._flush_lock.release()
+
+
+_current: contextvars.ContextVar[Optional[Reporter]] = contextvars.ContextVar("progress_reporter", default=None)
+
+
+@contextmanager
+def reporting(sink: Callable[[Dict[str, Any]], None]):
+    """Bind a Reporter writing to `sink` for the duration of the block."""
+    reporter = Reporter(sink)
+    token = _current.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current.reset(token)
+        reporter.flush(wait=True)
+
+
+def stage(name: str, message: str = "", current: Optional[int] = None, total: Optional[int] = None) -> None:
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.stage(name, message, current, total)
+
+
+def item(key: str, **fields) -> None:
+    """Update one item's entry in the progress state's "items" map (status, counts, errors)."""
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.item(key, **fields)
+
+
+def tokens(n: int = 1) -> None:
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.add_tokens(n)
+
+
+def cancelled() -> bool:
+    reporter = _current.get()
+    return reporter is not None and reporter.cancelled
+
+
+def check_cancelled() -> None:
+    """Raise GenerationCancelled if the current job has been cancelled."""
+    if cancelled():
+        raise GenerationCancelled()
+
+
+def submit_in_context(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """pool.submit() that runs fn in a copy of the caller's context (so it reports progress)."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
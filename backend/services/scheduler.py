@@ -0,0 +1,204 @@
+# backend/services/scheduler.py
+"""
+Fair-share admission for LLM calls.
+
+Each provider gets LLM_MAX_CONCURRENCY slots (LLM_MAX_CONCURRENCY_<PROVIDER>
+overrides). Calls beyond that wait in per-user queues inside a priority class
+and are admitted by deficit round-robin: every user with waiting calls earns
+LLM_SCHED_QUANTUM_TOKENS of credit per round and spends a call's max_tokens
+from it. One user with 50 queued calls therefore gets the same share as a
+user with 1, rather than holding the GPU until their backlog drains.
+
+Priority classes are strict: "interactive" calls (short-answer grading, calls
+made while a request waits) are admitted before "bulk" generation.
+
+Who is calling is read from the context (see caller()); the worker sets it
+per job, and pool threads inherit it via progress.submit_in_context().
+
+Slots are per process. Each worker process runs WORKER_THREADS job loops
+plus loops reserved for interactive kinds (backend/worker.py), so grading
+calls reach the same scheduler as the process's bulk generation and are
+admitted ahead of it. Across worker processes, fairness comes from
+backend/jobs.py claiming the jobs of the least-busy users first. Per-process
+stats are published for /api/metrics (services/process_stats.py).
+"""
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Deque, Tuple
+
+from backend.services import metrics
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))     # 0 disables admission control
+LLM_SCHED_QUANTUM_TOKENS = float(os.getenv("LLM_SCHED_QUANTUM_TOKENS", "2000"))
+
+PRIORITIES = ("interactive", "bulk")     # served strictly in this order
+
+_caller: contextvars.ContextVar[Tuple[Optional[int], str]] = contextvars.ContextVar(
+    "llm_caller", default=(None, "interactive")
+)
+
+
+@contextmanager
+def caller(user_id: Optional[int], priority: str = "bulk"):
+    """Attribute LLM calls made inside the block to `user_id` at `priority`."""
+    token = _caller.set((user_id, priority if priority in PRIORITIES else "bulk"))
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("user", "cost", "granted", "enqueued")
+
+    def __init__(self, user, cost: float):
+        self.user = user
+        self.cost = cost
+        self.granted = False
+        self.enqueued = time.monotonic()
+
+
+class FairScheduler:
+    def __init__(self, slots: int, quantum: float = LLM_SCHED_QUANTUM_TOKENS):
+        self.slots = slots
+        self.quantum = quantum
+        self._cond = threading.Condition()
+        self._free = slots
+        # priority -> user -> waiting tickets; priority -> round-robin order of users with tickets
+        self._queues: Dict[str, Dict[Any, Deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self._rings: Dict[str, Deque[Any]] = {p: deque() for p in PRIORITIES}
+        self._deficit: Dict[Tuple[str, Any], float] = {}
+        self._waits: Dict[Any, Dict[str, float]] = {}
+
+    def acquire(self, user, priority: str, cost: float) -> float:
+        """Block until admitted; returns the time spent queued."""
+        if self.slots <= 0:
+            return 0.0
+        ticket = _Ticket(user, max(1.0, cost))
+        with self._cond:
+            queue = self._queues[priority].get(user)
+            if queue is None:
+                queue = self._queues[priority][user] = deque()
+                self._rings[priority].append(user)
+            queue.append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+            waited = time.monotonic() - ticket.enqueued
+            w = self._waits.setdefault(user, {"calls": 0, "wait_sum": 0.0, "wait_max": 0.0})
+            w["calls"] += 1
+            w["wait_sum"] += waited
+            w["wait_max"] = max(w["wait_max"], waited)
+        metrics.observe(f"llm.queue_seconds.{priority}", waited)
+        return waited
+
+    def release(self) -> None:
+        if self.slots <= 0:
+            return
+        with self._cond:
+            self._free += 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user, priority: str, cost: float):
+        self.acquire(user, priority, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _dispatch(self) -> None:
+        # Lock held. Hand free slots to the next tickets in DRR order.
+        granted = False
+        while self._free > 0:
+            ticket = self._next()
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._free -= 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _next(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            ring, queues = self._rings[priority], self._queues[priority]
+            while ring:
+                user = ring[0]
+                key = (priority, user)
+                queue = queues[user]
+                if self._deficit.get(key, 0.0) >= queue[0].cost:
+                    ticket = queue.popleft()
+                    self._deficit[key] -= ticket.cost
+                    if not queue:
+                        # Users don't bank credit while idle
+                        del queues[user]
+                        ring.popleft()
+                        self._deficit.pop(key, None)
+                    return ticket
+                # Not enough credit: earn a quantum and go to the back of the round
+                self._deficit[key] = self._deficit.get(key, 0.0) + self.quantum
+                ring.rotate(-1)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "in_use": self.slots - self._free if self.slots > 0 else None,
+                "queued": {p: sum(len(q) for q in self._queues[p].values()) for p in PRIORITIES},
+                "users": {
+                    str(user): {
+                        "calls": w["calls"],
+                        "avg_wait": round(w["wait_sum"] / w["calls"], 3) if w["calls"] else 0.0,
+                        "max_wait": round(w["wait_max"], 3),
+                    }
+                    for user, w in self._waits.items()
+                },
+            }
+
+
+_schedulers: Dict[str, FairScheduler] = {}
+_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> FairScheduler:
+    with _lock:
+        sched = _schedulers.get(provider)
+        if sched is None:
+            slots = int(os.getenv(f"LLM_MAX_CONCURRENCY_{provider.upper()}", LLM_MAX_CONCURRENCY))
+            sched = _schedulers[provider] = FairScheduler(slots)
+        return sched
+
+
+@contextmanager
+def llm_slot(provider: str, max_tokens: int):
+    """
+    Hold one of the provider's slots, queued fairly behind other users' calls.
+    Yields release(), which gives the slot back early (e.g. for an abandoned hedge); only the first release counts.
+    """
+    user, priority = _caller.get()
+    sched = get_scheduler(provider)
+    sched.acquire(user, priority, float(max_tokens or 1))
+    held = [True]
+    held_lock = threading.Lock()
+
+    def release():
+        with held_lock:
+            if not held[0]:
+                return
+            held[0] = False
+        sched.release()
+    try:
+        yield release
+    finally:
+        release()
+
+
+def scheduler_status() -> Dict[str, Any]:
+    with _lock:
+        return {name: s.stats() for name, s in _schedulers.items()}
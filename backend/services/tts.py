@@ -1,8 +1,39 @@
 # backend/services/tts.py
+"""
+Text-to-speech for summaries.
+
+The text is split at sentence boundaries into segments of up to
+TTS_SEGMENT_CHARS, which are synthesized TTS_MAX_WORKERS at a time. MP3 frames
+are self-contained, so the segments' bytes are concatenated as they are, with
+only their ID3 tags and Xing/Info header frames removed (no re-encoding).
+Segments are appended in order to a "<file>.<random>.part" file of the job's
+own as soon as they and all the segments before them are ready;
+GET /api/summaries/<id>/audio streams the growing .part file, so playback
+starts after the first segment. The .part file is renamed to the final name
+once complete, so two jobs for the same text and voice never write into the
+same file (the later rename just replaces identical audio).
+
+Engines are pluggable (TTS_ENGINE): "gtts" (Google TTS) or "stub" (silent
+MP3 frames sized to the text; no network, for local dev and tests).
+
+Output files are named after their cache key (services/audio_cache.py), so one
+summary can have a file per voice side by side.
+"""
+import glob
+import io
 import os
-from gtts import gTTS
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backend.services import progress
 from backend.services.extract import UPLOAD_DIR
 
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts").lower()
+TTS_SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "600"))
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+
 # Map frontend keys to gTTS Top-Level Domains (TLDs) for accents
 # gTTS uses 'en' language + specific TLDs for accents
 ACCENT_MAP = {
@@ -13,23 +44,187 @@ ACCENT_MAP = {
     "ca": "ca"          # Canadian English
 }
 
-def generate_audio_for_summary(text: str, accent_key: str, summary_id: int) -> str:
+
+# --- Engines: (text, tld) -> MP3 bytes ---
+
+def _gtts_synthesize(text: str, tld: str) -> bytes:
+    from gtts import gTTS
+
+    buf = io.BytesIO()
+    gTTS(text=text, lang="en", tld=tld, slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, no CRC: 417-byte frames of 1152 samples (~26 ms).
+# An all-zero frame body decodes as silence.
+_SILENT_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+_STUB_CHARS_PER_SEC = 15
+
+
+def _stub_synthesize(text: str, tld: str) -> bytes:
+    seconds = max(1.0, len(text) / _STUB_CHARS_PER_SEC)
+    return _SILENT_FRAME * int(seconds * 44100 / 1152)
+
+
+_ENGINES: Dict[str, Callable[[str, str], bytes]] = {
+    "gtts": _gtts_synthesize,
+    "stub": _stub_synthesize,
+}
+# Bump an engine's version when its output changes, so cached audio is regenerated
+_ENGINE_VERSIONS = {"gtts": "1", "stub": "1"}
+
+
+def engine_version(engine: Optional[str] = None) -> str:
+    """Everything besides text and voice that determines the audio (part of the cache key)."""
+    engine = (engine or TTS_ENGINE).lower()
+    return f"{engine}:{_ENGINE_VERSIONS.get(engine, '0')}:seg{TTS_SEGMENT_CHARS}"
+
+
+def clean_text_for_speech(content: str) -> str:
+    # Strip markdown asterisks for cleaner reading
+    return content.replace("**", "").replace("#", "")
+
+
+# --- Text segmentation ---
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+def split_sentences(text: str, max_chars: int = TTS_SEGMENT_CHARS) -> List[str]:
+    """Pack whole sentences into segments of at most max_chars (longer sentences are cut at spaces)."""
+    segments: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = ""
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            segments.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+# --- MP3 concatenation ---
+
+_BITRATES = {  # kbit/s by bitrate index: MPEG-1 Layer III, MPEG-2/2.5 Layer III
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _frame_length(header: bytes) -> Optional[int]:
+    """Length of the Layer III frame starting with `header` (4 bytes), or None if it isn't one."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x3       # 3: MPEG-1, 2: MPEG-2, 0: MPEG-2.5
+    layer = (header[1] >> 1) & 0x3         # 1: Layer III
+    bitrate_idx = (header[2] >> 4) & 0xF
+    rate_idx = (header[2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    bitrate = _BITRATES[1 if version == 3 else 2][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    padding = (header[2] >> 1) & 0x1
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def strip_mp3_metadata(data: bytes) -> bytes:
+    """Drop ID3v2/ID3v1 tags and a leading Xing/Info frame so MP3 segments can be concatenated."""
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size + (10 if data[5] & 0x10 else 0)   # footer flag
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    length = _frame_length(data[start:start + 4])
+    if length and (b"Xing" in data[start:start + 64] or b"Info" in data[start:start + 64]):
+        start += length
+    return data[start:end]
+
+
+# --- Pipeline ---
+
+def blob_filename(key: str) -> str:
+    return f"tts_{key}.mp3"
+
+
+def _new_partial(path: str):
+    """Open a fresh .part file next to `path` for one synthesis run; returns (file, its path)."""
+    fd, part = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".part")
+    os.fchmod(fd, 0o644)   # mkstemp's 0600 would carry over to the final file
+    return os.fdopen(fd, "wb"), part
+
+
+def find_partial(path: str) -> Optional[str]:
+    """The .part file of the latest synthesis of `path` still running, or None."""
+    parts = glob.glob(glob.escape(path) + ".*.part")
+    latest = None
+    for part in parts:
+        try:
+            mtime = os.path.getmtime(part)
+        except FileNotFoundError:   # finished in the meantime
+            continue
+        if latest is None or mtime > latest[0]:
+            latest = (mtime, part)
+    return latest[1] if latest else None
+
+
+def synthesize_to_file(text: str, output_path: str, tld: str = "com", engine: Optional[str] = None) -> None:
+    """
+    Synthesize `text` into `output_path`, appending segments to this run's own
+    .part file in order as they finish. Raises if any segment fails (the .part
+    is removed).
     """
-    Generates an MP3 file for the given text using Google TTS.
-    Returns the filename.
+    synthesize = _ENGINES[(engine or TTS_ENGINE).lower()]
+    segments = split_sentences(text)
+    if not segments:
+        raise ValueError("no text to synthesize")
+
+    progress.stage("synthesizing", "Generating audio", 0, len(segments))
+    out, part = _new_partial(output_path)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(TTS_MAX_WORKERS, len(segments))))
+    try:
+        with out:
+            futures = [progress.submit_in_context(pool, synthesize, seg, tld) for seg in segments]
+            # Consumed in order: segment i is written once segments 1..i are all done
+            for i, fut in enumerate(futures, start=1):
+                progress.check_cancelled()
+                out.write(strip_mp3_metadata(fut.result()))
+                out.flush()
+                progress.stage("synthesizing", "Generating audio", i, len(segments))
+        os.replace(part, output_path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    finally:
+        # After a failure, segments not started yet are dropped
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_audio_for_summary(text: str, accent_key: str, filename: str) -> Optional[str]:
+    """
+    Generates an MP3 file for the given text (see module docstring) in UPLOAD_DIR.
+    Returns the filename, or None if synthesis failed.
     """
     # Default to US if key not found
     tld = ACCENT_MAP.get(accent_key, "com")
-    
-    # Create unique filename
-    filename = f"summary_audio_{summary_id}.mp3"
     output_path = os.path.join(UPLOAD_DIR, filename)
-    
+
     try:
-        # gTTS is synchronous, no await needed
-        tts = gTTS(text=text, lang="en", tld=tld, slow=False)
-        tts.save(output_path)
+        synthesize_to_file(text, output_path, tld)
         return filename
+    except progress.GenerationCancelled:
+        raise
     except Exception as e:
-        print(f"gTTS Error: {e}")
-        return None
\ No newline at end of file
+        print(f"TTS Error: {e}")
+        return None
@@ -0,0 +1,70 @@
+# backend/utils_files.py
+"""
+Serving stored files (documents, summary audio).
+
+send_stored_file() answers with a strong content-hash ETag, honours
+If-None-Match / If-Range and byte ranges (206), and marks the response
+immutable when the URL pins the content (?v=<etag>), so browsers keep large
+PDFs and MP3s instead of re-downloading them. Without ?v= clients revalidate
+(cheap 304s).
+
+With FILE_OFFLOAD_HEADER set (e.g. X-Accel-Redirect), the body is not sent by
+Python at all: the response carries the header and the proxy serves the file
+from the shared data volume (see proxy/Caddyfile).
+"""
+import os
+import hashlib
+from typing import Optional
+
+from flask import Response, request, send_file
+
+from backend.services.extract import UPLOAD_DIR
+
+FILE_OFFLOAD_HEADER = os.getenv("FILE_OFFLOAD_HEADER", "")      # "" = Python sends the file
+FILE_OFFLOAD_PREFIX = os.getenv("FILE_OFFLOAD_PREFIX", "/_uploads/")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def send_stored_file(path: str, *, mimetype: str, etag: Optional[str] = None,
+                     as_attachment: bool = False, download_name: Optional[str] = None) -> Response:
+    """
+    `path` is a file under UPLOAD_DIR whose content never changes; `etag` is its
+    content hash (None: Werkzeug's mtime/size tag).
+    """
+    if etag and request.args.get("v") == etag:
+        cache_control = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = "private, no-cache"
+
+    if FILE_OFFLOAD_HEADER:
+        if etag and request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(mimetype=mimetype)
+            resp.headers[FILE_OFFLOAD_HEADER] = FILE_OFFLOAD_PREFIX + os.path.relpath(path, UPLOAD_DIR)
+            disposition = "attachment" if as_attachment else "inline"
+            if download_name:
+                resp.headers.set("Content-Disposition", disposition, filename=download_name)
+            resp.last_modified = os.path.getmtime(path)
+        if etag:
+            resp.set_etag(etag)
+    else:
+        # conditional=True: Range / If-Range -> 206, If-None-Match -> 304
+        resp = send_file(
+            path,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            etag=etag if etag else True,
+            conditional=True,
+        )
+    resp.headers["Cache-Control"] = cache_control
+    return resp
@@ -0,0 +1,202 @@
+# backend/worker.py
+"""
+Worker pool for the durable job queue (backend/jobs.py).
+
+Run next to the web app, against the same DATABASE_URL and data directory:
+    python -m backend.worker --processes 2
+
+Each process runs WORKER_THREADS job loops plus JOB_INTERACTIVE_THREADS loops
+that only claim interactive kinds (jobs.INTERACTIVE_KINDS), so short-answer
+grading never queues behind a long generation job. With both kinds of job in
+the same process, its LLM scheduler (services/scheduler.py) admits the
+interactive calls first. Each loop claims one job at a time, runs its handler
+(backend/job_handlers.py) and heartbeats the job's lease while it runs,
+watching for cancellation. The parent restarts processes that die; their jobs
+are picked up again once the lease lapses. SIGTERM/SIGINT stop claiming and
+let running jobs finish.
+
+For local development, JOB_EMBEDDED_WORKERS=N runs N worker threads inside the
+web process instead.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import os
+import time
+import signal
+import socket
+import argparse
+import threading
+import traceback
+import multiprocessing
+from types import SimpleNamespace
+
+from backend import jobs
+from backend.db import init_db, run_in_session, session_scope
+from backend.job_handlers import HANDLERS, FAILURE_HANDLERS
+from backend.services import metrics, process_stats, progress, scheduler
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "1"))                    # job loops per process
+JOB_INTERACTIVE_THREADS = int(os.getenv("JOB_INTERACTIVE_THREADS", "1"))  # + loops reserved for interactive kinds
+JOB_POLL_SECS = float(os.getenv("JOB_POLL_SECS", "1.0"))
+JOB_EMBEDDED_WORKERS = int(os.getenv("JOB_EMBEDDED_WORKERS", "0"))
+JOB_CANCEL_POLL_SECS = float(os.getenv("JOB_CANCEL_POLL_SECS", "1.0"))
+
+
+def _heartbeat(job_id: int, worker_id: str, done: threading.Event, reporter: progress.Reporter):
+    """Renew the lease every JOB_VISIBILITY_SECS/3; poll for a cancel request in between."""
+    interval = max(1.0, jobs.JOB_VISIBILITY_SECS / 3)
+    next_beat = time.monotonic() + interval
+    while not done.wait(min(JOB_CANCEL_POLL_SECS, interval)):
+        try:
+            with session_scope() as db:
+                if not reporter.cancelled and jobs.cancel_requested(db, job_id):
+                    reporter.cancel()
+            if time.monotonic() >= next_beat:
+                next_beat = time.monotonic() + interval
+                if not run_in_session(lambda db: jobs.heartbeat(db, job_id, worker_id)):
+                    print(f"Job {job_id}: lease lost")
+                    return
+        except Exception as e:
+            print(f"Job {job_id}: heartbeat failed: {e}")
+
+
+def _after_failure(job: dict, status: str) -> None:
+    hook = FAILURE_HANDLERS.get(job["kind"])
+    if hook is None or status != "failed":
+        return
+    try:
+        run_in_session(lambda db: hook(db, job["user_id"], job["payload"]))
+    except Exception as e:
+        print(f"Job {job['id']} ({job['kind']}): failure handler failed: {e}")
+
+
+def run_job(job: dict, worker_id: str) -> None:
+    done = threading.Event()
+    start = time.perf_counter()
+    try:
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            raise jobs.JobError(f"unknown job kind: {job['kind']}", 500)
+        # Progress is written on its own connection; the block closes after the commit
+        with progress.reporting(jobs.progress_sink(job["id"])) as reporter, \
+                scheduler.caller(job["user_id"], jobs.job_priority(job["kind"])):
+            threading.Thread(
+                target=_heartbeat, args=(job["id"], worker_id, done, reporter), daemon=True
+            ).start()
+            with session_scope() as db:
+                result = handler(db, job["user_id"], job["payload"])
+                jobs.complete(db, job["id"], worker_id, result)
+        metrics.incr(f"jobs.{job['kind']}.succeeded")
+    except progress.GenerationCancelled:
+        # The handler's session was rolled back: nothing it generated is kept
+        run_in_session(lambda db: jobs.mark_cancelled(db, job["id"], worker_id))
+        print(f"Job {job['id']} ({job['kind']}) cancelled")
+    except jobs.LeaseLost:
+        print(f"Job {job['id']}: lease lost before completion, results discarded")
+    except jobs.JobError as e:
+        status = run_in_session(
+            lambda db: jobs.fail(db, job["id"], worker_id, e.message, permanent=True, status=e.status)
+        )
+        _after_failure(job, status)
+    except Exception as e:
+        traceback.print_exc()
+        status = run_in_session(lambda db: jobs.fail(db, job["id"], worker_id, str(e)))
+        print(f"Job {job['id']} ({job['kind']}) attempt {job['attempt']} failed: {e} -> {status}")
+        _after_failure(job, status)
+    finally:
+        done.set()
+        metrics.observe(f"jobs.{job['kind']}.seconds", time.perf_counter() - start)
+
+
+def work_loop(worker_id: str, stop: threading.Event, interactive_only: bool = False) -> None:
+    while not stop.is_set():
+        try:
+            job = run_in_session(lambda db: jobs.claim(db, worker_id, interactive_only=interactive_only))
+        except Exception as e:
+            print(f"Worker {worker_id}: claim failed: {e}")
+            job = None
+        if job is None:
+            stop.wait(JOB_POLL_SECS)
+            continue
+        run_job(job, worker_id)
+
+
+def _init_db():
+    config = {"DATABASE_URL": os.environ["DATABASE_URL"]} if os.getenv("DATABASE_URL") else {}
+    init_db(SimpleNamespace(config=config))
+
+
+def _start_loops(stop: threading.Event, threads: int, interactive_threads: int) -> list:
+    """Job loops of this process, each with its own worker id (leases are per loop)."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    loops = [(f"{base}:t{i}", False) for i in range(threads)]
+    loops += [(f"{base}:i{i}", True) for i in range(interactive_threads)]
+    started = []
+    for worker_id, interactive_only in loops:
+        t = threading.Thread(target=work_loop, args=(worker_id, stop, interactive_only), daemon=True,
+                             name=f"job-worker-{worker_id.rsplit(':', 1)[1]}")
+        t.start()
+        started.append(t)
+    return started
+
+
+def _process_main(index: int):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    _init_db()
+    print(f"Worker {index} ({socket.gethostname()}:{os.getpid()}) started")
+    process_stats.start_publisher("worker")  # breakers, LLM metrics and scheduler, for /api/health and /api/metrics
+    for t in _start_loops(stop, WORKER_THREADS, JOB_INTERACTIVE_THREADS):
+        while t.is_alive():
+            t.join(1.0)  # wake up for signals
+
+
+def start_embedded_workers(n: int = JOB_EMBEDDED_WORKERS) -> None:
+    """Run n worker threads (plus the interactive ones) in this (web) process; the database must already be initialised."""
+    _start_loops(threading.Event(), n, JOB_INTERACTIVE_THREADS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job workers")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    _init_db()  # create tables / run migrations once, before starting the workers
+    procs = {}
+    stopping = False
+
+    def _shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for p in procs.values():
+            if p.is_alive():
+                p.terminate()  # SIGTERM: finish the current job, then exit
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    # spawn: children start clean instead of inheriting the parent's DB connections
+    ctx = multiprocessing.get_context("spawn")
+    while True:
+        for i in range(args.processes):
+            p = procs.get(i)
+            if p is not None and p.is_alive():
+                continue
+            if p is not None:
+                print(f"Worker {i} exited with {p.exitcode}")
+                del procs[i]
+            if stopping:
+                continue
+            p = ctx.Process(target=_process_main, args=(i,))
+            p.start()
+            procs[i] = p
+        if stopping and not procs:
+            break
+        time.sleep(1.0)
+
+
+if __name__ == "__main__":
+    main()
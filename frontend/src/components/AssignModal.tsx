@@ -1,6 +1,6 @@
 // frontend/src/components/AssignModal.tsx
 import { useState, useEffect } from "react";
-import { api } from "../lib/api";
+import { api, fetchAllPages } from "../lib/api";
 import { CreateCourseModal, CreateTopicModal } from "./ResourceModals";
 
 interface Props {
@@ -22,7 +22,7 @@ export default function AssignModal({ docIds, onClose, onSuccess }: Props) {
   const [showCreateTopic, setShowCreateTopic] = useState(false);
 
   useEffect(() => {
-    api.get("/api/courses/mine").then(({ data }) => setCourses(data.items || []));
+    fetchAllPages("/api/courses/mine").then(setCourses);
   }, []);
 
   useEffect(() => {
@@ -30,7 +30,7 @@ export default function AssignModal({ docIds, onClose, onSuccess }: Props) {
       setTopics([]);
       return;
     }
-    api.get(`/api/topics/by_course/${selectedCourseId}`).then(({ data }) => setTopics(data.items || []));
+    fetchAllPages(`/api/topics/by_course/${selectedCourseId}`).then(setTopics);
   }, [selectedCourseId]);
 
   async function handleSave() {
@@ -1,22 +1,34 @@
 import { useRef, useState, useEffect } from "react";
+import type { JobProgress } from "../lib/jobs";
 
 const apiOrigin = import.meta.env.DEV ? "http://localhost:5000" : "";
 
 interface Props {
   summaryId: number;
   hasAudio: boolean;
-  onGenerate: (voice: string) => Promise<void>;
+  // The audio's ETag (summary.audio_etag): pins the URL so the browser can keep the file
+  audioVersion?: string | null;
+  // Pass onProgress to runJob: playback can start once the first segment is synthesized
+  onGenerate: (voice: string, onProgress: (p: JobProgress) => void) => Promise<void>;
 }
 
-export default function AudioPlayer({ summaryId, hasAudio, onGenerate }: Props) {
+export default function AudioPlayer({ summaryId, hasAudio, audioVersion, onGenerate }: Props) {
   const audioRef = useRef<HTMLAudioElement>(null);
   const [playbackRate, setPlaybackRate] = useState(1.0);
   const [voice, setVoice] = useState("us"); 
   const [generating, setGenerating] = useState(false);
   
   // We use a cache-buster to force the audio element to reload when file changes
-  const [audioKey, setAudioKey] = useState(Date.now());
+  // (until then, the versioned URL is served from the browser cache)
+  const [audioKey, setAudioKey] = useState<number | null>(null);
   const [exists, setExists] = useState(hasAudio);
+  // While a voice is being synthesized, play that voice's (growing) file
+  const [srcVoice, setSrcVoice] = useState<string | null>(null);
+  const audioParams = new URLSearchParams();
+  if (srcVoice) audioParams.set("voice", srcVoice);
+  if (audioKey !== null) audioParams.set("t", String(audioKey));
+  else if (audioVersion) audioParams.set("v", audioVersion);
+  const audioSrc = `${apiOrigin}/api/summaries/${summaryId}/audio?${audioParams}`;
 
   useEffect(() => {
     setExists(hasAudio);
@@ -30,15 +42,23 @@ export default function AudioPlayer({ summaryId, hasAudio, onGenerate }: Props)
 
   const handleGenerate = async () => {
     setGenerating(true);
-    try {
-      await onGenerate(voice);
+    let streaming = false;
+    const onProgress = (p: JobProgress) => {
+      if (streaming || p.stage !== "synthesizing" || !p.current) return;
+      // The server streams the segments written so far and follows the file until it is complete
+      streaming = true;
+      setSrcVoice(voice);
       setExists(true);
-      // Update key to force browser to re-fetch the file (bypassing cache)
       setAudioKey(Date.now());
-      
-      // Auto-reload the audio element
-      if (audioRef.current) {
-        audioRef.current.load();
+    };
+    try {
+      await onGenerate(voice, onProgress);
+      setExists(true);
+      if (!streaming) {
+        // Finished (or served from the audio cache without a job): the summary now points at it
+        setSrcVoice(null);
+        // Update key to force browser to re-fetch the file (bypassing cache)
+        setAudioKey(Date.now());
       }
     } catch(e) {
       console.error(e);
@@ -85,7 +105,7 @@ export default function AudioPlayer({ summaryId, hasAudio, onGenerate }: Props)
             controls 
             className="w-full h-10 focus:outline-none"
             // Append timestamp to URL to bypass browser cache after regeneration
-            src={`${apiOrigin}/api/summaries/${summaryId}/audio?t=${audioKey}`} 
+            src={audioSrc} 
             onError={(e) => console.error("Audio load error", e)}
           />
         </div>
@@ -133,7 +153,7 @@ export default function AudioPlayer({ summaryId, hasAudio, onGenerate }: Props)
 
         {exists && (
             <a 
-                href={`${apiOrigin}/api/summaries/${summaryId}/audio?t=${audioKey}`} 
+                href={audioSrc} 
                 download 
                 className="p-2.5 text-gray-400 hover:text-blue-600 hover:bg-blue-50 rounded-lg transition border border-transparent hover:border-blue-100"
                 title="Download MP3"
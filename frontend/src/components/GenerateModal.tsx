@@ -1,7 +1,8 @@
 // frontend/src/components/GenerateModal.tsx
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { api } from "../lib/api";
+import { runJob, cancelJob, type JobProgress } from "../lib/jobs";
 import ProgressOverlay from "./ProgressOverlay";
 
 type GenType = "quiz" | "flashcards" | "summary";
@@ -31,6 +32,24 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
 
   const [isBusy, setIsBusy] = useState(false);
   const [showProgress, setShowProgress] = useState(false);
+  const [progress, setProgress] = useState<JobProgress | null>(null);
+  // Running job, so closing the modal can stop it instead of leaving the model generating
+  const jobId = useRef<number | null>(null);
+  const cancelled = useRef(false);
+
+  function cancelRunning() {
+    if (jobId.current === null) return;
+    cancelled.current = true;
+    cancelJob(jobId.current);
+    jobId.current = null;
+  }
+
+  useEffect(() => cancelRunning, []); // unmounted mid-generation
+
+  function handleClose() {
+    cancelRunning();
+    onClose();
+  }
 
   const defaultTitle = type === "quiz" ? "New Quiz" : type === "flashcards" ? "New Flashcard Set" : "New Summary";
   const actionLabel = type === "quiz" ? "Generate Quiz" : type === "flashcards" ? "Generate Flashcards" : "Generate Summary";
@@ -39,6 +58,8 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
     e.preventDefault();
     setIsBusy(true);
     setShowProgress(true);
+    setProgress(null);
+    cancelled.current = false;
 
     try {
       const finalTitle = title.trim() || defaultTitle;
@@ -65,7 +86,8 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
       else if (type === "flashcards") url = "/api/flashcards/generate";
       else if (type === "summary") url = "/api/summaries/generate";
 
-      const { data } = await api.post(url, payload);
+      const data = await runJob(api.post(url, payload), setProgress, (id) => (jobId.current = id));
+      jobId.current = null;
 
       if (type === "quiz") nav(`/quiz?quizId=${data.quiz_id}`);
       else if (type === "flashcards") nav(`/flashcards/${data.set_id}`);
@@ -74,6 +96,8 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
       onSuccess?.();
 
     } catch (err: any) {
+      jobId.current = null;
+      if (cancelled.current) return;
       alert(err?.response?.data?.error || "Generation failed");
       setShowProgress(false);
       setIsBusy(false);
@@ -85,6 +109,8 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
       {showProgress && (
         <ProgressOverlay
           title={`Generating ${type}...`}
+          progress={progress}
+          onCancel={handleClose}
           messages={
             type === 'quiz' && (includeSA || includeTF) 
             ? ["Reading documents...", "Generating Multiple Choice...", "Generating Short Answers...", "Generating True/False...", "Finalizing..."]
@@ -95,7 +121,7 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
 
       <div className="fixed inset-0 bg-black/50 z-40 flex items-center justify-center p-4">
         <div className="bg-white rounded-xl shadow-xl w-full max-w-md p-6 relative max-h-[90vh] overflow-y-auto">
-          <button onClick={onClose} className="absolute top-4 right-4 text-gray-400 hover:text-gray-600">✕</button>
+          <button onClick={handleClose} className="absolute top-4 right-4 text-gray-400 hover:text-gray-600">✕</button>
 
           <h2 className="text-xl font-semibold mb-1">{actionLabel}</h2>
           <p className="text-sm text-gray-500 mb-4">
@@ -228,7 +254,7 @@ export default function GenerateModal({ type, docIds, onClose, onSuccess }: Prop
             <div className="flex justify-end gap-2 pt-4 border-t">
               <button
                 type="button"
-                onClick={onClose}
+                onClick={handleClose}
                 className="px-4 py-2 text-sm text-gray-600 hover:bg-gray-100 rounded-lg transition"
               >
                 Cancel
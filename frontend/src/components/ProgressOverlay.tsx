@@ -1,12 +1,14 @@
 import { useEffect, useRef, useState } from "react";
+import type { JobProgress } from "../lib/jobs";
 
 type Props = {
   title?: string;
   messages?: string[];
-  onCancel?: () => void; // optional (we won't wire cancel yet)
+  progress?: JobProgress | null; // live job progress; canned messages are shown until the first event
+  onCancel?: () => void; // shows a Cancel button
 };
 
-export default function ProgressOverlay({ title="Working…", messages, onCancel }: Props) {
+export default function ProgressOverlay({ title="Working…", messages, progress, onCancel }: Props) {
   const defaultMsgs = [
     "Reading your document…",
     "Extracting key points…",
@@ -30,6 +32,13 @@ export default function ProgressOverlay({ title="Working…", messages, onCancel
   const mm = String(Math.floor(elapsed/60)).padStart(2,'0');
   const ss = String(elapsed%60).padStart(2,'0');
 
+  let message = steps[idx];
+  if (progress?.message) {
+    message = progress.message;
+    if (progress.current != null && progress.total) message += ` (${progress.current}/${progress.total})`;
+  }
+  const pct = progress?.current != null && progress.total ? Math.round((progress.current / progress.total) * 100) : null;
+
   return (
     <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/40">
       <div className="w-full max-w-md rounded-2xl bg-white p-6 shadow-xl">
@@ -37,11 +46,19 @@ export default function ProgressOverlay({ title="Working…", messages, onCancel
           <Spinner />
           <div>
             <div className="text-lg font-semibold">{title}</div>
-            <div className="text-sm text-gray-600">{steps[idx]}</div>
+            <div className="text-sm text-gray-600">{message}</div>
+            {!!progress?.tokens && (
+              <div className="text-xs text-gray-400 tabular-nums">{progress.tokens.toLocaleString()} tokens generated</div>
+            )}
           </div>
           <div className="ml-auto text-sm text-gray-500 tabular-nums">{mm}:{ss}</div>
         </div>
-        {/* Optional cancel */}
+        {pct !== null && (
+          <div className="mt-4 h-1.5 w-full rounded-full bg-gray-100">
+            <div className="h-full rounded-full bg-blue-600 transition-all duration-500" style={{ width: `${pct}%` }} />
+          </div>
+        )}
+        {/* Optional cancel (stops the job on the server) */}
         {onCancel && (
           <div className="mt-4 text-right">
             <button onClick={onCancel} className="px-3 py-1 rounded bg-gray-200 hover:bg-gray-300">Cancel</button>
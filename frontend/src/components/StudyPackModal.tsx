@@ -0,0 +1,185 @@
+// frontend/src/components/StudyPackModal.tsx
+import { useEffect, useRef, useState } from "react";
+import { Link } from "react-router-dom";
+import { api } from "../lib/api";
+import { runJob, cancelJob, type JobProgress } from "../lib/jobs";
+import ProgressOverlay from "./ProgressOverlay";
+
+type Kind = "quiz" | "flashcards" | "summary";
+
+type PackItem = {
+  key: string;
+  topic: string;
+  kind: Kind;
+  status: string;
+  id: number | null;
+  count: number | null;
+  error: string | null;
+};
+
+interface Props {
+  courseId: number;
+  courseName: string;
+  onClose: () => void;
+}
+
+const LABELS: Record<Kind, string> = { quiz: "Quiz", flashcards: "Flashcards", summary: "Summary" };
+
+function itemLink(item: PackItem) {
+  if (item.kind === "quiz") return `/quiz?quizId=${item.id}`;
+  if (item.kind === "flashcards") return `/flashcards/${item.id}`;
+  return `/summary/${item.id}`;
+}
+
+// One quiz / flashcard set / summary per topic of the course, generated as a single job
+export default function StudyPackModal({ courseId, courseName, onClose }: Props) {
+  const [kinds, setKinds] = useState<Record<Kind, boolean>>({ quiz: true, flashcards: true, summary: true });
+  const [nMcq, setNMcq] = useState(5);
+  const [nCards, setNCards] = useState(12);
+  const [detail, setDetail] = useState("brief");
+
+  const [isBusy, setIsBusy] = useState(false);
+  const [progress, setProgress] = useState<JobProgress | null>(null);
+  const [items, setItems] = useState<PackItem[] | null>(null);
+  const jobId = useRef<number | null>(null);
+
+  function cancelRunning() {
+    if (jobId.current !== null) cancelJob(jobId.current);
+    jobId.current = null;
+  }
+
+  useEffect(() => cancelRunning, []);
+
+  function handleClose() {
+    cancelRunning();
+    onClose();
+  }
+
+  async function handleGenerate(e: React.FormEvent) {
+    e.preventDefault();
+    const artifacts: Record<string, any> = {};
+    if (kinds.quiz) artifacts.quiz = { n_mcq: nMcq };
+    if (kinds.flashcards) artifacts.flashcards = { n: nCards };
+    if (kinds.summary) artifacts.summary = { detail_level: detail };
+    if (!Object.keys(artifacts).length) return;
+
+    setIsBusy(true);
+    setProgress(null);
+    try {
+      const data = await runJob(
+        api.post(`/api/courses/${courseId}/study-pack`, { artifacts }),
+        setProgress,
+        (id) => (jobId.current = id)
+      );
+      jobId.current = null;
+      setItems(data.items);
+    } catch (err: any) {
+      if (jobId.current === null && err?.response?.status === 409) return; // cancelled
+      jobId.current = null;
+      alert(err?.response?.data?.error || "Study pack generation failed");
+    } finally {
+      setIsBusy(false);
+    }
+  }
+
+  const itemCount = progress?.items ? Object.keys(progress.items).length : 0;
+  const itemsDone = progress?.items
+    ? Object.values(progress.items).filter((i) => i.status === "generated" || i.status === "failed").length
+    : 0;
+
+  return (
+    <>
+      {isBusy && (
+        <ProgressOverlay
+          title={`Building study pack for ${courseName}...`}
+          progress={progress}
+          messages={itemCount ? [`${itemsDone} of ${itemCount} items done`] : undefined}
+          onCancel={handleClose}
+        />
+      )}
+
+      <div className="fixed inset-0 bg-black/50 z-40 flex items-center justify-center p-4">
+        <div className="bg-white rounded-xl shadow-xl w-full max-w-md p-6 relative max-h-[90vh] overflow-y-auto">
+          <button onClick={handleClose} className="absolute top-4 right-4 text-gray-400 hover:text-gray-600">✕</button>
+
+          <h2 className="text-xl font-semibold mb-1">Study Pack</h2>
+          <p className="text-sm text-gray-500 mb-4">Generate material for every topic in {courseName}.</p>
+
+          {items ? (
+            <ul className="space-y-2 text-sm">
+              {items.map((item) => (
+                <li key={item.key} className="flex items-center justify-between border rounded-lg px-3 py-2">
+                  <span className="truncate">
+                    {item.topic} · {LABELS[item.kind]}
+                    {item.count != null && <span className="text-gray-400"> ({item.count})</span>}
+                  </span>
+                  {item.id ? (
+                    <Link to={itemLink(item)} className="text-blue-600 hover:underline">Open</Link>
+                  ) : (
+                    <span className="text-red-500">{item.error || "failed"}</span>
+                  )}
+                </li>
+              ))}
+            </ul>
+          ) : (
+            <form onSubmit={handleGenerate} className="space-y-4">
+              {(Object.keys(LABELS) as Kind[]).map((kind) => (
+                <div key={kind} className="flex items-center justify-between gap-3">
+                  <label className="flex items-center gap-2 text-sm font-medium text-gray-700">
+                    <input
+                      type="checkbox"
+                      checked={kinds[kind]}
+                      onChange={(e) => setKinds({ ...kinds, [kind]: e.target.checked })}
+                    />
+                    {LABELS[kind]}
+                  </label>
+                  {kind === "quiz" && (
+                    <input
+                      type="number" min={1} max={20} value={nMcq} disabled={!kinds.quiz}
+                      onChange={(e) => setNMcq(Number(e.target.value))}
+                      className="w-20 border rounded-lg px-2 py-1 text-sm"
+                    />
+                  )}
+                  {kind === "flashcards" && (
+                    <input
+                      type="number" min={1} max={50} value={nCards} disabled={!kinds.flashcards}
+                      onChange={(e) => setNCards(Number(e.target.value))}
+                      className="w-20 border rounded-lg px-2 py-1 text-sm"
+                    />
+                  )}
+                  {kind === "summary" && (
+                    <select
+                      value={detail} disabled={!kinds.summary}
+                      onChange={(e) => setDetail(e.target.value)}
+                      className="border rounded-lg px-2 py-1 text-sm"
+                    >
+                      <option value="brief">Brief</option>
+                      <option value="detailed">Detailed</option>
+                    </select>
+                  )}
+                </div>
+              ))}
+
+              <div className="flex justify-end gap-2 pt-4 border-t">
+                <button
+                  type="button"
+                  onClick={handleClose}
+                  className="px-4 py-2 text-sm text-gray-600 hover:bg-gray-100 rounded-lg transition"
+                >
+                  Cancel
+                </button>
+                <button
+                  type="submit"
+                  disabled={isBusy || !Object.values(kinds).some(Boolean)}
+                  className="px-4 py-2 text-sm bg-blue-600 text-white rounded-lg hover:bg-blue-700 disabled:opacity-50 transition"
+                >
+                  Generate
+                </button>
+              </div>
+            </form>
+          )}
+        </div>
+      </div>
+    </>
+  );
+}
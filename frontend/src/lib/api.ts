@@ -7,3 +7,20 @@ export const api = axios.create({
   baseURL: base,
   withCredentials: true,
 });
+
+// Inline view URL for a document; ?v=<content hash> lets the browser cache it for good
+export const docViewPath = (doc: { id: number; sha256?: string | null }) =>
+  `/api/files/view/${doc.id}${doc.sha256 ? `?v=${doc.sha256}` : ""}`;
+
+// List endpoints return one page ({ items, next_cursor }); follow the cursors for the whole list.
+// Only for lists that are small by nature or shown in full (courses, topics, the library).
+export async function fetchAllPages<T = any>(url: string, params: Record<string, any> = {}): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const { data } = await api.get(url, { params: { ...params, limit: 500, ...(cursor ? { cursor } : {}) } });
+    items.push(...(data.items || []));
+    cursor = data.next_cursor || null;
+  } while (cursor);
+  return items;
+}
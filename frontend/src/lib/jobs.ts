@@ -0,0 +1,75 @@
+// frontend/src/lib/jobs.ts
+import type { AxiosResponse } from "axios";
+import { api } from "./api";
+
+// Long generations run as background jobs: the endpoint answers 202 { job_id },
+// then /api/jobs/<id>/result answers 202 while the job runs, 200 with the
+// result when it succeeded, or the job's error status when it failed.
+// Live progress comes from /api/jobs/<id>/events (Server-Sent Events); when the
+// server has no stream to spare (429) it comes from the 202 polls instead.
+// POST /api/jobs/<id>/cancel stops a job; its result then answers 409.
+const JOB_POLL_MS = 1500;
+
+export type JobProgress = {
+  stage: string; // extracting | waiting_llm | generating | parsing | saving | ...
+  message: string;
+  current: number | null;
+  total: number | null;
+  tokens: number;
+  elapsed: number;
+  status: string;
+  // Jobs that build several things (study packs) report each one
+  items?: Record<string, { topic?: string; kind?: string; status: string; count?: number | null; error?: string | null }>;
+};
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Resolves when the job finishes, or when the stream is unavailable (polling takes over).
+function followEvents(jobId: number, onProgress: (p: JobProgress) => void): Promise<void> {
+  return new Promise((resolve) => {
+    const es = new EventSource(`${api.defaults.baseURL || ""}/api/jobs/${jobId}/events`, {
+      withCredentials: true,
+    });
+    es.addEventListener("progress", (e) => onProgress(JSON.parse((e as MessageEvent).data)));
+    es.addEventListener("done", () => {
+      es.close();
+      resolve();
+    });
+    es.onerror = () => {
+      // The browser reconnects on its own unless the server refused the stream
+      if (es.readyState === EventSource.CLOSED) resolve();
+    };
+  });
+}
+
+export async function waitForJob<T = any>(
+  jobId: number,
+  onProgress?: (p: JobProgress) => void
+): Promise<T> {
+  if (onProgress && typeof EventSource !== "undefined") {
+    await followEvents(jobId, onProgress);
+  }
+  for (;;) {
+    const res = await api.get(`/api/jobs/${jobId}/result`); // rejects (axios error) when the job failed
+    if (res.status !== 202) return res.data as T;
+    if (onProgress && res.data?.progress) onProgress({ ...res.data.progress, status: res.data.status });
+    await sleep(JOB_POLL_MS);
+  }
+}
+
+export function cancelJob(jobId: number) {
+  return api.post(`/api/jobs/${jobId}/cancel`).catch(() => undefined); // 409: already finished
+}
+
+// Await a request that starts a job and resolve with the job's result.
+// onStarted receives the job id, e.g. to cancelJob() it later.
+export async function runJob<T = any>(
+  request: Promise<AxiosResponse>,
+  onProgress?: (p: JobProgress) => void,
+  onStarted?: (jobId: number) => void
+): Promise<T> {
+  const { status, data } = await request;
+  if (status !== 202 || data?.job_id === undefined) return data as T;
+  onStarted?.(data.job_id);
+  return waitForJob<T>(data.job_id, onProgress);
+}
@@ -1,8 +1,9 @@
 // frontend/src/pages/CoursesPage.tsx
 import { useEffect, useState, useMemo } from "react";
 import { useNavigate } from "react-router-dom";
-import { api } from "../lib/api";
+import { api, docViewPath, fetchAllPages } from "../lib/api";
 import GenerateModal from "../components/GenerateModal";
+import StudyPackModal from "../components/StudyPackModal";
 import { CreateCourseModal, CreateTopicModal } from "../components/ResourceModals";
 import { RenameModal, DeleteModal } from "../components/ActionModals";
 
@@ -12,7 +13,7 @@ const apiHref = (path: string) => `${apiOrigin}${path}`;
 // --- Types ---
 type Course = { id: number; name: string; description?: string | null };
 type Topic = { id: number; name: string; description?: string | null; course_id: number };
-type Doc = { id: number; original_name: string; size: number; created_at: string; topic_id?: number | null };
+type Doc = { id: number; original_name: string; size: number; created_at: string; topic_id?: number | null; sha256?: string | null };
 
 // --- Icons ---
 const Icons = {
@@ -143,6 +144,7 @@ export default function CoursesPage() {
   const [showCourseModal, setShowCourseModal] = useState(false);
   const [showTopicModal, setShowTopicModal] = useState(false);
   const [activeGenType, setActiveGenType] = useState<"quiz" | "flashcards" | "summary" | null>(null);
+  const [showStudyPack, setShowStudyPack] = useState(false);
   
   // Modals for Adding/Removing Docs
   const [showAddDocModal, setShowAddDocModal] = useState(false);
@@ -157,11 +159,10 @@ export default function CoursesPage() {
 
   useEffect(() => {
     setLoading(true);
-    api
-      .get("/api/courses/mine")
-      .then(({ data }) => {
-        setCourses(data.items || []);
-        if (!selectedCourseId && data.items?.length > 0) setSelectedCourseId(data.items[0].id);
+    fetchAllPages<Course>("/api/courses/mine")
+      .then((items) => {
+        setCourses(items);
+        if (!selectedCourseId && items.length > 0) setSelectedCourseId(items[0].id);
       })
       .finally(() => setLoading(false));
   }, [nav]);
@@ -175,14 +176,14 @@ export default function CoursesPage() {
     if (!docsByCourse[courseId]) setLoadingDetails((prev) => ({ ...prev, [courseId]: true }));
 
     try {
-      const [tRes, dRes] = await Promise.all([
-        api.get(`/api/topics/by_course/${courseId}`),
+      const [topicItems, dRes] = await Promise.all([
+        fetchAllPages<Topic>(`/api/topics/by_course/${courseId}`),
         api.get("/api/files/mine", { params: { course_id: courseId } }),
       ]);
-      setTopicsByCourse((prev) => ({ ...prev, [courseId]: tRes.data.items || [] }));
+      setTopicsByCourse((prev) => ({ ...prev, [courseId]: topicItems }));
       setDocsByCourse((prev) => ({ ...prev, [courseId]: dRes.data.items || [] }));
 
-      const tIds = (tRes.data.items || []).map((t: Topic) => String(t.id));
+      const tIds = topicItems.map((t: Topic) => String(t.id));
       setExpandedTopics((prev) => {
         const next: Record<string, boolean> = { ...prev, none: true };
         tIds.forEach((id: string) => (next[id] = true));
@@ -461,6 +462,14 @@ export default function CoursesPage() {
                     </button>
                   </div>
 
+                  <button
+                    onClick={() => setShowStudyPack(true)}
+                    title="Generate a quiz, flashcards and a summary for every topic"
+                    className="px-3 py-2 text-sm border rounded-lg text-gray-700 hover:bg-gray-50 shadow-sm transition"
+                  >
+                    Study Pack
+                  </button>
+
                   <button
                     onClick={() => setShowTopicModal(true)}
                     className="px-3 py-2 text-sm bg-blue-600 text-white rounded-lg hover:bg-blue-700 shadow-sm transition"
@@ -691,6 +700,14 @@ export default function CoursesPage() {
           />
         )}
 
+        {showStudyPack && selectedCourse && (
+          <StudyPackModal
+            courseId={selectedCourse.id}
+            courseName={selectedCourse.name}
+            onClose={() => setShowStudyPack(false)}
+          />
+        )}
+
         {showAddDocModal && selectedCourseId && (
           <AddDocModal
             courseId={selectedCourseId}
@@ -841,7 +858,7 @@ function TopicSection({
                 key={doc.id}
                 onClick={() => {
                   if (isSelectMode) onToggle(doc.id);
-                  else window.open(apiHref(`/api/files/view/${doc.id}`), "_blank");
+                  else window.open(apiHref(docViewPath(doc)), "_blank");
                 }}
                 className={`flex items-center p-3 gap-3 transition-colors cursor-pointer ${
                   isSelected ? "bg-blue-50" : "hover:bg-gray-50"
@@ -2,6 +2,7 @@
 import { useEffect, useState, useCallback } from "react";
 import { useLocation, useNavigate, useParams } from "react-router-dom";
 import { api } from "../lib/api";
+import { runJob } from "../lib/jobs";
 import GenerateModal from "../components/GenerateModal";
 import { AttemptsModal } from "../components/LibraryModals";
 import AudioPlayer from "../components/AudioPlayer";
@@ -137,6 +138,7 @@ export default function DocDetailsPage() {
     content: string;
     created_at: string;
     audio_filename?: string;
+    audio_etag?: string | null;
   } | null>(null);
 
   // Action States
@@ -179,6 +181,7 @@ export default function DocDetailsPage() {
           content: detailRes.data.summary || detailRes.data.content,
           created_at: detailRes.data.created_at,
           audio_filename: detailRes.data.audio_filename, // <--- Added
+          audio_etag: detailRes.data.audio_etag,
         });
       } else {
         setSummary(null);
@@ -530,8 +533,9 @@ export default function DocDetailsPage() {
                 <AudioPlayer 
                   summaryId={summary.id} 
                   hasAudio={!!summary.audio_filename}
-                  onGenerate={async (voice) => {
-                    await api.post(`/api/summaries/${summary.id}/audio`, { voice });
+                  audioVersion={summary.audio_etag}
+                  onGenerate={async (voice, onProgress) => {
+                    await runJob(api.post(`/api/summaries/${summary.id}/audio`, { voice }), onProgress);
                     loadAll(); // Reloads page data to update the UI state
                   }}
                 />
@@ -1,7 +1,7 @@
 // frontend/src/pages/DocsPage.tsx
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { api } from "../lib/api";
+import { api, docViewPath } from "../lib/api";
 import GenerateModal from "../components/GenerateModal";
 import AssignModal from "../components/AssignModal";
 import { RenameModal, DeleteModal } from "../components/ActionModals";
@@ -205,6 +205,7 @@ type Doc = {
   filename: string;
   mime: string;
   size: number;
+  sha256?: string | null;
   created_at: string;
   owned: boolean;
   course_id?: number | null;
@@ -442,7 +443,7 @@ export default function DocsPage() {
                         )}
                       </div>
                       <a
-                        href={apiHref(`/api/files/view/${doc.id}`)}
+                        href={apiHref(docViewPath(doc))}
                         target="_blank"
                         rel="noreferrer"
                         className="text-xs text-blue-600 hover:underline flex items-center gap-1 mt-1 w-fit"
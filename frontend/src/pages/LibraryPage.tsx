@@ -1,7 +1,7 @@
 // frontend/src/pages/LibraryPage.tsx
 import { useEffect, useState, useMemo } from "react";
 import { useNavigate } from "react-router-dom";
-import { api } from "../lib/api";
+import { api, fetchAllPages } from "../lib/api";
 import { SourcesModal, AttemptsModal } from "../components/LibraryModals";
 import { RenameModal, DeleteModal } from "../components/ActionModals";
 
@@ -47,10 +47,10 @@ export default function LibraryPage() {
     async function loadAll() {
       setLoading(true);
       try {
-        const [qRes, fRes, sRes] = await Promise.all([
+        const [qRes, fItems, sItems] = await Promise.all([
           api.get("/api/quizzes/mine"),
-          api.get("/api/flashcards"),
-          api.get("/api/summaries"),
+          fetchAllPages("/api/flashcards/"),
+          fetchAllPages("/api/summaries/"),
         ]);
 
         const quizzes = (qRes.data.items || []).map((q: any) => ({
@@ -63,7 +63,7 @@ export default function LibraryPage() {
           meta_text: `${q.attempts || 0} Attempt${q.attempts !== 1 ? 's' : ''}`,
         }));
 
-        const flashcards = (fRes.data.items || []).map((f: any) => ({
+        const flashcards = fItems.map((f: any) => ({
           id: f.id,
           type: "flashcard",
           title: f.title,
@@ -73,7 +73,7 @@ export default function LibraryPage() {
           meta_text: `${f.count} Cards`,
         }));
 
-        const summaries = (sRes.data.items || []).map((s: any) => ({
+        const summaries = sItems.map((s: any) => ({
           id: s.id,
           type: "summary",
           title: s.title,
@@ -26,9 +26,21 @@ type AttemptAnswerDto = {
   correct_answer: string;
   explanation: string;
   user_answer: string;
-  is_correct: boolean;
+  is_correct: boolean | null; // null while the short answer is still being graded
 };
 
+type AttemptResultDto = {
+  attempt_id: number;
+  status: "graded" | "pending";
+  correct: number;
+  total: number;
+  score_pct: number | null;
+  pending: number;
+  details: { question_id: number; user_answer: string; is_correct: boolean | null }[];
+};
+
+const GRADING_POLL_MS = 1500;
+
 // --- Icons ---
 const Icons = {
   Eye: () => <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round"><path d="M2 12s3-7 10-7 10 7 10 7-3 7-10 7-10-7-10-7Z"/><circle cx="12" cy="12" r="3"/></svg>,
@@ -54,14 +66,16 @@ export default function QuizPage() {
   const [score, setScore] = useState<number | null>(null);
   const [submitted, setSubmitted] = useState(false);
   const [resultDetails, setResultDetails] = useState<
-    Record<number, { is_correct: boolean; user_answer: string }>
+    Record<number, { is_correct: boolean | null; user_answer: string }>
   >({});
   const [resultOpen, setResultOpen] = useState(false);
   const [result, setResult] = useState<{
     correct: number;
     total: number;
-    pct: number;
+    pct: number | null;
   } | null>(null);
+  // Attempt whose short answers are still being graded in the background
+  const [gradingAttemptId, setGradingAttemptId] = useState<number | null>(null);
 
   const [showAnswers, setShowAnswers] = useState(false);
   const [answersLoading, setAnswersLoading] = useState(false);
@@ -89,13 +103,13 @@ export default function QuizPage() {
           const selMap: Record<number, string> = {};
           const detailsMap: Record<
             number,
-            { is_correct: boolean; user_answer: string }
+            { is_correct: boolean | null; user_answer: string }
           > = {};
 
           ansList.forEach((a) => {
             selMap[a.question_id] = a.user_answer;
             detailsMap[a.question_id] = {
-              is_correct: !!a.is_correct,
+              is_correct: a.is_correct === null ? null : !!a.is_correct,
               user_answer: String(a.user_answer || ""),
             };
           });
@@ -104,6 +118,7 @@ export default function QuizPage() {
           setResultDetails(detailsMap);
           setSubmitted(true);
           setScore(data.score_pct ?? null);
+          setGradingAttemptId(data.status === "pending" ? attemptId : null);
 
           const total = ansList.length || 0;
           const correctCount = ansList.filter((a) => a.is_correct).length;
@@ -112,7 +127,10 @@ export default function QuizPage() {
               ? {
                   correct: correctCount,
                   total,
-                  pct: data.score_pct ?? Math.round((correctCount / total) * 100),
+                  pct:
+                    data.status === "pending"
+                      ? null
+                      : data.score_pct ?? Math.round((correctCount / total) * 100),
                 }
               : null
           );
@@ -149,6 +167,55 @@ export default function QuizPage() {
     load();
   }, [quizId, nav, isReplay, attemptId]);
 
+  function applyAttemptResult(data: AttemptResultDto) {
+    setScore(data.score_pct);
+    setResult({
+      correct: data.correct,
+      total: data.total,
+      pct: data.score_pct,
+    });
+
+    const map: Record<number, { is_correct: boolean | null; user_answer: string }> =
+      {};
+    (data.details || []).forEach((d) => {
+      map[d.question_id] = {
+        is_correct: d.is_correct === null ? null : !!d.is_correct,
+        user_answer: String(d.user_answer || ""),
+      };
+    });
+    setResultDetails(map);
+    setGradingAttemptId(data.status === "pending" ? data.attempt_id : null);
+  }
+
+  // Poll until background grading of short answers finishes
+  useEffect(() => {
+    if (!gradingAttemptId) return;
+    let cancelled = false;
+    let timer: number | undefined;
+
+    async function poll() {
+      try {
+        const { data } = await api.get<AttemptResultDto>(
+          `/api/quizzes/attempts/${gradingAttemptId}/status`
+        );
+        if (cancelled) return;
+        if (data.status === "pending") {
+          timer = window.setTimeout(poll, GRADING_POLL_MS);
+        } else {
+          applyAttemptResult(data);
+        }
+      } catch {
+        if (!cancelled) timer = window.setTimeout(poll, GRADING_POLL_MS * 2);
+      }
+    }
+
+    timer = window.setTimeout(poll, GRADING_POLL_MS);
+    return () => {
+      cancelled = true;
+      window.clearTimeout(timer);
+    };
+  }, [gradingAttemptId]);
+
   async function submit() {
     if (isReplay) return;
 
@@ -161,24 +228,9 @@ export default function QuizPage() {
           user_answer,
         })),
       };
-      const { data } = await api.post("/api/quizzes/attempt", payload);
-      setScore(data.score_pct);
-      setResult({
-        correct: data.correct,
-        total: data.total,
-        pct: data.score_pct,
-      });
+      const { data } = await api.post<AttemptResultDto>("/api/quizzes/attempt", payload);
+      applyAttemptResult(data);
       setResultOpen(true);
-
-      const map: Record<number, { is_correct: boolean; user_answer: string }> =
-        {};
-      (data.details || []).forEach((d: any) => {
-        map[d.question_id] = {
-          is_correct: !!d.is_correct,
-          user_answer: String(d.user_answer || ""),
-        };
-      });
-      setResultDetails(map);
       setSubmitted(true);
     } catch (e: any) {
       alert(e?.response?.data?.error || "Submission failed");
@@ -312,6 +364,7 @@ export default function QuizPage() {
           const detail = resultDetails[q.id];
           const chosenIsCorrect = submitted && detail?.is_correct === true;
           const chosenIsWrong = submitted && detail?.is_correct === false;
+          const isGrading = submitted && detail?.is_correct === null;
 
           // Determine Question Type
           const isMCQ = !q.type || q.type === "mcq"; // Default to MCQ if missing
@@ -320,19 +373,19 @@ export default function QuizPage() {
 
           return (
             <div key={q.id} className={`bg-white rounded-xl border shadow-sm overflow-hidden ${
-                submitted 
+                submitted && !isGrading
                   ? (chosenIsCorrect ? "border-emerald-200 ring-1 ring-emerald-100" : "border-red-200 ring-1 ring-red-100") 
                   : "border-gray-200"
             }`}>
               {/* Question Header */}
-              <div className={`p-5 border-b ${submitted ? (chosenIsCorrect ? "bg-emerald-50/30" : "bg-red-50/30") : "bg-gray-50/30 border-gray-50"}`}>
+              <div className={`p-5 border-b ${submitted && !isGrading ? (chosenIsCorrect ? "bg-emerald-50/30" : "bg-red-50/30") : "bg-gray-50/30 border-gray-50"}`}>
                 <div className="flex justify-between items-start">
                     <div className="flex-1">
                         <span className="text-[10px] font-bold text-gray-400 uppercase tracking-wider mb-1 block">Question {i + 1}</span>
                         <h3 className="text-base font-medium text-gray-900 leading-relaxed">{q.prompt}</h3>
                     </div>
                     {/* Result Icon */}
-                    {submitted && (
+                    {submitted && !isGrading && (
                         <div className={`ml-3 ${chosenIsCorrect ? "text-emerald-500" : "text-red-500"}`}>
                             {chosenIsCorrect ? (
                                 <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2"><polyline points="20 6 9 17 4 12"></polyline></svg>
@@ -421,7 +474,7 @@ export default function QuizPage() {
                     <div className="space-y-3">
                         <textarea
                             className={`w-full border rounded-lg p-3 text-sm focus:outline-none transition-all ${
-                                submitted 
+                                submitted && !isGrading
                                 ? (chosenIsCorrect ? "border-emerald-300 bg-emerald-50/20 text-emerald-900" : "border-red-300 bg-red-50/20 text-red-900")
                                 : "border-gray-300 focus:border-blue-500 focus:ring-2 focus:ring-blue-100"
                             }`}
@@ -433,7 +486,12 @@ export default function QuizPage() {
                             }}
                             disabled={submitted || isReplay}
                         />
-                        {submitted && (
+                        {isGrading && (
+                            <div className="text-xs font-medium text-gray-500 animate-pulse">
+                                AI Assessment: Grading…
+                            </div>
+                        )}
+                        {submitted && !isGrading && (
                             <div className={`text-xs font-medium ${chosenIsCorrect ? "text-emerald-600" : "text-red-600"}`}>
                                 {chosenIsCorrect ? "AI Assessment: Correct" : "AI Assessment: Incorrect / Incomplete"}
                             </div>
@@ -490,13 +548,16 @@ export default function QuizPage() {
                 <div className="inline-flex items-center justify-center w-20 h-20 rounded-full bg-blue-50 mb-4 relative">
                     <svg className="w-full h-full -rotate-90" viewBox="0 0 36 36">
                         <path className="text-blue-100" d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="currentColor" strokeWidth="3" />
-                        <path className="text-blue-600" strokeDasharray={`${result.pct}, 100`} d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="currentColor" strokeWidth="3" />
+                        <path className="text-blue-600" strokeDasharray={`${result.pct ?? 0}, 100`} d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="currentColor" strokeWidth="3" />
                     </svg>
-                    <span className="absolute text-lg font-bold text-blue-700">{result.pct}%</span>
+                    <span className="absolute text-lg font-bold text-blue-700">{result.pct === null ? "…" : `${result.pct}%`}</span>
                 </div>
                 
                 <h3 className="text-xl font-bold text-gray-900 mb-1">Quiz Complete!</h3>
-                <p className="text-sm text-gray-500 mb-6">You got {result.correct} out of {result.total} questions correct.</p>
+                <p className="text-sm text-gray-500 mb-6">
+                  You got {result.correct} out of {result.total} questions correct
+                  {gradingAttemptId ? " so far. Short answers are still being graded…" : "."}
+                </p>
                 
                 <div className="flex flex-col gap-2">
                     <button
@@ -2,6 +2,7 @@
 import { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { api } from "../lib/api";
+import { runJob, type JobProgress } from "../lib/jobs";
 import AudioPlayer from "../components/AudioPlayer";
 
 export default function SummaryViewer() {
@@ -14,6 +15,7 @@ export default function SummaryViewer() {
     sources: string[];
     created_at: string;
     audio_filename?: string;
+    audio_etag?: string | null;
   } | null>(null);
   const [loading, setLoading] = useState(true);
 
@@ -26,9 +28,9 @@ export default function SummaryViewer() {
   }, [id]);
 
   // Add Handler
-  const handleGenerateAudio = async (voice: string) => {
+  const handleGenerateAudio = async (voice: string, onProgress: (p: JobProgress) => void) => {
     if(!summary) return;
-    await api.post(`/api/summaries/${summary.id}/audio`, { voice });
+    await runJob(api.post(`/api/summaries/${summary.id}/audio`, { voice }), onProgress);
     // No need to reload everything, the AudioPlayer handles state locally mostly, 
     // but refreshing summary ensures consistency on re-entry
   };
@@ -99,6 +101,7 @@ export default function SummaryViewer() {
           <AudioPlayer 
             summaryId={summary.id} 
             hasAudio={!!summary.audio_filename} 
+            audioVersion={summary.audio_etag}
             onGenerate={handleGenerateAudio}
           />
 
@@ -1,6 +1,6 @@
 // frontend/src/pages/UploadPage.tsx
 import { useEffect, useState, useCallback } from "react";
-import { api } from "../lib/api";
+import { api, fetchAllPages } from "../lib/api";
 import { useNavigate } from "react-router-dom";
 import GenerateModal from "../components/GenerateModal";
 import { CreateCourseModal, CreateTopicModal } from "../components/ResourceModals";
@@ -38,7 +38,7 @@ export default function UploadPage() {
   const [uploadResp, setUploadResp] = useState<any>(null);
 
   useEffect(() => {
-    api.get("/api/courses/mine").then(({ data }) => setCourses(data.items || []));
+    fetchAllPages("/api/courses/mine").then(setCourses);
   }, []);
 
   useEffect(() => {
@@ -46,7 +46,7 @@ export default function UploadPage() {
       setTopics([]);
       return;
     }
-    api.get(`/api/topics/by_course/${selectedCourseId}`).then(({ data }) => setTopics(data.items || []));
+    fetchAllPages(`/api/topics/by_course/${selectedCourseId}`).then(setTopics);
   }, [selectedCourseId]);
 
   const handleDrop = useCallback((e: React.DragEvent) => {